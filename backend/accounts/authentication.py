@@ -0,0 +1,127 @@
+"""
+JWT authentication without a user query per request.
+
+simplejwt's ``JWTAuthentication`` loads the ``User`` row for every request,
+and the views' ``request.user.organization`` loads the organization after
+it. ``ClaimsJWTAuthentication`` instead builds the request user from the
+verified token and a per-process cache of each user's authorization state
+(active flag, ``token_version``, organization, role and admin flags), read
+with one query when missing and kept for JWT_USER_CACHE_SECONDS. The
+organization is attached as a pk-only instance, enough for filtering and
+foreign keys; any other field is loaded when first read.
+
+* Revocation: tokens carry the ``token_version`` they were issued under.
+  Changing the password or calling ``revoke-tokens/`` bumps it, after which
+  the account's older access and refresh tokens are refused.
+* Role and organization changes apply without a new login: the state, not
+  the token's claims (which the frontend reads), decides the request user's
+  role, organization and flags.
+
+Saving a user evicts its state in the saving process (``accounts.signals``);
+other workers see the change once their entry expires, so
+JWT_USER_CACHE_SECONDS bounds how long a revoked token or a removed role can
+still be used there. Users built here carry only the state's fields: save
+them with ``update_fields``.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db.models import F
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import Organization
+
+User = get_user_model()
+
+VERSION_CLAIM = 'token_version'
+# Fields of the cached state; the request user is built from them
+STATE_FIELDS = ('id', 'username', 'organization_id', 'role', 'is_superuser', 'is_staff', 'is_active')
+
+_lock = threading.Lock()
+_states = {}
+
+
+def cache_seconds():
+    return getattr(settings, 'JWT_USER_CACHE_SECONDS', 30)
+
+
+def user_state(user_id):
+    """``(token_version, {STATE_FIELDS: values})`` of a user, or None when there's no such user."""
+    now = time.monotonic()
+    entry = _states.get(user_id)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+
+    row = User.objects.filter(pk=user_id).values_list('token_version', *STATE_FIELDS).first()
+    state = (row[0], dict(zip(STATE_FIELDS, row[1:]))) if row is not None else None
+    max_entries = getattr(settings, 'JWT_USER_CACHE_MAX_ENTRIES', 10000)
+    with _lock:
+        if len(_states) >= max_entries:
+            # Drop the expired entries, or all of them if that isn't enough.
+            for key in [key for key, entry in _states.items() if entry[0] <= now]:
+                del _states[key]
+            if len(_states) >= max_entries:
+                _states.clear()
+        _states[user_id] = (now + cache_seconds(), state)
+    return state
+
+
+def forget(user_id):
+    """Drop a user's cached state in this process."""
+    with _lock:
+        _states.pop(user_id, None)
+
+
+def forget_all():
+    with _lock:
+        _states.clear()
+
+
+def revoke_tokens(user_id):
+    """Refuse every token issued to the user so far."""
+    User.objects.filter(pk=user_id).update(token_version=F('token_version') + 1)
+    forget(user_id)
+
+
+def check_token(token):
+    """The current state of the token's user; raises if the user is gone, inactive or revoked the token."""
+    try:
+        # simplejwt stores the id as a string; the cache is keyed on the pk.
+        user_id = User._meta.pk.to_python(token[api_settings.USER_ID_CLAIM])
+    except (KeyError, ValidationError) as e:
+        raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+    state = user_state(user_id)
+    if state is None:
+        raise AuthenticationFailed(_("User not found"), code='user_not_found')
+    version, values = state
+    if not values['is_active']:
+        raise AuthenticationFailed(_("User is inactive"), code='user_inactive')
+    # Tokens from before token_version existed count as version 0.
+    if token.get(VERSION_CLAIM, 0) != version:
+        raise AuthenticationFailed(_("Token has been revoked"), code='token_revoked')
+    return state
+
+
+def build_user(values):
+    """A ``User`` with only STATE_FIELDS loaded (the rest deferred) and its organization attached by pk."""
+    # from_db takes the values in the model's field order.
+    names = [field.attname for field in User._meta.concrete_fields if field.attname in values]
+    user = User.from_db(User.objects.db, names, [values[name] for name in names])
+    org_id = user.organization_id
+    organization = Organization.from_db(Organization.objects.db, ['id'], [org_id]) if org_id is not None else None
+    User.organization.field.set_cached_value(user, organization)
+    return user
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        _version, values = check_token(validated_token)
+        return build_user(values)
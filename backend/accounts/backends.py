@@ -1,17 +1,56 @@
-from django.contrib.auth.backends import ModelBackend
+"""
+Login by username or email.
+
+Emails are unique regardless of case (``user_email_ci_uniq``, a unique index
+on ``LOWER(email)`` over the non-blank ones), so an identifier names at most
+one account by username and one by email, and both are found with one
+indexed lookup. The username wins when they differ.
+
+Exactly one password hash is computed per attempt: an unknown identifier
+hashes the password anyway, so its rejection takes as long as a wrong
+password and response times don't reveal which accounts exist.
+"""
 from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
 from django.db.models import Q
+from django.db.models.functions import Lower
 
 User = get_user_model()
 
+
+def users_with_email(email):
+    """Users whose email matches ``email`` case-insensitively, via the unique index."""
+    return User.objects.alias(email_key=Lower('email')).filter(email_key=email.lower()).exclude(email='')
+
+
+def login_candidates(identifier):
+    """The users with username ``identifier`` or its email (at most one of each)."""
+    return User.objects.alias(email_key=Lower('email')).filter(
+        Q(username=identifier) | (Q(email_key=identifier.lower()) & ~Q(email=''))
+    )
+
+
+def login_user(identifier):
+    """The user ``identifier`` (a username, or an email in any case) names, or None."""
+    matches = list(login_candidates(identifier)[:2])
+    for user in matches:
+        if user.username == identifier:
+            return user
+    return matches[0] if matches else None
+
+
 class EmailBackend(ModelBackend):
     def authenticate(self, request, username=None, password=None, **kwargs):
-        try:
-            # Try to fetch the user by searching the username or email field
-            user = User.objects.get(Q(username=username) | Q(email=username))
-        except User.DoesNotExist:
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
             return None
 
+        user = login_user(username)
+        if user is None:
+            # Spend the time a password check would (see the module docstring).
+            User().set_password(password)
+            return None
         if user.check_password(password) and self.user_can_authenticate(user):
             return user
         return None
@@ -0,0 +1,94 @@
+"""
+Organization-scoped response cache.
+
+Cached entries are keyed on the organization's change counters
+(``accounts.changes``) for the models they read. Every write to a tenant
+model already bumps its counter inside the writing transaction, which
+orphans the old entries; those then age out through the backend's TTL/LRU
+eviction instead of being deleted one by one.
+
+The counters are read with one indexed query per response, so every worker
+sees a write the moment it commits whatever the cache backend: with the
+per-process local-memory default, workers just don't share entries. Keys
+also carry the caller's visibility, so a superuser's response is never
+served to a member or the other way round.
+"""
+import hashlib
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from . import changes
+from .tenancy import current_organization_id, current_tenant
+
+_MISSING = object()
+
+_stats_lock = threading.Lock()
+_hits = Counter()
+_misses = Counter()
+
+
+def _record(name, hit):
+    with _stats_lock:
+        (_hits if hit else _misses)[name] += 1
+
+
+def cache_stats():
+    """Hit/miss counters for this process, overall and per cached endpoint."""
+    with _stats_lock:
+        names = sorted(_hits.keys() | _misses.keys())
+        endpoints = {name: {'hits': _hits[name], 'misses': _misses[name]} for name in names}
+        hits, misses = sum(_hits.values()), sum(_misses.values())
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / (hits + misses), 3) if hits + misses else 0,
+        'endpoints': endpoints,
+    }
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _hits.clear()
+        _misses.clear()
+
+
+def get_or_compute(name, org_id, models, params, compute, timeout=None, visibility='member'):
+    """
+    Return ``(value, hit)`` for ``compute()``, cached under the current change
+    counters of ``models`` in organization ``org_id``. ``params``
+    distinguishes variants of one endpoint, ``visibility`` callers who may
+    see different rows.
+    """
+    labels = sorted(changes.label(model) for model in models)
+    counters = changes.versions(org_id, labels)
+    version_part = ':'.join(f"{model}@{counters[model]}" for model in labels)
+    digest = hashlib.md5(repr(params).encode(), usedforsecurity=False).hexdigest()
+    key = f"response:{name}:{visibility}:{org_id}:{version_part}:{digest}"
+
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        _record(name, True)
+        return value, True
+
+    value = compute()
+    cache.set(key, value, settings.RESPONSE_CACHE_TIMEOUT if timeout is None else timeout)
+    _record(name, False)
+    return value, False
+
+
+def cached_response(request, name, models, compute):
+    """
+    DRF Response for ``compute()`` (which returns response data) in the
+    current organization, invalidated by writes to ``models``, varied on the
+    query string.
+    """
+    params = sorted(request.query_params.lists())
+    visibility = 'all' if current_tenant().unrestricted else 'member'
+    data, hit = get_or_compute(
+        name, current_organization_id(), models, params, compute, visibility=visibility,
+    )
+    return Response(data, headers={'X-Cache': 'HIT' if hit else 'MISS'})
@@ -0,0 +1,159 @@
+"""
+Per-organization, per-model change counters and the ETags built on them.
+
+Every write to a tenant model bumps its ``ChangeCounter`` row inside the
+writing transaction (see ``accounts.signals``), so a counter never moves
+unless the data it covers did, and a rolled-back write leaves it alone.
+A response's ETag hashes the counters of the models it reads together with
+the caller and the full request path, so it changes exactly when any of its
+inputs may have.
+
+``If-None-Match`` is checked before the view touches its queryset: a
+matching request returns an empty 304, skipping the data tables and the
+serializers entirely. Counters are read straight from the counter table,
+one lookup on its ``(organization, model)`` unique index, so every worker
+sees a bump as soon as it commits: a cached copy could answer 304 for data
+another process has since changed.
+"""
+import hashlib
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from .models import ChangeCounter, Organization, User
+
+
+def label(model):
+    return model._meta.label_lower
+
+
+def organization_id(instance):
+    """The organization whose data ``instance`` is, or None."""
+    if isinstance(instance, Organization):
+        return instance.pk
+    org_id = getattr(instance, 'organization_id', None)
+    if org_id is not None or not hasattr(instance, 'user_id'):
+        return org_id
+    # User-owned rows (deals) belong to the owner's organization.
+    if instance._meta.get_field('user').is_cached(instance):
+        return instance.user.organization_id
+    return User.objects.filter(pk=instance.user_id).values_list('organization_id', flat=True).first()
+
+
+def bump(changes):
+    """Increment the counter of every ``(organization id, model label)`` in ``changes``."""
+    changes = sorted({(org_id, model) for org_id, model in changes if org_id is not None})
+    for org_id, model in changes:
+        counters = ChangeCounter.objects.filter(organization_id=org_id, model=model)
+        if counters.update(version=F('version') + 1):
+            continue
+        try:
+            with transaction.atomic():
+                ChangeCounter.objects.create(organization_id=org_id, model=model, version=1)
+        except IntegrityError:
+            # Created concurrently
+            counters.update(version=F('version') + 1)
+
+
+def versions(org_id, labels):
+    """Current counter of each of ``labels`` in the organization (0 before any write)."""
+    stored = dict(
+        ChangeCounter.objects.filter(organization_id=org_id, model__in=labels).values_list('model', 'version')
+    )
+    return {model: stored.get(model, 0) for model in labels}
+
+
+def request_etag(request, models, *extra):
+    """
+    ETag for ``request`` given the counters of ``models`` in the caller's
+    organization, or None when it cannot be tied to one (superusers read
+    across organizations).
+    """
+    user = request.user
+    org_id = getattr(user, 'organization_id', None)
+    if org_id is None or user.is_superuser:
+        return None
+    labels = sorted(label(model) for model in models)
+    counters = versions(org_id, labels)
+    key = repr((
+        request.get_full_path(), user.pk, org_id,
+        [(name, counters.get(name, 0)) for name in labels], extra,
+    ))
+    return '"%s"' % hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
+
+
+def etag_matches(request, etag):
+    header = request.headers.get('If-None-Match')
+    if not header or etag is None:
+        return False
+    if header.strip() == '*':
+        return True
+    tags = [tag.strip() for tag in header.split(',')]
+    # Weak comparison, as If-None-Match calls for
+    return etag in tags or f'W/{etag}' in tags
+
+
+def tag_response(response, etag):
+    response['ETag'] = etag
+    # Per-user responses: browsers keep them but revalidate on every use,
+    # which is what sends If-None-Match.
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Authorization'])
+    return response
+
+
+def not_modified(etag):
+    return tag_response(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+
+
+def conditional_response(request, models, compute, *extra):
+    """``compute()`` (a Response) with an ETag, or a 304 when the client's copy is current."""
+    etag = request_etag(request, models, *extra)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response = compute()
+    if etag is not None and response.status_code == status.HTTP_200_OK:
+        tag_response(response, etag)
+    return response
+
+
+class NotModified(APIException):
+    status_code = status.HTTP_304_NOT_MODIFIED
+
+    def __init__(self, etag):
+        super().__init__()
+        self.etag = etag
+
+
+class ConditionalGetMixin:
+    """
+    ETags for ``etag_actions`` (``list``/``retrieve``) from the change
+    counters of ``etag_models``; a matching ``If-None-Match`` gets a 304
+    before the view runs.
+    """
+    etag_models = ()
+    etag_actions = ('list', 'retrieve')
+    etag = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = None
+        if self.action in self.etag_actions:
+            self.etag = request_etag(request, self.etag_models)
+            if etag_matches(request, self.etag):
+                raise NotModified(self.etag)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return not_modified(exc.etag)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.etag is not None and response.status_code == status.HTTP_200_OK:
+            tag_response(response, self.etag)
+        return response
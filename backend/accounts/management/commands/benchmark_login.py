@@ -0,0 +1,86 @@
+import statistics
+import time
+
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from accounts.backends import login_candidates, login_user
+
+User = get_user_model()
+
+PREFIX = 'loginbench'
+
+
+def percentile(cut_points, pct):
+    return round(cut_points[pct - 1], 3)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark login against a large user table: the account lookup alone and full "
+        "authenticate() calls for usernames, emails, wrong passwords and unknown users."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000, help="Users to have in the table (default 100000).")
+        parser.add_argument('--iterations', type=int, default=50, help="Timed logins per case (default 50).")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per bulk insert (default 5000).")
+        parser.add_argument('--password', default='benchmark', help="Password of the generated users.")
+        parser.add_argument('--cleanup', action='store_true', help=f"Delete the '{PREFIX}-' users afterwards.")
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 2:
+            raise CommandError("--iterations must be at least 2.")
+        self.ensure_users(options['users'], options['batch_size'], options['password'])
+        total = User.objects.count()
+        self.stdout.write(f"{total} users ({connection.vendor})")
+
+        step = max(1, options['users'] // options['iterations'])
+        names = [f"{PREFIX}-{n}" for n in range(0, options['users'], step)][:options['iterations']]
+        password = options['password']
+        self.stdout.write(f"Lookup plan: {login_candidates(names[0]).explain()}")
+
+        cases = [
+            ('lookup', lambda name: login_user(name)),
+            ('username', lambda name: authenticate(username=name, password=password)),
+            ('email (any case)', lambda name: authenticate(username=f"{name}@Example.COM", password=password)),
+            ('wrong password', lambda name: authenticate(username=name, password='not-' + password)),
+            ('unknown user', lambda name: authenticate(username=f"nobody-{name}", password=password)),
+        ]
+        results = {}
+        for label, attempt in cases:
+            attempt(names[0])  # warm up
+            timings = []
+            for name in names:
+                start = time.perf_counter()
+                attempt(name)
+                timings.append((time.perf_counter() - start) * 1000)
+            cut_points = statistics.quantiles(timings, n=100, method='inclusive')
+            results[label] = percentile(cut_points, 50)
+            self.stdout.write(
+                f"{label:18} p50={percentile(cut_points, 50):8.2f}ms  p95={percentile(cut_points, 95):8.2f}ms  "
+                f"{1000 / statistics.fmean(timings):8.1f}/s per worker"
+            )
+        # Rejecting an unknown user should take as long as a wrong password.
+        ratio = results['unknown user'] / results['wrong password'] if results['wrong password'] else 1
+        self.stdout.write(f"unknown / wrong-password p50: x{ratio:.2f}")
+
+        if options['cleanup']:
+            deleted, _ = User.objects.filter(username__startswith=f"{PREFIX}-").delete()
+            self.stdout.write(f"Deleted {deleted} rows.")
+
+    def ensure_users(self, count, batch_size, password):
+        existing = User.objects.filter(username__startswith=f"{PREFIX}-").count()
+        if existing >= count:
+            return
+        # One hash for every row: hashing each would dominate the setup.
+        password_hash = make_password(password)
+        for start in range(existing, count, batch_size):
+            User.objects.bulk_create([
+                User(username=f"{PREFIX}-{n}", email=f"{PREFIX}-{n}@example.com", password=password_hash)
+                for n in range(start, min(start + batch_size, count))
+            ])
+        self.stdout.write(f"Created {count - existing} benchmark users.")
+
@@ -0,0 +1,26 @@
+# Generated by Django 6.0.2 on 2026-10-17 13:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_user_joined_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(help_text='app_label.model_name', max_length=100)),
+                ('version', models.BigIntegerField(default=0)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='change_counters', to='accounts.organization')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('organization', 'model'), name='change_counter_org_model_uniq')],
+            },
+        ),
+    ]
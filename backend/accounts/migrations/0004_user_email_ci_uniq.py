@@ -0,0 +1,53 @@
+# Generated by Django 6.0.2 on 2026-10-17 10:05
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+# Accounts listed per shared email when the migration stops
+REPORT_LIMIT = 50
+
+
+def check_duplicate_emails(apps, schema_editor):
+    """
+    Emails become unique regardless of case. Rather than pick which of the
+    accounts sharing one keeps it, stop and list them: give each a distinct
+    email (or blank all but one, they can still log in by username) and
+    migrate again.
+    """
+    User = apps.get_model('accounts', 'User')
+    users = User.objects.exclude(email='').annotate(email_key=Lower('email'))
+    duplicated = list(
+        users.values('email_key').annotate(accounts=Count('pk')).filter(accounts__gt=1)
+        .order_by('email_key').values_list('email_key', flat=True)
+    )
+    if not duplicated:
+        return
+    lines = []
+    for email_key in duplicated[:REPORT_LIMIT]:
+        holders = users.filter(email_key=email_key).order_by('pk').values_list('pk', 'username', 'email')
+        lines.append(f"  {email_key}: " + ', '.join(f"#{pk} {username} <{email}>" for pk, username, email in holders))
+    if len(duplicated) > REPORT_LIMIT:
+        lines.append(f"  ... and {len(duplicated) - REPORT_LIMIT} more")
+    raise RuntimeError(
+        f"{len(duplicated)} email(s) are shared by several accounts, ignoring case. Give each account "
+        "a distinct email (or a blank one) and run migrate again:\n" + '\n'.join(lines)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_changecounter'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_emails, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), condition=models.Q(('email', ''), _negated=True), name='user_email_ci_uniq', violation_error_message='A user with that email already exists.'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-17 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_user_email_ci_uniq'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
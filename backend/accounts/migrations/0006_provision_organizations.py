@@ -0,0 +1,24 @@
+# Generated by Django 6.0.2 on 2026-10-17 15:20
+
+from django.db import migrations
+
+
+def provision_organizations(apps, schema_editor):
+    # Users were given an organization on their first write; new ones get it
+    # when created (accounts.signals), existing ones here.
+    User = apps.get_model('accounts', 'User')
+    Organization = apps.get_model('accounts', 'Organization')
+    for user in User.objects.filter(organization__isnull=True).only('pk', 'username').iterator():
+        organization = Organization.objects.create(name=f"{user.username}'s Agency")
+        User.objects.filter(pk=user.pk).update(organization=organization)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_user_token_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(provision_organizations, migrations.RunPython.noop),
+    ]
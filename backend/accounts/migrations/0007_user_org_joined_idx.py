@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-17 16:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_provision_organizations'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['organization', 'date_joined', 'id'], name='user_org_joined_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0.2 on 2026-10-18 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_user_org_joined_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScopeVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=100, unique=True)),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
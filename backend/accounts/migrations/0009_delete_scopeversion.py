@@ -0,0 +1,16 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_scopeversion'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='ScopeVersion',
+        ),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractUser
 
 class Organization(models.Model):
@@ -36,6 +38,52 @@ class User(AbstractUser):
         choices=ROLE_CHOICES,
         default='agent'
     )
+    # Claim of the user's tokens; bumping it revokes them (accounts.authentication)
+    token_version = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Keyset pagination of the admin user list
+            models.Index(fields=['date_joined', 'id'], name='user_joined_idx'),
+            # The same, within an organization (accounts.directory)
+            models.Index(fields=['organization', 'date_joined', 'id'], name='user_org_joined_idx'),
+        ]
+        constraints = [
+            # Login by email (accounts.backends): one account per address, in any case
+            models.UniqueConstraint(
+                Lower('email'), condition=~Q(email=''), name='user_email_ci_uniq',
+                violation_error_message="A user with that email already exists.",
+            ),
+        ]
 
     def __str__(self):
         return self.username
+
+    def save(self, *args, **kwargs):
+        # A new password revokes the tokens issued under the old one.
+        if self._password is not None and not self._state.adding:
+            self.token_version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'password' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'token_version'}
+        super().save(*args, **kwargs)
+
+
+class ChangeCounter(models.Model):
+    """
+    Monotonic count of writes to one model's rows in one organization,
+    bumped in the writing transaction (see ``accounts.changes``). Responses
+    derive their ETags from it.
+    """
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='change_counters')
+    model = models.CharField(max_length=100, help_text="app_label.model_name")
+    version = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['organization', 'model'], name='change_counter_org_model_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.model}@{self.version} (org {self.organization_id})"
+
@@ -1,4 +1,6 @@
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+
+from .authentication import VERSION_CLAIM, check_token
 
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
     @classmethod
@@ -11,15 +13,41 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
         token['username'] = user.username
         token['first_name'] = user.first_name
         token['is_superuser'] = user.is_superuser
+        # Tokens from before a revocation are refused (accounts.authentication)
+        token[VERSION_CLAIM] = user.token_version
 
         return token
 
+
+class VersionedTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refuses refresh tokens of inactive users and revoked ones (see ``accounts.authentication``)."""
+
+    def validate(self, attrs):
+        check_token(self.token_class(attrs['refresh']))
+        return super().validate(attrs)
+
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 
+from .directory import last_activity
+
 User = get_user_model()
 
 class UserListSerializer(serializers.ModelSerializer):
+    """Rows of the admin user directory (``accounts.directory.user_directory``)."""
+    organization_name = serializers.CharField(source='organization.name', read_only=True, default=None)
+    deal_count = serializers.IntegerField(read_only=True)
+    pipeline_value = serializers.DecimalField(max_digits=15, decimal_places=2, read_only=True)
+    last_activity = serializers.SerializerMethodField()
+
+    def get_last_activity(self, obj):
+        moment = last_activity(obj)
+        return serializers.DateTimeField().to_representation(moment) if moment else None
+
     class Meta:
         model = User
-        fields = ['id', 'email', 'first_name', 'last_name', 'is_active', 'date_joined', 'is_superuser']
+        fields = [
+            'id', 'username', 'email', 'first_name', 'last_name', 'is_active', 'date_joined', 'is_superuser',
+            'organization', 'organization_name', 'role', 'last_login', 'deal_count', 'pipeline_value',
+            'last_activity',
+        ]
@@ -0,0 +1,46 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import authentication, changes
+from transactions.signals import bulk_deleted, bulk_saved
+from .models import ChangeCounter, Organization, User
+
+# Apps whose models hold tenant data
+TENANT_APPS = {'accounts', 'core_config', 'transactions', 'interactions', 'deals'}
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_cached_responses(sender, instance, **kwargs):
+    if sender._meta.app_label not in TENANT_APPS or sender is ChangeCounter:
+        return
+    # Logins record last_login, which no cached response shows.
+    if kwargs.get('update_fields') == frozenset({'last_login'}):
+        return
+    # Rows deleted along with their organization take its counters with them.
+    if not isinstance(kwargs.get('origin'), Organization):
+        changes.bump([(changes.organization_id(instance), changes.label(sender))])
+
+
+@receiver(bulk_saved)
+@receiver(bulk_deleted)
+def invalidate_after_bulk_write(sender, objects, **kwargs):
+    changes.bump((changes.organization_id(instance), changes.label(sender)) for instance in objects)
+
+
+@receiver(post_save, sender=User)
+def provision_organization(sender, instance, created, raw=False, **kwargs):
+    """Every account works inside an organization: new users without one get their own."""
+    if not created or raw or instance.organization_id is not None:
+        return
+    instance.organization = Organization.objects.create(name=f"{instance.username}'s Agency")
+    instance.save(update_fields=['organization'])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_auth_state(sender, instance, **kwargs):
+    authentication.forget(instance.pk)
+    # Again once committed, in case a request re-read the old row meanwhile.
+    transaction.on_commit(lambda: authentication.forget(instance.pk))
@@ -0,0 +1,120 @@
+"""
+Request-scoped tenant context.
+
+``TenantContextMiddleware`` runs each request in a copy of the current
+context and records the request there. The tenant is the organization of
+``request.user`` once DRF has authenticated it: viewsets, serializers and
+querysets all read that one, without passing it around and without a
+query (the request user carries its organization, see
+``accounts.authentication``). Outside requests (commands, the shell, tests)
+``tenant()`` sets it explicitly.
+
+``TenantQuerySet.for_tenant()`` is the scoping rule of the record viewsets
+(contacts, properties, transactions): superusers see every organization's
+rows, a user without an organization sees none, anyone else their own.
+``for_organization()`` keeps superusers to their own organization too, as
+the config, task and event viewsets always have; their cached responses are
+keyed on the organization alone. Tenant models use ``TenantManager`` as
+their default manager; it filters only when asked to, so signals, commands
+and the admin still see every row.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from dataclasses import dataclass
+
+from django.db import models
+from rest_framework import serializers
+
+
+@dataclass(frozen=True)
+class Tenant:
+    organization: object = None
+    # Superusers act across organizations
+    unrestricted: bool = False
+
+    @property
+    def organization_id(self):
+        return self.organization.pk if self.organization is not None else None
+
+
+NO_TENANT = Tenant()
+
+_request = ContextVar('tenant_request', default=None)
+_tenant = ContextVar('tenant', default=None)
+
+
+def current_tenant():
+    """The explicitly set tenant, else the one of the current request's user, else NO_TENANT."""
+    tenant = _tenant.get()
+    if tenant is not None:
+        return tenant
+    request = _request.get()
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return NO_TENANT
+    # Django's request.user is DRF's authenticated user once the view has run
+    # its authentication; its organization is cached on it.
+    return Tenant(getattr(user, 'organization', None), user.is_superuser)
+
+
+def current_organization():
+    return current_tenant().organization
+
+
+def current_organization_id():
+    return current_tenant().organization_id
+
+
+@contextmanager
+def tenant(organization, unrestricted=False):
+    """Act as ``organization`` (an ``Organization``) within the block."""
+    token = _tenant.set(Tenant(organization, unrestricted))
+    try:
+        yield
+    finally:
+        _tenant.reset(token)
+
+
+class TenantContextMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # A fresh copy per request: nothing set during it outlives it.
+        return copy_context().run(self._handle, request)
+
+    def _handle(self, request):
+        _request.set(request)
+        return self.get_response(request)
+
+
+class TenantQuerySet(models.QuerySet):
+    def for_tenant(self):
+        """The current tenant's rows (see the module docstring)."""
+        tenant = current_tenant()
+        if tenant.unrestricted:
+            return self.all()
+        if tenant.organization_id is None:
+            return self.none()
+        return self.filter(organization_id=tenant.organization_id)
+
+    def for_organization(self):
+        """The rows of the current tenant's own organization, superuser or not."""
+        organization_id = current_organization_id()
+        if organization_id is None:
+            return self.none()
+        return self.filter(organization_id=organization_id)
+
+
+class TenantManager(models.Manager.from_queryset(TenantQuerySet)):
+    pass
+
+
+class TenantPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Accepts only the current tenant's rows of a tenant model."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if isinstance(queryset, TenantQuerySet):
+            queryset = queryset.for_tenant()
+        return queryset
@@ -1,3 +1,275 @@
-from django.test import TestCase
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import authenticate, get_user_model
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.test import APITestCase
+
+from deals.models import Deal
+from interactions.models import Task
+from realtor_crm_backend.testcases import OrganizationTestCase
+from transactions.models import Contact, Property
+from . import authentication, tenancy
+from .backends import login_user
+from .changes import versions
+from .models import ChangeCounter, Organization
+
+User = get_user_model()
+
+
+class UserListViewTests(APITestCase):
+    def setUp(self):
+        User.objects.create_user(username='agent', email='agent@example.com', password='pass')
+        admin = User.objects.create_user(username='admin', email='admin@example.com', password='pass', is_staff=True)
+        self.client.force_authenticate(admin)
+
+    def test_user_list_paginates_on_date_joined(self):
+        response = self.client.get(reverse('user_list') + '?page_size=1')
+        self.assertEqual([row['email'] for row in response.data['results']], ['admin@example.com'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([row['email'] for row in response.data['results']], ['agent@example.com'])
+        self.assertIsNone(response.data['next'])
+
+    def test_filters_and_activity(self):
+        org = Organization.objects.create(name="Test Agency")
+        agent = User.objects.create_user(username='busy', email='busy@example.com', password='pass', organization=org)
+        Deal.objects.create(user=agent, stage='NEW', value=Decimal('1000.00'))
+        deal = Deal.objects.create(user=agent, stage='CLOSED_WON', value=Decimal('500.00'))
+        url = reverse('user_list')
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'organization': org.pk, 'role': 'agent'})
+        [row] = response.data['results']
+        self.assertEqual(row['username'], 'busy')
+        self.assertEqual(row['organization_name'], "Test Agency")
+        self.assertEqual(row['deal_count'], 2)
+        self.assertEqual(row['pipeline_value'], '1000.00')
+        self.assertEqual(row['last_activity'], serializers.DateTimeField().to_representation(deal.updated_at))
+
+        response = self.client.get(url, {'joined_before': '2000-01-01'})
+        self.assertEqual(response.data['results'], [])
+        response = self.client.get(url, {'role': 'owner'})
+        self.assertEqual(response.status_code, 400)
+        idle = self.client.get(url, {'joined_after': timezone.localdate().isoformat(), 'page_size': 10})
+        self.assertEqual(len(idle.data['results']), 3)
+        self.assertEqual(
+            {row['username']: row['deal_count'] for row in idle.data['results']}, {'busy': 2, 'admin': 0, 'agent': 0},
+        )
+
+
+class ConditionalGetTests(OrganizationTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_contact('jane@example.com')
+
+    def add_contact(self, email, org=None):
+        return Contact.objects.create(
+            organization=org or self.org, first_name='Jane', last_name='Doe', email=email, phone='555-0100',
+        )
+
+    def assertNotModified(self, url, etag, header=None):
+        # Only the change counters are read
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=header or etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+    def test_list_and_detail(self):
+        url = reverse('contact-list')
+        first = self.client.get(url)
+        etag = first['ETag']
+        self.assertNotModified(url, etag)
+        self.assertNotModified(url, etag, header=f'"other", W/{etag}')
+        self.assertNotEqual(self.client.get(url + '?page_size=1')['ETag'], etag)
+
+        detail = reverse('contact-detail', args=[first.data['results'][0]['id']])
+        self.assertNotModified(detail, self.client.get(detail)['ETag'])
+
+        # Other organizations' writes leave the tag alone; our own change it.
+        self.add_contact('x@example.com', org=Organization.objects.create(name="Other Agency"))
+        self.assertNotModified(url, etag)
+        self.add_contact('ann@example.com')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_other_workers_bumps_change_the_tag(self):
+        url = reverse('contact-list')
+        etag = self.client.get(url)['ETag']
+        # A write committed by another process: no eviction reaches this one
+        ChangeCounter.objects.filter(organization=self.org, model='transactions.contact').update(version=F('version') + 1)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_related_models_change_the_tag(self):
+        url = reverse('transaction-list')
+        etag = self.client.get(url)['ETag']
+        Property.objects.create(organization=self.org, address='1 Main St', city='Springfield',
+                                state='IL', zip_code='62701', list_price=Decimal('1.00'))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_dashboard(self):
+        url = reverse('dashboard-stats')
+        etag = self.client.get(url)['ETag']
+        self.assertNotModified(url, etag)
+        self.add_contact('ann@example.com')
+        self.assertNotModified(url, etag)  # Contacts are not on the dashboard
+
+    def test_counters(self):
+        labels = ['transactions.contact', 'transactions.property']
+        self.assertEqual(versions(self.org.pk, labels), {'transactions.contact': 1, 'transactions.property': 0})
+        contact = self.add_contact('ann@example.com')
+        contact.delete()
+        self.assertEqual(versions(self.org.pk, labels)['transactions.contact'], 3)
+
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.add_contact('rolled@back.com')
+            raise RuntimeError
+        self.assertEqual(versions(self.org.pk, labels)['transactions.contact'], 3)
+
+        rows = [{'first_name': 'A', 'last_name': 'B', 'email': f'{n}@example.com', 'phone': '1'} for n in range(3)]
+        self.client.post(reverse('contact-bulk'), rows, format='json')
+        self.assertEqual(versions(self.org.pk, labels)['transactions.contact'], 4)
+
+        self.org.delete()
+        self.assertFalse(ChangeCounter.objects.exists())
+
+
+class LoginTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='agent', email='Agent@Example.com', password='pass')
+
+    def test_username_or_email_in_any_case(self):
+        for identifier in ('agent', 'agent@example.com', 'AGENT@EXAMPLE.COM'):
+            response = self.client.post(reverse('token_obtain_pair'), {'username': identifier, 'password': 'pass'})
+            self.assertEqual(response.status_code, 200, identifier)
+        response = self.client.post(reverse('token_obtain_pair'), {'username': 'agent', 'password': 'wrong'})
+        self.assertEqual(response.status_code, 401)
+
+    def test_username_wins_over_another_accounts_email(self):
+        other = User.objects.create_user(username='agent@example.org', password='other')
+        User.objects.create_user(username='third', email='agent@example.org', password='third')
+        self.assertEqual(login_user('agent@example.org'), other)
+
+    def test_one_lookup_and_one_hash_per_attempt(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(login_user('agent@example.com'), self.user)
+        with mock.patch.object(User, 'set_password') as set_password:
+            self.assertIsNone(authenticate(username='nobody', password='pass'))
+        set_password.assert_called_once_with('pass')
+
+    def test_emails_are_unique_in_any_case(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create_user(username='copy', email='agent@EXAMPLE.com')
+        # Blank emails are not addresses
+        User.objects.create_user(username='a')
+        User.objects.create_user(username='b')
+        response = self.client.post(reverse('register'), {
+            'username': 'copy', 'email': 'AGENT@example.com', 'password': 'pass',
+        })
+        self.assertEqual(response.data, {'error': 'Email already registered.'})
+
+
+class TokenAuthenticationTests(APITestCase):
+    def setUp(self):
+        authentication.forget_all()
+        self.org = Organization.objects.create(name="Test Agency")
+        self.user = User.objects.create_user(username='agent', password='pass', organization=self.org)
+        Contact.objects.create(organization=self.org, first_name='Jane', last_name='Doe', email='jane@example.com')
+        self.tokens = self.login()
+
+    def login(self, password='pass'):
+        response = self.client.post(reverse('token_obtain_pair'), {'username': 'agent', 'password': password})
+        return response.data
+
+    def get_contacts(self, tokens=None):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {(tokens or self.tokens)['access']}")
+        return self.client.get(reverse('contact-list'))
+
+    def refresh(self):
+        return self.client.post(reverse('token_refresh'), {'refresh': self.tokens['refresh']})
+
+    def test_no_user_or_organization_queries_once_cached(self):
+        self.assertEqual(self.get_contacts().status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_contacts()
+        self.assertEqual([row['email'] for row in response.data['results']], ['jane@example.com'])
+        tables = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('"accounts_user"', tables)
+        self.assertNotIn('"accounts_organization"', tables)
+
+    def test_organization_and_role_changes_apply_to_existing_tokens(self):
+        self.get_contacts()
+        other = Organization.objects.create(name="Other Agency")
+        self.user.organization = other
+        self.user.save()
+        self.assertEqual(self.get_contacts().data['results'], [])
+        self.assertEqual(self.refresh().status_code, 200)
+
+    def test_password_change_and_sign_out_revoke_tokens(self):
+        self.get_contacts()
+        self.user.set_password('new')
+        self.user.save()
+        self.assertEqual(self.get_contacts().status_code, 401)
+        self.assertEqual(self.refresh().status_code, 401)
+
+        self.tokens = self.login('new')
+        self.assertEqual(self.get_contacts().status_code, 200)
+        self.assertEqual(self.client.post(reverse('revoke_tokens')).status_code, 204)
+        self.assertEqual(self.get_contacts().status_code, 401)
+        self.assertEqual(self.refresh().status_code, 401)
+
+    def test_inactive_users_are_refused(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get_contacts().status_code, 401)
+
+
+class TenancyTests(OrganizationTestCase):
+    def setUp(self):
+        super().setUp()
+        self.contact = self.make_contact()
+
+    def test_new_users_get_an_organization(self):
+        user = User.objects.create_user(username='newcomer', password='pass')
+        self.assertEqual(user.organization.name, "newcomer's Agency")
+        self.assertEqual(User.objects.get(pk=user.pk).organization_id, user.organization_id)
+        self.assertEqual(self.user.organization_id, self.org.pk)
+
+    def test_querysets_follow_the_tenant(self):
+        other = Organization.objects.create(name="Other Agency")
+        Contact.objects.create(organization=other, first_name='John', last_name='Roe')
+        self.assertFalse(Contact.objects.for_tenant().exists())
+        with tenancy.tenant(self.org):
+            self.assertEqual(list(Contact.objects.for_tenant()), [self.contact])
+        with tenancy.tenant(None, unrestricted=True):
+            self.assertEqual(Contact.objects.for_tenant().count(), 2)
+
+    def test_superusers_see_their_own_tasks_and_events(self):
+        other = Organization.objects.create(name="Other Agency")
+        Task.objects.create(organization=other, user=self.user, title='Elsewhere')
+        Task.objects.create(organization=self.org, user=self.user, title='Here')
+        admin = User.objects.create_user(username='root', password='pass', organization=self.org, is_superuser=True)
+        self.client.force_authenticate(admin)
+        response = self.client.get(reverse('task-list'))
+        self.assertEqual([row['title'] for row in response.data['results']], ['Here'])
+
+    def test_references_to_other_organizations_are_rejected(self):
+        other = Organization.objects.create(name="Other Agency")
+        foreign = Contact.objects.create(organization=other, first_name='John', last_name='Roe')
+        response = self.client.post(reverse('task-list'), {'title': 'Call'})
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post(reverse('deal-list'), {
+            'title': 'Deal', 'value': '100', 'contact_id': foreign.pk,
+            'property_id': Property.objects.create(
+                organization=self.org, address='1 Main St', city='Austin', state='TX', zip_code='78701', list_price=1,
+            ).pk,
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('contact_id', response.data)
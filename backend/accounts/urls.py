@@ -1,8 +1,10 @@
 from django.urls import path
-from .views import RegisterView, UserListView, SystemStatsView
+from .views import RegisterView, RevokeTokensView, UserListView, SystemStatsView, CacheStatsView
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
+    path('revoke-tokens/', RevokeTokensView.as_view(), name='revoke_tokens'),
     path('users/', UserListView.as_view(), name='user_list'),
     path('platform-stats/', SystemStatsView.as_view(), name='platform_stats'),
+    path('cache-stats/', CacheStatsView.as_view(), name='cache_stats'),
 ]
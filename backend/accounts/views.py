@@ -1,9 +1,13 @@
 from rest_framework import status
 from rest_framework.views import APIView
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from .authentication import revoke_tokens
+from .backends import users_with_email
 from .models import Organization
+from .serializers import MyTokenObtainPairSerializer
 
 User = get_user_model()
 
@@ -27,30 +31,31 @@ class RegisterView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        if User.objects.filter(email=email).exists():
+        if users_with_email(email).exists():
             return Response(
                 {'error': 'Email already registered.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
         try:
-            # Create Organization first
-            org_name = f"{first_name or username}'s Agency"
-            organization = Organization.objects.create(name=org_name)
-
-            # Create User
-            user = User.objects.create_user(
-                username=username,
-                email=email,
-                password=password,
-                first_name=first_name,
-                last_name=last_name,
-                organization=organization,
-                role='admin' # First user is admin of their agency
-            )
+            with transaction.atomic():
+                # Create Organization first
+                org_name = f"{first_name or username}'s Agency"
+                organization = Organization.objects.create(name=org_name)
+
+                # Create User
+                user = User.objects.create_user(
+                    username=username,
+                    email=email,
+                    password=password,
+                    first_name=first_name,
+                    last_name=last_name,
+                    organization=organization,
+                    role='admin' # First user is admin of their agency
+                )
 
             # Generate Tokens
-            refresh = RefreshToken.for_user(user)
+            refresh = MyTokenObtainPairSerializer.get_token(user)
 
             return Response({
                 'refresh': str(refresh),
@@ -62,6 +67,12 @@ class RegisterView(APIView):
                 }
             }, status=status.HTTP_201_CREATED)
 
+        except IntegrityError:
+            # Registered concurrently
+            return Response(
+                {'error': 'Username or email already registered.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
             return Response(
                 {'error': str(e)},
@@ -69,38 +80,82 @@ class RegisterView(APIView):
             )
 
 
+class RevokeTokensView(APIView):
+    """Sign out everywhere: refuse every token issued to the caller so far."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        revoke_tokens(request.user.pk)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 from rest_framework import generics
 from rest_framework.permissions import IsAdminUser
+from . import directory
 from .serializers import UserListSerializer
 
 class UserListView(generics.ListAPIView):
-    queryset = User.objects.all().order_by('-date_joined')
+    """
+    Admin user directory, newest first, with each user's organization, deal
+    count, pipeline value and last activity (see ``accounts.directory``).
+    Filters: ?organization=<id>, ?role=, ?joined_after= and ?joined_before=
+    (YYYY-MM-DD, inclusive).
+    """
     serializer_class = UserListSerializer
     permission_classes = [IsAdminUser]
+    cursor_field = 'date_joined'
+
+    def list(self, request, *args, **kwargs):
+        try:
+            self.filters = directory.parse_filters(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return super().list(request, *args, **kwargs)
+
+    def get_queryset(self):
+        return directory.user_directory(self.filters).order_by('-date_joined', '-id')
 
 
-from django.utils import timezone
-from datetime import timedelta
-from deals.models import Deal
+from analytics import platform
 
 class SystemStatsView(APIView):
+    """Platform totals and their daily history, read from the metric snapshots (analytics.platform)."""
     permission_classes = [IsAdminUser]
 
     def get(self, request):
-        total_users = User.objects.count()
-        total_deals = Deal.objects.count()
-        
-        # Usage Depth: Deals per User
-        avg_deals = round(total_deals / total_users, 1) if total_users > 0 else 0
+        try:
+            days = int(request.query_params.get('days', platform.DEFAULT_HISTORY_DAYS))
+        except ValueError:
+            days = 0
+        if not 1 <= days <= platform.MAX_HISTORY_DAYS:
+            return Response(
+                {'error': f"'days' must be a whole number from 1 to {platform.MAX_HISTORY_DAYS}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        # Recent Growth: Users joined in last 7 days
-        seven_days_ago = timezone.now() - timedelta(days=7)
-        new_users = User.objects.filter(date_joined__gte=seven_days_ago).count()
+        latest = platform.latest()
+        # Usage Depth: Deals per User
+        avg_deals = round(latest.deals / latest.agents, 1) if latest.agents > 0 else 0
 
         return Response({
-            'total_agents': total_users,
-            'total_deals': total_deals,
+            'as_of': latest.date,
+            'total_agents': latest.agents,
+            'total_organizations': latest.organizations,
+            'total_deals': latest.deals,
+            'total_transactions': latest.transactions,
+            'active_users': latest.active_users,
             'avg_deals_per_agent': avg_deals,
-            'new_agents_week': new_users
+            # Recent Growth: Users joined in the week up to the snapshot
+            'new_agents_week': platform.new_agents_since(latest.date, 7),
+            'history': platform.history(latest.date, days),
         })
 
+
+from .cache import cache_stats
+
+class CacheStatsView(APIView):
+    """Response cache hit/miss counters for the serving process."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(cache_stats())
@@ -0,0 +1,156 @@
+"""
+Stage history and funnel conversion.
+
+Every stage a Transaction or Deal enters is appended to ``StageHistory``
+(see ``analytics.signals``). The funnel counts, per stage, the objects that
+entered it within a date range and how many of those went on to a later
+pipeline stage, and reports the median days spent in the stage. Counting is
+done in SQL over the (model, object_id, changed_at) index; the next entry
+for each stay is a correlated subquery on the same index.
+
+Medians are computed in the database too: ``PERCENTILE_CONT`` on
+PostgreSQL, and elsewhere (SQLite has no ordered-set aggregates) one count
+of each stage's stays followed by a read of the middle one or two in order.
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.models import (
+    Aggregate, Count, Case, DurationField, ExpressionWrapper, F, When, Value, IntegerField, Exists, OuterRef,
+    Subquery, Q,
+)
+
+from transactions.models import Transaction
+from deals.models import Deal
+from .models import StageHistory
+
+User = get_user_model()
+
+# Pipeline stages in order; the lost stage is terminal and never "later".
+PIPELINES = {
+    'transaction': ['Prospect', 'Active', 'Under Contract', 'Closed Won'],
+    'deal': ['NEW', 'NEGOTIATION', 'UNDER_CONTRACT', 'CLOSED_WON'],
+}
+STAGE_CHOICES = {
+    'transaction': Transaction.STAGE_CHOICES,
+    'deal': Deal.STAGE_CHOICES,
+}
+
+
+def record_stage_change(model, instance, from_stage, organization_id, user_id=None):
+    """Append the stage ``instance`` just entered."""
+    return StageHistory.objects.create(
+        organization_id=organization_id,
+        user_id=user_id,
+        model=model,
+        object_id=instance.pk,
+        from_stage=from_stage or '',
+        to_stage=instance.stage,
+    )
+
+
+def record_stage_changes(model, changes):
+    """Bulk ``record_stage_change`` for ``[(instance, from_stage, organization_id, user_id)]``."""
+    StageHistory.objects.bulk_create([
+        StageHistory(
+            organization_id=organization_id, user_id=user_id, model=model,
+            object_id=instance.pk, from_stage=from_stage or '', to_stage=instance.stage,
+        )
+        for instance, from_stage, organization_id, user_id in changes
+    ], batch_size=1000)
+
+
+def deal_organization_id(deal):
+    """The deal owner's organization, without a query when the owner is already loaded."""
+    if Deal.user.is_cached(deal):
+        return deal.user.organization_id
+    return User.objects.filter(pk=deal.user_id).values_list('organization_id', flat=True).first()
+
+
+class Median(Aggregate):
+    """The continuous median of a number or duration (PostgreSQL)."""
+    function = 'PERCENTILE_CONT'
+    name = 'Median'
+    template = '%(function)s(0.5) WITHIN GROUP (ORDER BY %(expressions)s)'
+
+
+def median_by_stage(stays):
+    """``{to_stage: median}`` of the ``stay`` durations annotated on ``stays``."""
+    if connections[stays.db].vendor == 'postgresql':
+        rows = stays.values('to_stage').annotate(median=Median('stay')).order_by()
+        return {row['to_stage']: row['median'] for row in rows}
+
+    medians = {}
+    sizes = stays.values('to_stage').annotate(stays=Count('pk')).order_by().values_list('to_stage', 'stays')
+    for stage, size in sizes:
+        middle = list(
+            stays.filter(to_stage=stage).order_by('stay').values_list('stay', flat=True)[(size - 1) // 2:size // 2 + 1]
+        )
+        medians[stage] = sum(middle, timedelta()) / len(middle)
+    return medians
+
+
+def _stage_rank(field, pipeline):
+    return Case(
+        *[When(**{field: stage}, then=Value(rank)) for rank, stage in enumerate(pipeline)],
+        default=Value(-1),
+        output_field=IntegerField(),
+    )
+
+
+def funnel(org_id, model, start, end):
+    """
+    Per-stage funnel for ``model`` ('transaction' or 'deal') in ``org_id``.
+
+    ``start``/``end`` are aware datetimes bounding when a stage was entered
+    (end exclusive). A stay counts as converted when the same object later
+    reaches any further pipeline stage, at any time.
+    """
+    pipeline = PIPELINES[model]
+    history = StageHistory.objects.filter(model=model)
+    entries = history.filter(organization_id=org_id, changed_at__gte=start, changed_at__lt=end)
+
+    later = history.annotate(rank=_stage_rank('to_stage', pipeline)).filter(
+        object_id=OuterRef('object_id'),
+        changed_at__gt=OuterRef('changed_at'),
+        rank__gt=OuterRef('rank'),
+    )
+    counts = (
+        entries.annotate(rank=_stage_rank('to_stage', pipeline))
+        .annotate(advanced=Exists(later))
+        .values('to_stage')
+        .annotate(
+            entered=Count('object_id', distinct=True),
+            converted=Count('object_id', distinct=True, filter=Q(advanced=True)),
+        )
+        .order_by()
+    )
+    counts = {row['to_stage']: row for row in counts}
+
+    next_change = history.filter(
+        object_id=OuterRef('object_id'), changed_at__gt=OuterRef('changed_at')
+    ).order_by('changed_at').values('changed_at')[:1]
+    stays = (
+        entries.annotate(left_at=Subquery(next_change))
+        .filter(left_at__isnull=False)
+        .annotate(stay=ExpressionWrapper(F('left_at') - F('changed_at'), output_field=DurationField()))
+    )
+    medians = median_by_stage(stays)
+
+    stages = []
+    for stage, _ in STAGE_CHOICES[model]:
+        row = counts.get(stage, {'entered': 0, 'converted': 0})
+        in_pipeline = stage in pipeline[:-1]
+        stages.append({
+            'stage': stage,
+            'entered': row['entered'],
+            'converted': row['converted'] if in_pipeline else None,
+            'conversion_rate': (
+                round(row['converted'] / row['entered'] * 100, 1) if in_pipeline and row['entered'] else None
+            ),
+            'median_days_in_stage': (
+                round(medians[stage].total_seconds() / 86400, 1) if stage in medians else None
+            ),
+        })
+    return stages
@@ -0,0 +1,182 @@
+"""
+Per-endpoint request instrumentation.
+
+``RequestInstrumentationMiddleware`` records wall time, database time and
+query count for each request against its resolved URL name, and flags SQL
+statements repeated within one request (the N+1 signature). Samples go into
+bounded in-memory windows per endpoint, read back through the admin-only
+``/api/analytics/request-stats/`` endpoint and, per response, through
+``Server-Timing``/``X-DB-*`` headers.
+
+It is off unless ``REQUEST_INSTRUMENTATION['ENABLED']`` is set; the
+middleware then removes itself at startup, so a disabled deployment pays
+nothing. ``SAMPLE_RATE`` limits the share of requests measured.
+"""
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+DEFAULTS = {
+    'ENABLED': False,
+    'SAMPLE_RATE': 1.0,
+    'HEADERS': True,
+    # A statement repeated this many times in one request is flagged
+    'N_PLUS_ONE_THRESHOLD': 5,
+    # Samples kept per endpoint
+    'WINDOW': 1000,
+}
+# Upper bounds (ms) of the latency histogram buckets
+HISTOGRAM_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_NUMBER = re.compile(r'\b\d+\b')
+
+
+def instrumentation_settings():
+    return {**DEFAULTS, **getattr(settings, 'REQUEST_INSTRUMENTATION', {})}
+
+
+def sql_signature(sql):
+    """Collapse a statement to its shape so repeats with different values match."""
+    return _NUMBER.sub('N', _IN_LIST.sub('IN (...)', sql))
+
+
+class QueryRecorder:
+    """``connection.execute_wrapper`` callable timing and fingerprinting statements."""
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.signatures = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.signatures[sql_signature(sql)] += 1
+
+    def repeated(self, threshold):
+        return {sql: count for sql, count in self.signatures.items() if count >= threshold}
+
+
+class EndpointStats:
+    """Rolling per-endpoint samples and N+1 sightings, shared by all threads of the process."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._requests = Counter()
+        self._n_plus_one = {}
+
+    def reset(self):
+        with self._lock:
+            self._samples = {}
+            self._requests = Counter()
+            self._n_plus_one = {}
+
+    def record(self, name, wall_ms, db_ms, queries, repeated, window):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None or samples.maxlen != window:
+                samples = self._samples[name] = deque(samples or (), maxlen=window)
+            samples.append((wall_ms, db_ms, queries))
+            self._requests[name] += 1
+            if repeated:
+                sightings = self._n_plus_one.setdefault(name, Counter())
+                for sql, count in repeated.items():
+                    sightings[sql] = max(sightings[sql], count)
+
+    def snapshot(self):
+        with self._lock:
+            samples = {name: list(rows) for name, rows in self._samples.items()}
+            requests = dict(self._requests)
+            n_plus_one = {name: dict(counter) for name, counter in self._n_plus_one.items()}
+
+        endpoints = {}
+        for name, rows in samples.items():
+            walls = sorted(row[0] for row in rows)
+            endpoints[name] = {
+                'requests': requests[name],
+                'window': len(rows),
+                'wall_ms': _summary(walls),
+                'db_ms': _summary(sorted(row[1] for row in rows)),
+                'queries': _summary(sorted(row[2] for row in rows)),
+                'histogram_ms': _histogram(walls),
+                'n_plus_one': [
+                    {'sql': sql, 'max_repeats': count}
+                    for sql, count in sorted(n_plus_one.get(name, {}).items(), key=lambda item: -item[1])
+                ],
+            }
+        return endpoints
+
+
+def _percentile(ordered, pct):
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _summary(ordered):
+    return {
+        'mean': round(sum(ordered) / len(ordered), 3),
+        'p50': round(_percentile(ordered, 50), 3),
+        'p95': round(_percentile(ordered, 95), 3),
+        'p99': round(_percentile(ordered, 99), 3),
+        'max': round(ordered[-1], 3),
+    }
+
+
+def _histogram(ordered):
+    counts, index = [], 0
+    for bound in HISTOGRAM_BUCKETS:
+        start = index
+        while index < len(ordered) and ordered[index] <= bound:
+            index += 1
+        counts.append({'le': 'inf' if bound == float('inf') else bound, 'count': index - start})
+    return counts
+
+
+endpoint_stats = EndpointStats()
+
+
+def endpoint_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name or match.route
+
+
+class RequestInstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.config = instrumentation_settings()
+        if not self.config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if self.config['SAMPLE_RATE'] < 1 and random.random() >= self.config['SAMPLE_RATE']:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        wall_ms = (time.perf_counter() - start) * 1000
+        db_ms = recorder.duration * 1000
+        repeated = recorder.repeated(self.config['N_PLUS_ONE_THRESHOLD'])
+
+        endpoint_stats.record(
+            endpoint_name(request), wall_ms, db_ms, recorder.count, repeated, self.config['WINDOW']
+        )
+        if self.config['HEADERS']:
+            response['Server-Timing'] = f'app;dur={wall_ms - db_ms:.1f}, db;dur={db_ms:.1f}'
+            response['X-DB-Queries'] = str(recorder.count)
+            if repeated:
+                response['X-N-Plus-One'] = str(max(repeated.values()))
+        return response
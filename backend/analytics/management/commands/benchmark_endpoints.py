@@ -0,0 +1,266 @@
+import json
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core_config.urls import router as config_router
+from deals.urls import router as deals_router
+from interactions.urls import router as interactions_router
+from transactions.models import Contact, Property
+from transactions.urls import router as transactions_router
+
+User = get_user_model()
+
+ROUTERS = [transactions_router, deals_router, interactions_router, config_router]
+# Endpoints outside the routers
+NAMED_ENDPOINTS = ['dashboard-stats', 'analytics-timeseries', 'analytics-funnel', 'search', 'sync']
+# Staff-only endpoints, benchmarked as the first staff user
+ADMIN_ENDPOINTS = ['user_list', 'platform_stats', 'cache_stats']
+# Endpoints that answer 400 without a query; skipped when the data offers none (see query_params)
+NEEDS_PARAMS = {'search', 'property-nearby', 'property-within', 'property-clusters'}
+# Half the side of the box the map endpoints are benchmarked over, in degrees
+MAP_BOX_DEGREES = 0.5
+
+
+class EndpointFailed(Exception):
+    def __init__(self, response):
+        super().__init__(response.status_code)
+        self.status = response.status_code
+        data = getattr(response, 'data', None)
+        self.error = (data.get('error') or data.get('detail')) if isinstance(data, dict) else None
+
+
+class QueryCounter:
+    """Counts executed statements; unlike CaptureQueriesContext it has no log size limit."""
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def check(response):
+    if not 200 <= response.status_code < 300:
+        raise EndpointFailed(response)
+    return response
+
+
+def body_size(response):
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def percentile(cut_points, pct):
+    return round(cut_points[pct - 1], 3)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every router endpoint and the analytics, search, sync and account endpoints "
+        "in-process and write p50/p95/p99 latency and query counts to a JSON report, optionally "
+        "compared to a baseline. Endpoints answering with a non-2xx status are reported as failures."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Username to authenticate as (default: the agent with the most deals).")
+        parser.add_argument('--iterations', type=int, default=20, help="Timed requests per endpoint (default 20).")
+        parser.add_argument('--warmup', type=int, default=2, help="Untimed requests per endpoint first (default 2).")
+        parser.add_argument('--cold', action='store_true', help="Clear the cache before every timed request.")
+        parser.add_argument('--output', default='benchmark-report.json', help="Report path (default benchmark-report.json).")
+        parser.add_argument('--baseline', help="Earlier report to compare against.")
+        parser.add_argument(
+            '--max-regression', type=float, default=1.25,
+            help="Fail when an endpoint's p95 exceeds the baseline by this factor, "
+                 "or its query count grows (default 1.25).",
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 2:
+            raise CommandError("--iterations must be at least 2.")
+        user = self.get_user(options['user'])
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+        results, failures = {}, {}
+        for name, client, url in self.endpoints(user):
+            try:
+                row = self.measure(client, url, options)
+            except EndpointFailed as e:
+                failures[name] = {'url': url, 'status': e.status, 'error': e.error}
+                self.stdout.write(self.style.ERROR(f"{name:45} {e.status}  {e.error or ''}"))
+                continue
+            results[name] = row
+            self.stdout.write(
+                f"{name:45} {row['status']}  p50={row['p50_ms']:8.2f}ms  p95={row['p95_ms']:8.2f}ms  "
+                f"p99={row['p99_ms']:8.2f}ms  queries={row['queries']}"
+            )
+
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'user': user.username,
+            'iterations': options['iterations'],
+            'cold_cache': options['cold'],
+            'endpoints': results,
+            'failures': failures,
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+        if failures:
+            raise CommandError(f"Non-2xx responses from: {', '.join(failures)}")
+        if options['baseline']:
+            self.compare(results, options['baseline'], options['max_regression'])
+
+    def get_user(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f"No user '{username}'.")
+        user = (
+            User.objects.filter(organization__isnull=False)
+            .annotate(deal_count=Count('deal')).order_by('-deal_count', 'id').first()
+        )
+        if user is None:
+            raise CommandError("No users with an organization; run seed_synthetic_data first.")
+        return user
+
+    def get_admin_client(self):
+        admin = User.objects.filter(is_staff=True, is_active=True).order_by('id').first()
+        if admin is None:
+            return None
+        client = APIClient()
+        client.force_authenticate(admin)
+        return client
+
+    def query_params(self, user):
+        """Query params for the NEEDS_PARAMS endpoints, taken from the user's organization's rows."""
+        params = {}
+        contact = Contact.objects.filter(organization_id=user.organization_id).exclude(last_name='').first()
+        if contact is not None:
+            params['search'] = {'q': contact.last_name}
+        place = Property.objects.filter(organization_id=user.organization_id, latitude__isnull=False).first()
+        if place is not None:
+            params['property-nearby'] = {'lat': place.latitude, 'lng': place.longitude}
+            bbox = ','.join(str(round(value, 6)) for value in (
+                max(place.latitude - MAP_BOX_DEGREES, -90), max(place.longitude - MAP_BOX_DEGREES, -180),
+                min(place.latitude + MAP_BOX_DEGREES, 90), min(place.longitude + MAP_BOX_DEGREES, 180),
+            ))
+            params['property-within'] = params['property-clusters'] = {'bbox': bbox}
+        return params
+
+    def endpoints(self, user):
+        """
+        (name, client, url) for every list endpoint, one detail per router,
+        list-level GET actions and the endpoints outside the routers.
+        """
+        params = self.query_params(user)
+
+        def url_of(name):
+            url = reverse(name)
+            if name in params:
+                url += '?' + urlencode(params[name])
+            return url
+
+        def runnable(name):
+            if name in NEEDS_PARAMS and name not in params:
+                self.stdout.write(f"{name:45} skipped: no rows to build its query from")
+                return False
+            return True
+
+        for router in ROUTERS:
+            for prefix, viewset, basename in router.registry:
+                list_url = reverse(f'{basename}-list')
+                yield f'{basename}-list', self.client, list_url
+
+                object_id = self.first_id(self.client.get(list_url))
+                if object_id is not None:
+                    yield f'{basename}-detail', self.client, reverse(f'{basename}-detail', args=[object_id])
+
+                for extra in viewset.get_extra_actions():
+                    name = f'{basename}-{extra.url_name}'
+                    if not extra.detail and 'get' in extra.mapping and runnable(name):
+                        yield name, self.client, url_of(name)
+        for name in NAMED_ENDPOINTS:
+            if runnable(name):
+                yield name, self.client, url_of(name)
+
+        admin_client = self.get_admin_client()
+        for name in ADMIN_ENDPOINTS:
+            if admin_client is None:
+                self.stdout.write(f"{name:45} skipped: no staff user")
+            else:
+                yield name, admin_client, reverse(name)
+
+    def first_id(self, response):
+        rows = response.data if response.status_code == 200 else None
+        if isinstance(rows, dict):
+            rows = rows.get('results')
+        if rows and isinstance(rows, list) and 'id' in rows[0]:
+            return rows[0]['id']
+        return None
+
+    def measure(self, client, url, options):
+        """Timings of ``url``; raises EndpointFailed on the first non-2xx response."""
+        for _ in range(options['warmup']):
+            check(client.get(url))
+
+        timings, queries, status = [], [], None
+        for _ in range(options['iterations']):
+            if options['cold']:
+                cache.clear()
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                start = time.perf_counter()
+                response = client.get(url)
+                # Exports stream their rows: read the whole body, and its queries, while timing.
+                size = body_size(response)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(counter.count)
+            status = check(response).status_code
+
+        cut_points = statistics.quantiles(timings, n=100, method='inclusive')
+        return {
+            'url': url,
+            'status': status,
+            'p50_ms': percentile(cut_points, 50),
+            'p95_ms': percentile(cut_points, 95),
+            'p99_ms': percentile(cut_points, 99),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'queries': max(queries),
+            'response_bytes': size,
+        }
+
+    def compare(self, results, baseline_path, max_regression):
+        with open(baseline_path) as f:
+            baseline = json.load(f)['endpoints']
+
+        regressions = []
+        self.stdout.write(f"\nCompared with {baseline_path}:")
+        for name, row in results.items():
+            if name not in baseline:
+                self.stdout.write(f"{name:45} (new)")
+                continue
+            before = baseline[name]
+            ratio = row['p95_ms'] / before['p95_ms'] if before['p95_ms'] else 1
+            query_delta = row['queries'] - before['queries']
+            self.stdout.write(f"{name:45} p95 x{ratio:5.2f}  queries {query_delta:+d}")
+            if ratio > max_regression or query_delta > 0:
+                regressions.append(name)
+
+        if regressions:
+            raise CommandError(f"Regressed against baseline: {', '.join(regressions)}")
+        self.stdout.write(self.style.SUCCESS("No regressions against baseline."))
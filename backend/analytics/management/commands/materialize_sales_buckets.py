@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import Organization
+from analytics import timeseries
+
+
+class Command(BaseCommand):
+    help = "Materialize monthly sales buckets for closed months ahead of time."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months', type=int, default=60,
+            help="How many closed months back from the current month to materialize (default 60).",
+        )
+        parser.add_argument(
+            '--organization', type=int, action='append', dest='organizations',
+            help="Limit to this organization id. May be repeated.",
+        )
+
+    def handle(self, *args, **options):
+        last_closed = timeseries.add_months(timeseries.current_month(), -1)
+        months = timeseries.month_range(timeseries.add_months(last_closed, 1 - options['months']), last_closed)
+
+        organizations = Organization.objects.order_by('id')
+        if options['organizations']:
+            organizations = organizations.filter(id__in=options['organizations'])
+        org_ids = list(organizations.values_list('id', flat=True))
+        for org_id in org_ids:
+            timeseries.materialize_months(org_id, months)
+        self.stdout.write(self.style.SUCCESS(
+            f"Materialized {len(months)} month(s) for {len(org_ids)} organization(s)."
+        ))
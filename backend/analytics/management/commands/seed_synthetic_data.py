@@ -0,0 +1,327 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+from accounts.models import Organization
+from analytics import rollups
+from analytics.models import StageHistory
+from core_config.models import TransactionType, TransactionStatus, DateDefinition
+from deals.models import Deal
+from interactions.models import Task, Event
+from search.index import reindex
+from transactions import cells
+from transactions.models import Contact, Property, Transaction
+
+User = get_user_model()
+
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David', 'Elizabeth']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez']
+STREETS = ['Main St', 'Oak Ave', 'Pine St', 'Maple Dr', 'Cedar Ln', 'Elm St', 'Lake Rd', 'Hill Ct']
+# (city, state, latitude, longitude of its center)
+CITIES = [
+    ('Austin', 'TX', 30.27, -97.74), ('Denver', 'CO', 39.74, -104.99), ('Portland', 'OR', 45.52, -122.68),
+    ('Raleigh', 'NC', 35.78, -78.64), ('Phoenix', 'AZ', 33.45, -112.07), ('Tampa', 'FL', 27.95, -82.46),
+]
+TRANSACTION_TYPES = ['Purchase', 'Listing', 'Lease', 'Referral']
+TRANSACTION_STATUSES = ['Lead', 'Showing', 'Offer', 'Inspection', 'Appraisal', 'Closing']
+DATE_DEFINITIONS = [('Inspection Deadline', True), ('Appraisal Deadline', True), ('Closing Date', True)]
+STAGE_WEIGHTS = {
+    'Prospect': 3, 'Active': 3, 'Under Contract': 2, 'Closed Won': 4, 'Closed Lost': 1,
+}
+DEAL_STAGE_WEIGHTS = {
+    'NEW': 3, 'NEGOTIATION': 2, 'UNDER_CONTRACT': 2, 'CLOSED_WON': 3, 'CLOSED_LOST': 2,
+}
+MODELS_WITH_CREATED_AT = [Organization, Contact, Property, Transaction, Deal, Task, Event, TransactionType]
+
+
+@contextmanager
+def explicit_created_at():
+    """Let bulk inserts set historical created_at values instead of now()."""
+    fields = [model._meta.get_field('created_at') for model in MODELS_WITH_CREATED_AT]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = "Seed a deterministic synthetic dataset for load testing and benchmarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--transactions', type=int, default=10000,
+            help="Number of transactions; every other table is sized relative to it (default 10000).",
+        )
+        parser.add_argument(
+            '--organizations', type=int,
+            help="Number of organizations (default: one per 5000 transactions).",
+        )
+        parser.add_argument('--agents', type=int, default=5, help="Agents per organization (default 5).")
+        parser.add_argument('--years', type=int, default=5, help="Years of history to spread rows over (default 5).")
+        parser.add_argument('--seed', type=int, default=42, help="Random seed (default 42).")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per bulk insert (default 5000).")
+        parser.add_argument('--password', default='benchmark', help="Password for the generated agents.")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.history_days = options['years'] * 365
+        self.prefix = f"seed{options['seed']}"
+
+        total = options['transactions']
+        org_count = options['organizations'] or max(1, total // 5000)
+        if User.objects.filter(username__startswith=f"{self.prefix}-").exists():
+            raise CommandError(
+                f"Users prefixed '{self.prefix}-' already exist; use another --seed or a fresh database."
+            )
+
+        with explicit_created_at(), db_transaction.atomic():
+            orgs = self.seed_organizations(org_count)
+            users = self.seed_users(orgs, options['agents'], options['password'])
+            config = self.seed_config(orgs)
+            contacts = self.seed_contacts(orgs, total // 2)
+            properties = self.seed_properties(orgs, total // 2)
+            counts = {
+                'transactions': self.seed_transactions(orgs, contacts, properties, config, total),
+                'deals': self.seed_deals(users, contacts, properties, total // 2),
+                'tasks': self.seed_tasks(users, total // 4),
+                'events': self.seed_events(users, total // 4),
+            }
+
+        for org in orgs:
+            rollups.rebuild_organization_rollup(org.id)
+            cells.rebuild(org.id)
+        for user in users:
+            rollups.rebuild_user_deal_rollup(user.id)
+        # bulk_create skips the signals that keep search documents current
+        org_ids = [org.id for org in orgs]
+        for model in (Contact, Property, Transaction):
+            reindex(model.objects.filter(organization_id__in=org_ids), self.batch_size)
+
+        summary = ', '.join(f"{count} {name}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(orgs)} organizations, {len(users)} agents, {summary}. "
+            f"Agents log in as e.g. '{users[0].username}' with password '{options['password']}'."
+        ))
+
+    # --- Helpers ---
+
+    def created_at(self):
+        return self.now - timedelta(seconds=self.rng.randrange(self.history_days * 86400))
+
+    def money(self, low, high):
+        return Decimal(self.rng.randrange(low, high)) * 1000
+
+    def pick_stage(self, weights):
+        return self.rng.choices(list(weights), weights=list(weights.values()))[0]
+
+    def insert(self, model, rows, on_batch=None):
+        """
+        Bulk insert ``rows`` (an iterable) in batches. Only ``on_batch`` sees
+        the saved objects, so memory stays bounded by the batch size.
+        """
+        total, batch = 0, []
+
+        def flush():
+            saved = model.objects.bulk_create(batch)
+            if on_batch:
+                on_batch(saved)
+            return len(saved)
+
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                total += flush()
+                batch = []
+        if batch:
+            total += flush()
+        self.stdout.write(f"  {model.__name__}: {total}")
+        return total
+
+    def collect(self, model, rows, key, value):
+        """Insert ``rows`` and return ``{key(obj): [value(obj), ...]}`` for the saved objects."""
+        grouped = {}
+
+        def on_batch(saved):
+            for obj in saved:
+                grouped.setdefault(key(obj), []).append(value(obj))
+        self.insert(model, rows, on_batch)
+        return grouped
+
+    def spread(self, count, owners):
+        """Assign ``count`` rows round-robin across ``owners``."""
+        for index in range(count):
+            yield owners[index % len(owners)]
+
+    # --- Tables ---
+
+    def seed_organizations(self, count):
+        return Organization.objects.bulk_create(
+            [Organization(name=f"Synthetic Agency {index + 1}", created_at=self.now - timedelta(days=self.history_days))
+             for index in range(count)],
+            batch_size=self.batch_size,
+        )
+
+    def seed_users(self, orgs, agents_per_org, password):
+        password_hash = make_password(password)
+        return User.objects.bulk_create([
+            User(
+                username=f"{self.prefix}-org{org.id}-agent{index + 1}",
+                email=f"{self.prefix}-org{org.id}-agent{index + 1}@example.com",
+                first_name=self.rng.choice(FIRST_NAMES),
+                last_name=self.rng.choice(LAST_NAMES),
+                password=password_hash,
+                organization=org,
+                role='admin' if index == 0 else 'agent',
+                date_joined=self.created_at(),
+            )
+            for org in orgs for index in range(agents_per_org)
+        ], batch_size=self.batch_size)
+
+    def seed_config(self, orgs):
+        types = self.collect(TransactionType, (
+            TransactionType(organization=org, name=name, created_at=org.created_at)
+            for org in orgs for name in TRANSACTION_TYPES
+        ), key=lambda obj: obj.organization_id, value=lambda obj: obj.id)
+        statuses = self.collect(TransactionStatus, (
+            TransactionStatus(organization=org, name=name, step_order=index)
+            for org in orgs for index, name in enumerate(TRANSACTION_STATUSES)
+        ), key=lambda obj: obj.organization_id, value=lambda obj: obj.id)
+        self.insert(DateDefinition, (
+            DateDefinition(organization=org, name=name, is_milestone=milestone)
+            for org in orgs for name, milestone in DATE_DEFINITIONS
+        ))
+        return {'types': types, 'statuses': statuses}
+
+    def seed_contacts(self, orgs, count):
+        """Returns contact ids per organization."""
+        def rows():
+            for index, org in enumerate(self.spread(count, orgs)):
+                first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+                yield Contact(
+                    organization=org, first_name=first, last_name=last,
+                    email=f"{first.lower()}.{last.lower()}{index}@example.com",
+                    phone=f"555-{self.rng.randrange(10000):04d}",
+                    role=self.rng.choice(Contact.ROLE_CHOICES)[0],
+                    created_at=self.created_at(),
+                )
+        return self.collect(Contact, rows(), key=lambda obj: obj.organization_id, value=lambda obj: obj.id)
+
+    def seed_properties(self, orgs, count):
+        """Returns (id, address, list_price, property_type) per organization."""
+        property_types = [code for code, _ in Property.PROPERTY_TYPE_CHOICES]
+
+        def rows():
+            for index, org in enumerate(self.spread(count, orgs)):
+                city, state, latitude, longitude = self.rng.choice(CITIES)
+                # Spread over roughly 40 x 40 km around the center
+                latitude += self.rng.uniform(-0.2, 0.2)
+                longitude += self.rng.uniform(-0.25, 0.25)
+                yield Property(
+                    organization=org,
+                    address=f"{self.rng.randrange(1, 9999)} {self.rng.choice(STREETS)} #{index}",
+                    city=city, state=state, zip_code=f"{self.rng.randrange(10000, 99999)}",
+                    list_price=self.money(100, 2000),
+                    status=self.rng.choice(Property.STATUS_CHOICES)[0],
+                    property_type=self.rng.choice(property_types),
+                    bedrooms=self.rng.randrange(1, 6),
+                    bathrooms=Decimal(self.rng.randrange(2, 9)) / 2,
+                    square_feet=self.rng.randrange(600, 5000),
+                    latitude=latitude, longitude=longitude, geohash=Property.geohash_of(latitude, longitude),
+                    created_at=self.created_at(),
+                )
+        return self.collect(
+            Property, rows(), key=lambda obj: obj.organization_id,
+            value=lambda obj: (obj.id, obj.address, obj.list_price, obj.property_type),
+        )
+
+    def seed_transactions(self, orgs, contacts, properties, config, count):
+        def rows():
+            for org in self.spread(count, orgs):
+                property_id, address, price, property_type = self.rng.choice(properties[org.id])
+                stage = self.pick_stage(STAGE_WEIGHTS)
+                created_at = self.created_at()
+                close_date = None
+                if stage in ('Closed Won', 'Closed Lost', 'Under Contract'):
+                    close_date = (created_at + timedelta(days=self.rng.randrange(15, 120))).date()
+                yield Transaction(
+                    organization=org, name=f"{address} - {stage}", property_id=property_id,
+                    contact_id=self.rng.choice(contacts[org.id]),
+                    type_id=self.rng.choice(config['types'][org.id]),
+                    status_id=self.rng.choice(config['statuses'][org.id]),
+                    stage=stage, value=price, close_date=close_date,
+                    commission_rate=Decimal(self.rng.choice([200, 250, 275, 300])) / 100,
+                    property_type=property_type,
+                    created_at=created_at,
+                )
+
+        def history(saved):
+            # Entry into the current stage, as the signals would have written it
+            StageHistory.objects.bulk_create([
+                StageHistory(
+                    model='transaction', object_id=txn.id, organization_id=txn.organization_id,
+                    to_stage=txn.stage, changed_at=txn.created_at,
+                )
+                for txn in saved
+            ])
+        return self.insert(Transaction, rows(), on_batch=history)
+
+    def seed_deals(self, users, contacts, properties, count):
+        organizations = {user.id: user.organization_id for user in users}
+
+        def rows():
+            for user in self.spread(count, users):
+                stage = self.pick_stage(DEAL_STAGE_WEIGHTS)
+                created_at = self.created_at()
+                yield Deal(
+                    user=user, title=f"Deal {self.rng.randrange(100000)}",
+                    contact_id=self.rng.choice(contacts[user.organization_id]),
+                    property_id=self.rng.choice(properties[user.organization_id])[0],
+                    stage=stage, value=self.money(100, 2000),
+                    probability=self.rng.choice([10, 25, 50, 75, 90]),
+                    closing_date=(created_at + timedelta(days=self.rng.randrange(30, 180))).date(),
+                    created_at=created_at,
+                )
+
+        def history(saved):
+            StageHistory.objects.bulk_create([
+                StageHistory(
+                    model='deal', object_id=deal.id, user_id=deal.user_id,
+                    organization_id=organizations[deal.user_id], to_stage=deal.stage,
+                    changed_at=deal.created_at,
+                )
+                for deal in saved
+            ])
+        return self.insert(Deal, rows(), on_batch=history)
+
+    def seed_tasks(self, users, count):
+        return self.insert(Task, (
+            Task(
+                organization_id=user.organization_id, user=user,
+                title=f"Follow up #{index}", is_completed=self.rng.random() < 0.6,
+                due_date=self.created_at() + timedelta(days=7), created_at=self.created_at(),
+            )
+            for index, user in enumerate(self.spread(count, users))
+        ))
+
+    def seed_events(self, users, count):
+        return self.insert(Event, (
+            Event(
+                organization_id=user.organization_id, user=user,
+                title=f"Appointment #{index}",
+                start_time=self.now + timedelta(hours=self.rng.randrange(-24 * 365, 24 * 60)),
+                type=self.rng.choice(Event.TYPE_CHOICES)[0], created_at=self.created_at(),
+            )
+            for index, user in enumerate(self.spread(count, users))
+        ))
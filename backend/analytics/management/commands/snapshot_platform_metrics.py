@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics import platform
+
+
+class Command(BaseCommand):
+    help = (
+        "Record today's platform totals (agents, organizations, deals, transactions, active users) "
+        "for the admin dashboard. Run it daily; reruns on the same day replace the day's row."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backfill', type=int, default=0, metavar='DAYS',
+            help="Also reconstruct the DAYS days before today from creation dates, where missing.",
+        )
+
+    def handle(self, *args, **options):
+        if options['backfill'] < 0:
+            raise CommandError("--backfill must not be negative.")
+        if options['backfill']:
+            added = platform.backfill(options['backfill'])
+            self.stdout.write(f"Backfilled {added} day(s).")
+        row = platform.snapshot()
+        self.stdout.write(self.style.SUCCESS(
+            f"{row.date}: {row.agents} agents, {row.organizations} organizations, {row.deals} deals, "
+            f"{row.transactions} transactions, {row.active_users} active users."
+        ))
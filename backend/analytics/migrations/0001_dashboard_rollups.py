@@ -0,0 +1,54 @@
+# Generated by Django 6.0.2 on 2026-10-17 22:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrganizationRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_sales_volume', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('total_transactions', models.IntegerField(default=0)),
+                ('commission_due', models.DecimalField(decimal_places=6, default=0, max_digits=21)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('organization', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='dashboard_rollup', to='accounts.organization')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserDealRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('active_value', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('active_count', models.IntegerField(default=0)),
+                ('won', models.IntegerField(default=0)),
+                ('lost', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='deal_rollup', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OrganizationYearRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('closed_volume', models.DecimalField(decimal_places=2, default=0, help_text='Closed Won value by close_date year', max_digits=15)),
+                ('transactions_created', models.IntegerField(default=0, help_text='Transactions by created_at year')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dashboard_year_rollups', to='accounts.organization')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('organization', 'year'), name='unique_org_year_rollup')],
+            },
+        ),
+    ]
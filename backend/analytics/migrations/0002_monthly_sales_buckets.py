@@ -0,0 +1,47 @@
+# Generated by Django 6.0.2 on 2026-10-17 22:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('analytics', '0001_dashboard_rollups'),
+        ('core_config', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlySalesBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('stage', models.CharField(max_length=50)),
+                ('property_type', models.CharField(blank=True, max_length=50, null=True)),
+                ('closed_volume', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('commission', models.DecimalField(decimal_places=6, default=0, max_digits=21)),
+                ('closed_won', models.IntegerField(default=0)),
+                ('closed_lost', models.IntegerField(default=0)),
+                ('new_transactions', models.IntegerField(default=0)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_buckets', to='accounts.organization')),
+                ('type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core_config.transactiontype')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['organization', 'month'], name='sales_bucket_org_month_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthlySalesPeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('computed_at', models.DateTimeField(auto_now_add=True)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_periods', to='accounts.organization')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('organization', 'month'), name='unique_org_sales_period')],
+            },
+        ),
+    ]
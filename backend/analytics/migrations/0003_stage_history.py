@@ -0,0 +1,67 @@
+# Generated by Django 6.0.2 on 2026-10-17 22:17
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_current_stages(apps, schema_editor):
+    """Seed each existing transaction/deal with the stage it is in now, entered at creation."""
+    StageHistory = apps.get_model('analytics', 'StageHistory')
+    Transaction = apps.get_model('transactions', 'Transaction')
+    Deal = apps.get_model('deals', 'Deal')
+
+    batch = []
+    rows = Transaction.objects.values_list('id', 'organization_id', 'stage', 'created_at')
+    for object_id, org_id, stage, created_at in rows.iterator(chunk_size=2000):
+        batch.append(StageHistory(
+            model='transaction', object_id=object_id, organization_id=org_id,
+            to_stage=stage, changed_at=created_at,
+        ))
+        if len(batch) >= 2000:
+            StageHistory.objects.bulk_create(batch)
+            batch = []
+
+    rows = Deal.objects.values_list('id', 'user_id', 'user__organization_id', 'stage', 'created_at')
+    for object_id, user_id, org_id, stage, created_at in rows.iterator(chunk_size=2000):
+        batch.append(StageHistory(
+            model='deal', object_id=object_id, user_id=user_id, organization_id=org_id,
+            to_stage=stage, changed_at=created_at,
+        ))
+        if len(batch) >= 2000:
+            StageHistory.objects.bulk_create(batch)
+            batch = []
+    StageHistory.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('analytics', '0002_monthly_sales_buckets'),
+        ('deals', '0004_alter_deal_title'),
+        ('transactions', '0005_transaction_detailed_status_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StageHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(choices=[('transaction', 'Transaction'), ('deal', 'Deal')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('from_stage', models.CharField(blank=True, default='', max_length=50)),
+                ('to_stage', models.CharField(max_length=50)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('organization', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stage_history', to='accounts.organization')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Stage history',
+                'indexes': [models.Index(fields=['organization', 'model', 'changed_at'], name='stage_hist_org_changed_idx'), models.Index(fields=['model', 'object_id', 'changed_at'], name='stage_hist_object_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_current_stages, migrations.RunPython.noop),
+    ]
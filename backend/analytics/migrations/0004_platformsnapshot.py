@@ -0,0 +1,27 @@
+# Generated by Django 6.0.2 on 2026-10-17 16:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_stage_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('agents', models.IntegerField(default=0)),
+                ('new_agents', models.IntegerField(default=0, help_text='Users who joined that day')),
+                ('organizations', models.IntegerField(default=0)),
+                ('deals', models.IntegerField(default=0)),
+                ('transactions', models.IntegerField(default=0, help_text='Live and archived')),
+                ('active_users', models.IntegerField(blank=True, help_text='Users who logged in within PLATFORM_ACTIVE_DAYS; unknown for backfilled days', null=True)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
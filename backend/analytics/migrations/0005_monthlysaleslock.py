@@ -0,0 +1,22 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_delete_scopeversion'),
+        ('analytics', '0004_platformsnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlySalesLock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('organization', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='sales_lock', to='accounts.organization')),
+            ],
+        ),
+    ]
@@ -1,3 +1,134 @@
 from django.db import models
+from django.conf import settings
+from django.utils import timezone
+from accounts.models import Organization
 
-# Create your models here.
+class OrganizationRollup(models.Model):
+    """Lifetime dashboard counters for an organization, maintained by delta."""
+    organization = models.OneToOneField(Organization, on_delete=models.CASCADE, related_name='dashboard_rollup')
+    total_sales_volume = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    total_transactions = models.IntegerField(default=0)
+    # value * rate / 100 is exact at 6 decimal places; rounded when served
+    commission_due = models.DecimalField(max_digits=21, decimal_places=6, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Rollup ({self.organization_id})"
+
+class OrganizationYearRollup(models.Model):
+    """Per-year dashboard counters for an organization."""
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='dashboard_year_rollups')
+    year = models.IntegerField()
+    closed_volume = models.DecimalField(max_digits=15, decimal_places=2, default=0, help_text="Closed Won value by close_date year")
+    transactions_created = models.IntegerField(default=0, help_text="Transactions by created_at year")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['organization', 'year'], name='unique_org_year_rollup'),
+        ]
+
+    def __str__(self):
+        return f"Rollup ({self.organization_id}, {self.year})"
+
+class UserDealRollup(models.Model):
+    """Pipeline counters for a user's deals, maintained by delta."""
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='deal_rollup')
+    active_value = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    active_count = models.IntegerField(default=0)
+    won = models.IntegerField(default=0)
+    lost = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Deal rollup ({self.user_id})"
+
+class MonthlySalesLock(models.Model):
+    """
+    Row locked while an organization's closed months are materialized or
+    invalidated, so the two serialize without locking the Organization row.
+    """
+    organization = models.OneToOneField(Organization, on_delete=models.CASCADE, related_name='sales_lock')
+
+    def __str__(self):
+        return f"Sales lock ({self.organization_id})"
+
+class MonthlySalesPeriod(models.Model):
+    """Marks a closed month whose buckets have been materialized for an organization."""
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='sales_periods')
+    month = models.DateField(help_text="First day of the month")
+    computed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['organization', 'month'], name='unique_org_sales_period'),
+        ]
+
+    def __str__(self):
+        return f"{self.organization_id} {self.month:%Y-%m}"
+
+class MonthlySalesBucket(models.Model):
+    """Transaction counters for one month, split by the dimensions the time series filters on."""
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='sales_buckets')
+    month = models.DateField(help_text="First day of the month")
+    stage = models.CharField(max_length=50)
+    type = models.ForeignKey('core_config.TransactionType', on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    property_type = models.CharField(max_length=50, blank=True, null=True)
+
+    # By close_date month
+    closed_volume = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    commission = models.DecimalField(max_digits=21, decimal_places=6, default=0)
+    closed_won = models.IntegerField(default=0)
+    closed_lost = models.IntegerField(default=0)
+    # By created_at month
+    new_transactions = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['organization', 'month'], name='sales_bucket_org_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.organization_id} {self.month:%Y-%m} {self.stage}"
+
+class StageHistory(models.Model):
+    """Append-only log of stage changes on transactions and deals."""
+    MODEL_CHOICES = [
+        ('transaction', 'Transaction'),
+        ('deal', 'Deal'),
+    ]
+
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, null=True, blank=True, related_name='stage_history')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    # Not a foreign key: history outlives the row and spans two tables
+    object_id = models.BigIntegerField()
+    from_stage = models.CharField(max_length=50, blank=True, default='')
+    to_stage = models.CharField(max_length=50)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = "Stage history"
+        indexes = [
+            models.Index(fields=['organization', 'model', 'changed_at'], name='stage_hist_org_changed_idx'),
+            models.Index(fields=['model', 'object_id', 'changed_at'], name='stage_hist_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id}: {self.from_stage or '-'} -> {self.to_stage}"
+
+class PlatformSnapshot(models.Model):
+    """Platform-wide totals at the end of one day, written by the snapshot_platform_metrics command."""
+    date = models.DateField(unique=True)
+    agents = models.IntegerField(default=0)
+    new_agents = models.IntegerField(default=0, help_text="Users who joined that day")
+    organizations = models.IntegerField(default=0)
+    deals = models.IntegerField(default=0)
+    transactions = models.IntegerField(default=0, help_text="Live and archived")
+    active_users = models.IntegerField(
+        null=True, blank=True,
+        help_text="Users who logged in within PLATFORM_ACTIVE_DAYS; unknown for backfilled days",
+    )
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Platform {self.date}"
@@ -0,0 +1,130 @@
+"""
+Platform-wide growth metrics for the admin dashboard.
+
+Counting every user, deal and transaction on each ``SystemStatsView`` call
+scans tables that grow with the platform. Instead ``snapshot()`` counts them
+once (the ``snapshot_platform_metrics`` command, run daily or more often)
+into the day's ``PlatformSnapshot`` row, and the view reads the latest row
+and the days before it: a short range of the unique date index, whatever
+the platform's size. Each snapshot also recounts the previous snapshot's
+new agents, so users who join after a day's last run still count.
+
+``backfill()`` reconstructs earlier days from creation timestamps with one
+grouped query per table. Rows deleted since are missing from those totals,
+and logins are only known as of now, so backfilled days have no active-user
+count. Existing snapshots are kept.
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from accounts.models import Organization
+from deals.models import Deal
+from transactions.models import ArchivedTransaction, Transaction
+from .models import PlatformSnapshot
+
+User = get_user_model()
+
+DEFAULT_HISTORY_DAYS = 30
+MAX_HISTORY_DAYS = 366
+SERIES_FIELDS = ('date', 'agents', 'new_agents', 'organizations', 'deals', 'transactions', 'active_users')
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _sources():
+    """``(metric, queryset, creation timestamp field)`` for each cumulative total."""
+    return [
+        ('agents', User.objects.all(), 'date_joined'),
+        ('organizations', Organization.objects.all(), 'created_at'),
+        ('deals', Deal.objects.all(), 'created_at'),
+        ('transactions', Transaction.objects.all(), 'created_at'),
+        ('transactions', ArchivedTransaction.objects.all(), 'created_at'),
+    ]
+
+
+def _joined_on(day):
+    return User.objects.filter(
+        date_joined__gte=_day_start(day), date_joined__lt=_day_start(day + timedelta(days=1)),
+    ).count()
+
+
+def snapshot(day=None):
+    """
+    Record the current totals as ``day``'s snapshot (default today),
+    replacing an earlier one, and finalize the previous snapshot's new agents.
+    """
+    day = day or timezone.localdate()
+    now = timezone.now()
+    values = {'agents': 0, 'organizations': 0, 'deals': 0, 'transactions': 0}
+    for metric, queryset, _field in _sources():
+        values[metric] += queryset.count()
+    values['new_agents'] = _joined_on(day)
+    active_days = getattr(settings, 'PLATFORM_ACTIVE_DAYS', 30)
+    values['active_users'] = User.objects.filter(last_login__gte=now - timedelta(days=active_days)).count()
+
+    # The previous snapshot was taken before its day ended: count the rest of
+    # the day's joins. Any earlier one was finalized by the snapshot after it.
+    previous = PlatformSnapshot.objects.filter(date__lt=day).order_by('-date').first()
+    if previous is not None:
+        PlatformSnapshot.objects.filter(pk=previous.pk).update(new_agents=_joined_on(previous.date))
+    row, _created = PlatformSnapshot.objects.update_or_create(date=day, defaults=values)
+    return row
+
+
+def backfill(days, today=None):
+    """Add snapshots for the ``days`` days before ``today`` that have none; returns how many were added."""
+    today = today or timezone.localdate()
+    first = today - timedelta(days=days)
+    totals = {day: dict.fromkeys(('agents', 'organizations', 'deals', 'transactions'), 0)
+              for day in (first + timedelta(days=n) for n in range(days))}
+    new_agents = {}
+    for metric, queryset, field in _sources():
+        before = queryset.filter(**{f'{field}__lt': _day_start(first)}).count()
+        created = dict(
+            queryset.filter(**{f'{field}__gte': _day_start(first), f'{field}__lt': _day_start(today)})
+            .annotate(day=TruncDate(field)).order_by('day').values('day')
+            .annotate(count=Count('pk')).values_list('day', 'count')
+        )
+        if metric == 'agents':
+            new_agents = created
+        running = before
+        for day in sorted(totals):
+            running += created.get(day, 0)
+            totals[day][metric] += running
+
+    rows = [
+        PlatformSnapshot(date=day, new_agents=new_agents.get(day, 0), active_users=None, **values)
+        for day, values in totals.items()
+    ]
+    existing = set(PlatformSnapshot.objects.filter(date__in=list(totals)).values_list('date', flat=True))
+    added = [row for row in rows if row.date not in existing]
+    PlatformSnapshot.objects.bulk_create(added)
+    return len(added)
+
+
+def latest():
+    """The most recent snapshot, taking one if there is none yet."""
+    return PlatformSnapshot.objects.order_by('-date').first() or snapshot()
+
+
+def history(until, days):
+    """Snapshot values of the ``days`` days up to ``until``, oldest first."""
+    return list(
+        PlatformSnapshot.objects.filter(date__gt=until - timedelta(days=days), date__lte=until)
+        .order_by('date').values(*SERIES_FIELDS)
+    )
+
+
+def new_agents_since(until, days):
+    """Users who joined in the ``days`` days up to ``until``, from the snapshots."""
+    total = PlatformSnapshot.objects.filter(
+        date__gt=until - timedelta(days=days), date__lte=until,
+    ).aggregate(total=Sum('new_agents'))['total']
+    return total or 0
@@ -0,0 +1,333 @@
+"""
+Dashboard counters.
+
+The ``compute_*`` helpers aggregate straight from the source tables. The
+rollup tables hold the same counters and are kept current by applying the
+difference between a row's old and new state on every save/delete (see
+``analytics.signals``), so the dashboard reads a single row per
+organization/user no matter how much history sits behind it.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Sum, Count, Q, F, DecimalField, ExpressionWrapper, OuterRef, Subquery
+from django.db.models.functions import ExtractYear
+from django.utils import timezone
+
+from transactions.models import Transaction
+from deals.models import Deal
+from .models import OrganizationRollup, OrganizationYearRollup, UserDealRollup
+
+# Stage buckets shared by the dashboard aggregates
+PENDING_TRANSACTION_STAGES = ['Active', 'Under Contract']
+ACTIVE_DEAL_STAGES = ['NEW', 'NEGOTIATION', 'UNDER_CONTRACT']
+CLOSED_DEAL_STAGES = ['CLOSED_WON', 'CLOSED_LOST']
+
+# Row fields the rollups and monthly buckets depend on
+TRANSACTION_FIELDS = (
+    'organization_id', 'stage', 'value', 'commission_rate', 'close_date', 'created_at',
+    'type_id', 'property_type',
+)
+DEAL_FIELDS = ('user_id', 'stage', 'value')
+
+ZERO = Decimal('0')
+CENTS = Decimal('0.01')
+
+# value * (commission_rate / 100), evaluated by the database
+COMMISSION_EXPRESSION = ExpressionWrapper(
+    F('value') * F('commission_rate') / 100,
+    output_field=DecimalField(max_digits=21, decimal_places=6),
+)
+
+
+# --- Aggregation over the source tables ---
+
+def deal_pipeline(deals):
+    """Pipeline counters for a Deal queryset in a single query."""
+    return deals.aggregate(
+        active_value=Sum('value', filter=Q(stage__in=ACTIVE_DEAL_STAGES)),
+        won=Count('id', filter=Q(stage='CLOSED_WON')),
+        lost=Count('id', filter=Q(stage='CLOSED_LOST')),
+        active_count=Count('id', filter=~Q(stage__in=CLOSED_DEAL_STAGES)),
+    )
+
+
+def win_rate(won, lost):
+    # Win Rate (Closed Won / (Closed Won + Closed Lost))
+    total_closed = won + lost
+    return round((won / total_closed * 100), 1) if total_closed > 0 else 0
+
+
+def compute_organization_rollup(org_id):
+    """Recompute an organization's lifetime and per-year counters from scratch."""
+    transactions = Transaction.objects.filter(organization_id=org_id)
+    closed_won = Q(stage='Closed Won')
+    totals = transactions.aggregate(
+        total_sales_volume=Sum('value', filter=closed_won),
+        total_transactions=Count('id'),
+        commission_due=Sum(COMMISSION_EXPRESSION, filter=Q(stage__in=PENDING_TRANSACTION_STAGES)),
+    )
+    totals = {field: value or 0 for field, value in totals.items()}
+
+    years = defaultdict(_empty_year)
+    closed = (
+        transactions.filter(closed_won, close_date__isnull=False)
+        .values(year=ExtractYear('close_date')).annotate(volume=Sum('value')).order_by()
+    )
+    for row in closed:
+        years[row['year']]['closed_volume'] = row['volume'] or 0
+    created = transactions.values(year=ExtractYear('created_at')).annotate(count=Count('id')).order_by()
+    for row in created:
+        years[row['year']]['transactions_created'] = row['count']
+    return totals, dict(years)
+
+
+def compute_user_deal_rollup(user_id):
+    """Recompute a user's pipeline counters from scratch."""
+    pipeline = deal_pipeline(Deal.objects.filter(user_id=user_id))
+    return {field: value or 0 for field, value in pipeline.items()}
+
+
+# --- Per-row contributions ---
+
+def _decimal(value):
+    return Decimal(str(value)) if value is not None else ZERO
+
+
+def _empty_year():
+    return {'closed_volume': ZERO, 'transactions_created': 0}
+
+
+def transaction_contribution(row):
+    """Counters a single Transaction row adds to its organization's rollups."""
+    years = defaultdict(_empty_year)
+    if row is None:
+        return {}, years
+
+    value = _decimal(row['value'])
+    totals = {'total_transactions': 1, 'total_sales_volume': ZERO, 'commission_due': ZERO}
+    if row['stage'] == 'Closed Won':
+        totals['total_sales_volume'] = value
+        if row['close_date']:
+            years[row['close_date'].year]['closed_volume'] += value
+    if row['stage'] in PENDING_TRANSACTION_STAGES:
+        totals['commission_due'] = value * _decimal(row['commission_rate']) / 100
+    if row['created_at']:
+        years[timezone.localtime(row['created_at']).year]['transactions_created'] += 1
+    return totals, years
+
+
+def deal_contribution(row):
+    """Counters a single Deal row adds to its owner's pipeline rollup."""
+    if row is None:
+        return {}
+    stage = row['stage']
+    return {
+        'active_value': _decimal(row['value']) if stage in ACTIVE_DEAL_STAGES else ZERO,
+        'active_count': int(stage not in CLOSED_DEAL_STAGES),
+        'won': int(stage == 'CLOSED_WON'),
+        'lost': int(stage == 'CLOSED_LOST'),
+    }
+
+
+def _subtract(after, before):
+    return {field: after.get(field, 0) - before.get(field, 0) for field in after.keys() | before.keys()}
+
+
+def _add(total, delta):
+    return {field: total.get(field, 0) + delta.get(field, 0) for field in total.keys() | delta.keys()}
+
+
+def _has_changes(delta):
+    return any(delta.values())
+
+
+def _increments(delta):
+    return {field: F(field) + amount for field, amount in delta.items() if amount}
+
+
+def _increment_or_create(model, lookup, delta):
+    increments = _increments(delta)
+    if model.objects.filter(**lookup).update(**increments):
+        return
+    try:
+        with db_transaction.atomic():
+            model.objects.create(**lookup, **delta)
+    except IntegrityError:
+        # Lost a race with a concurrent insert; the row exists now.
+        model.objects.filter(**lookup).update(**increments)
+
+
+def _rows_for(key, value, *rows):
+    return [row if row is not None and row[key] == value else None for row in rows]
+
+
+# --- Delta maintenance ---
+
+def apply_transaction_change(before, after):
+    """
+    Apply the difference between two states of a Transaction row.
+
+    ``before`` is None for inserts and ``after`` is None for deletes. A missing
+    organization rollup is rebuilt from the table (which already reflects the
+    change) rather than seeded from a partial delta; deletes never create one.
+    """
+    apply_transaction_changes([(before, after)])
+
+
+def apply_transaction_changes(changes):
+    """
+    ``apply_transaction_change`` for many ``(before, after)`` pairs at once:
+    the differences are summed per organization and applied with one update
+    of its rollup, plus one per year they touch.
+    """
+    totals = defaultdict(dict)
+    years = defaultdict(lambda: defaultdict(dict))
+    # Organizations some row still belongs to after the change
+    present = set()
+    for before, after in changes:
+        for org_id in {row['organization_id'] for row in (before, after) if row is not None}:
+            old, new = _rows_for('organization_id', org_id, before, after)
+            old_totals, old_years = transaction_contribution(old)
+            new_totals, new_years = transaction_contribution(new)
+            totals[org_id] = _add(totals[org_id], _subtract(new_totals, old_totals))
+            for year in old_years.keys() | new_years.keys():
+                years[org_id][year] = _add(years[org_id][year], _subtract(new_years[year], old_years[year]))
+            if new is not None:
+                present.add(org_id)
+
+    for org_id, org_totals in totals.items():
+        org_years = {year: delta for year, delta in years[org_id].items() if _has_changes(delta)}
+        if not _has_changes(org_totals) and not org_years:
+            continue
+
+        with db_transaction.atomic():
+            updated = OrganizationRollup.objects.filter(organization_id=org_id).update(
+                updated_at=timezone.now(), **_increments(org_totals)
+            )
+            if not updated:
+                if org_id in present:
+                    rebuild_organization_rollup(org_id)
+                continue
+            for year, delta in org_years.items():
+                _increment_or_create(OrganizationYearRollup, {'organization_id': org_id, 'year': year}, delta)
+
+
+def apply_deal_change(before, after):
+    """Apply the difference between two states of a Deal row (see apply_transaction_change)."""
+    user_ids = {row['user_id'] for row in (before, after) if row is not None}
+    for user_id in user_ids:
+        old, new = _rows_for('user_id', user_id, before, after)
+        delta = _subtract(deal_contribution(new), deal_contribution(old))
+        if not _has_changes(delta):
+            continue
+        updated = UserDealRollup.objects.filter(user_id=user_id).update(
+            updated_at=timezone.now(), **_increments(delta)
+        )
+        if not updated and new is not None:
+            rebuild_user_deal_rollup(user_id)
+
+
+# --- Rebuild and drift checks ---
+
+def rebuild_organization_rollup(org_id):
+    totals, years = compute_organization_rollup(org_id)
+    with db_transaction.atomic():
+        OrganizationRollup.objects.update_or_create(organization_id=org_id, defaults=totals)
+        OrganizationYearRollup.objects.filter(organization_id=org_id).exclude(year__in=years).delete()
+        for year, counters in years.items():
+            OrganizationYearRollup.objects.update_or_create(
+                organization_id=org_id, year=year, defaults=counters
+            )
+
+
+def rebuild_user_deal_rollup(user_id):
+    counters = compute_user_deal_rollup(user_id)
+    UserDealRollup.objects.update_or_create(user_id=user_id, defaults=counters)
+    return counters
+
+
+def _normalize(value):
+    return _decimal(value).quantize(CENTS)
+
+
+def _compare(label, stored, actual):
+    return [
+        f"{label} {field}: stored={_normalize(stored.get(field))} actual={_normalize(value)}"
+        for field, value in actual.items()
+        if _normalize(stored.get(field)) != _normalize(value)
+    ]
+
+
+def organization_drift(org_id):
+    """
+    Describe every counter whose stored value disagrees with the source tables.
+
+    Organizations without a rollup are not drifted; it is built on first read.
+    """
+    rollup = OrganizationRollup.objects.filter(organization_id=org_id).values().first()
+    if rollup is None:
+        return []
+    totals, years = compute_organization_rollup(org_id)
+    problems = _compare(f"organization={org_id}", rollup, totals)
+
+    stored_years = {
+        row['year']: row
+        for row in OrganizationYearRollup.objects.filter(organization_id=org_id).values()
+    }
+    for year in stored_years.keys() | years.keys():
+        problems += _compare(
+            f"organization={org_id} year={year}", stored_years.get(year, {}), years.get(year, _empty_year())
+        )
+    return problems
+
+
+def user_deal_drift(user_id):
+    rollup = UserDealRollup.objects.filter(user_id=user_id).values().first()
+    if rollup is None:
+        return []
+    return _compare(f"user={user_id}", rollup, compute_user_deal_rollup(user_id))
+
+
+# --- Dashboard reads ---
+
+def organization_dashboard_totals(org_id, current_year):
+    """Financial counters for the dashboard, read from the rollup in one query."""
+    if org_id is None:
+        return {
+            'total_sales_volume': 0, 'total_transactions': 0, 'current_year_volume': 0,
+            'current_year_transactions': 0, 'commission_due': 0,
+        }
+
+    year_rollup = OrganizationYearRollup.objects.filter(
+        organization_id=OuterRef('organization_id'), year=current_year
+    )
+    rollup = OrganizationRollup.objects.filter(organization_id=org_id).annotate(
+        current_year_volume=Subquery(year_rollup.values('closed_volume')[:1]),
+        current_year_transactions=Subquery(year_rollup.values('transactions_created')[:1]),
+    ).values(
+        'total_sales_volume', 'total_transactions', 'commission_due',
+        'current_year_volume', 'current_year_transactions',
+    ).first()
+    if rollup is None:
+        rebuild_organization_rollup(org_id)
+        return organization_dashboard_totals(org_id, current_year)
+
+    return {
+        'total_sales_volume': rollup['total_sales_volume'],
+        'total_transactions': rollup['total_transactions'],
+        'current_year_volume': _decimal(rollup['current_year_volume']).quantize(CENTS),
+        'current_year_transactions': rollup['current_year_transactions'] or 0,
+        'commission_due': rollup['commission_due'].quantize(CENTS),
+    }
+
+
+def user_pipeline(user_id):
+    """Pipeline counters for the dashboard, read from the user's rollup."""
+    rollup = UserDealRollup.objects.filter(user_id=user_id).values(
+        'active_value', 'active_count', 'won', 'lost'
+    ).first()
+    if rollup is None:
+        return rebuild_user_deal_rollup(user_id)
+    return rollup
@@ -0,0 +1,89 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from transactions.models import Transaction
+from transactions.signals import bulk_deleted, bulk_saved
+from deals.models import Deal
+from . import funnel, rollups, timeseries
+
+
+def previous_state(sender, instance, fields):
+    """The row as currently stored, or None for an insert."""
+    if instance.pk is None:
+        return None
+    return sender._base_manager.filter(pk=instance.pk).values(*fields).first()
+
+
+def current_state(instance, fields):
+    return {field: getattr(instance, field) for field in fields}
+
+
+@receiver(pre_save, sender=Transaction)
+def capture_transaction_state(sender, instance, **kwargs):
+    instance._previous_state = previous_state(sender, instance, rollups.TRANSACTION_FIELDS)
+
+
+@receiver(post_save, sender=Transaction)
+def transaction_saved(sender, instance, **kwargs):
+    before = getattr(instance, '_previous_state', None)
+    after = current_state(instance, rollups.TRANSACTION_FIELDS)
+    rollups.apply_transaction_change(before, after)
+    timeseries.invalidate_transaction_months(before, after)
+    from_stage = before['stage'] if before else ''
+    if from_stage != instance.stage:
+        funnel.record_stage_change('transaction', instance, from_stage, instance.organization_id)
+
+
+@receiver(post_delete, sender=Transaction)
+def transaction_deleted(sender, instance, **kwargs):
+    before = current_state(instance, rollups.TRANSACTION_FIELDS)
+    rollups.apply_transaction_change(before, None)
+    timeseries.invalidate_transaction_months(before, None)
+
+
+@receiver(bulk_saved, sender=Transaction)
+def transactions_bulk_saved(sender, objects, previous, restored=False, **kwargs):
+    changes, stage_changes = [], []
+    for obj in objects:
+        before = previous.get(obj.pk)
+        changes.append((
+            {field: before[field] for field in rollups.TRANSACTION_FIELDS} if before else None,
+            current_state(obj, rollups.TRANSACTION_FIELDS),
+        ))
+        from_stage = before['stage'] if before else ''
+        # Restored rows bring their stage history back with them.
+        if from_stage != obj.stage and not restored:
+            stage_changes.append((obj, from_stage, obj.organization_id, None))
+    # The rows' differences, summed into one update per organization
+    rollups.apply_transaction_changes(changes)
+    timeseries.invalidate_transaction_changes(changes)
+    funnel.record_stage_changes('transaction', stage_changes)
+
+
+@receiver(bulk_deleted, sender=Transaction)
+def transactions_bulk_deleted(sender, objects, **kwargs):
+    changes = [(current_state(obj, rollups.TRANSACTION_FIELDS), None) for obj in objects]
+    # The rows' contributions, summed into one update per organization
+    rollups.apply_transaction_changes(changes)
+    timeseries.invalidate_transaction_changes(changes)
+
+
+@receiver(pre_save, sender=Deal)
+def capture_deal_state(sender, instance, **kwargs):
+    instance._previous_state = previous_state(sender, instance, rollups.DEAL_FIELDS)
+
+
+@receiver(post_save, sender=Deal)
+def deal_saved(sender, instance, **kwargs):
+    before = getattr(instance, '_previous_state', None)
+    rollups.apply_deal_change(before, current_state(instance, rollups.DEAL_FIELDS))
+    from_stage = before['stage'] if before else ''
+    if from_stage != instance.stage:
+        funnel.record_stage_change(
+            'deal', instance, from_stage, funnel.deal_organization_id(instance), instance.user_id
+        )
+
+
+@receiver(post_delete, sender=Deal)
+def deal_deleted(sender, instance, **kwargs):
+    rollups.apply_deal_change(current_state(instance, rollups.DEAL_FIELDS), None)
@@ -1,3 +1,521 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from accounts.models import Organization
+from deals.models import Deal
+from realtor_crm_backend.testcases import OrganizationTestCase
+from transactions.models import Contact, Property, Transaction
+from . import platform, rollups, signals, timeseries
+from .management.commands import benchmark_endpoints
+from search.models import SearchDocument
+from transactions.signals import bulk_saved
+from .instrumentation import QueryRecorder, endpoint_stats
+from .models import MonthlySalesPeriod, OrganizationRollup, PlatformSnapshot, StageHistory, UserDealRollup
+
+User = get_user_model()
+
+
+class DashboardStatsTests(OrganizationTestCase):
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+        self.contact = self.make_contact()
+        self.property = self.make_property()
+
+    def make_transaction(self, **kwargs):
+        return Transaction.objects.create(
+            organization=self.org, name='Txn', property=self.property,
+            contact=self.contact, **kwargs
+        )
+
+    def make_deal(self, **kwargs):
+        return Deal.objects.create(user=self.user, contact=self.contact, property=self.property, **kwargs)
+
+    def test_financials_and_pipeline(self):
+        this_year = date.today().year
+        self.make_transaction(stage='Closed Won', value=Decimal('100000.00'), close_date=date(this_year, 1, 15))
+        self.make_transaction(stage='Closed Won', value=Decimal('50000.00'), close_date=date(this_year - 1, 6, 1))
+        self.make_transaction(stage='Active', value=Decimal('200000.00'), commission_rate=Decimal('3.00'))
+        self.make_transaction(stage='Under Contract', value=Decimal('100000.00'), commission_rate=Decimal('2.50'))
+        self.make_deal(stage='NEW', value=Decimal('1000.00'))
+        self.make_deal(stage='NEGOTIATION', value=Decimal('2000.00'))
+        self.make_deal(stage='CLOSED_WON', value=Decimal('3000.00'))
+        self.make_deal(stage='CLOSED_LOST', value=Decimal('4000.00'))
+        self.make_deal(stage='CLOSED_LOST', value=Decimal('5000.00'))
+
+        response = self.client.get(reverse('dashboard-stats'))
+        self.assertEqual(response.status_code, 200)
+
+        financials = response.data['financials']
+        self.assertEqual(financials['total_sales_volume'], Decimal('150000.00'))
+        self.assertEqual(financials['total_transactions'], 4)
+        self.assertEqual(financials['current_year_volume'], Decimal('100000.00'))
+        self.assertEqual(financials['current_year_transactions'], 4)
+        self.assertEqual(financials['commission_due'], Decimal('8500.00'))
+
+        pipeline = response.data['pipeline']
+        self.assertEqual(pipeline['active_value'], Decimal('3000.00'))
+        self.assertEqual(pipeline['win_rate'], 33.3)
+        self.assertEqual(pipeline['active_count'], 2)
+        self.assertEqual(len(response.data['recent_activity']), 4)
+
+    def test_empty_organization(self):
+        response = self.client.get(reverse('dashboard-stats'))
+        self.assertEqual(response.data['financials']['commission_due'], 0)
+        self.assertEqual(response.data['pipeline']['win_rate'], 0)
+        self.assertEqual(response.data['recent_activity'], [])
+
+    def test_query_count_is_constant(self):
+        for _ in range(10):
+            self.make_transaction(stage='Active', value=Decimal('1000.00'))
+            self.make_deal(stage='NEW', value=Decimal('1000.00'))
+
+        # ETag and cache key change counters, organization rollup,
+        # recent activity, deal rollup, today's events
+        with self.assertNumQueries(6):
+            self.client.get(reverse('dashboard-stats'))
+
+    def test_cached_until_organization_write(self):
+        first = self.client.get(reverse('dashboard-stats'))
+        self.assertEqual(first['X-Cache'], 'MISS')
+
+        # The change counters, for the ETag and the cache key
+        with self.assertNumQueries(2):
+            second = self.client.get(reverse('dashboard-stats'))
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+
+        self.make_transaction(stage='Closed Won', value=Decimal('100.00'))
+        third = self.client.get(reverse('dashboard-stats'))
+        self.assertEqual(third['X-Cache'], 'MISS')
+        self.assertEqual(third.data['financials']['total_transactions'], 1)
+
+    def test_cached_until_own_deal_write(self):
+        self.client.get(reverse('dashboard-stats'))
+        self.make_deal(stage='NEW', value=Decimal('1000.00'))
+        response = self.client.get(reverse('dashboard-stats'))
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['pipeline']['active_count'], 1)
+
+
+class DashboardRollupTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.org = Organization.objects.create(name="Rollup Agency")
+        self.user = User.objects.create_user(username='rollup', password='pass', organization=self.org)
+        self.contact = Contact.objects.create(
+            organization=self.org, first_name='Sam', last_name='Lee',
+            email='sam@example.com', phone='555-0101'
+        )
+        self.property = Property.objects.create(
+            organization=self.org, address='2 Oak Ave', city='Springfield',
+            state='IL', zip_code='62702', list_price=Decimal('300000.00')
+        )
+
+    def make_transaction(self, **kwargs):
+        return Transaction.objects.create(
+            organization=self.org, name='Txn', property=self.property,
+            contact=self.contact, **kwargs
+        )
+
+    def assertNoDrift(self):
+        self.assertEqual(rollups.organization_drift(self.org.id), [])
+        self.assertEqual(rollups.user_deal_drift(self.user.id), [])
+
+    def test_rollups_track_saves_and_deletes(self):
+        this_year = date.today().year
+        won = self.make_transaction(stage='Closed Won', value=Decimal('100000.00'), close_date=date(this_year, 2, 1))
+        pending = self.make_transaction(stage='Active', value=Decimal('200000.00'), commission_rate=Decimal('2.75'))
+        self.make_transaction(stage='Prospect')
+        deal = Deal.objects.create(user=self.user, stage='NEW', value=Decimal('5000.00'))
+        self.assertNoDrift()
+
+        pending.stage = 'Closed Won'
+        pending.close_date = date(this_year - 1, 12, 31)
+        pending.save()
+        won.delete()
+        deal.stage = 'CLOSED_WON'
+        deal.save()
+        self.assertNoDrift()
+
+        rollup = OrganizationRollup.objects.get(organization=self.org)
+        self.assertEqual(rollup.total_transactions, 2)
+        self.assertEqual(rollup.total_sales_volume, Decimal('200000.00'))
+        self.assertEqual(rollup.commission_due, 0)
+        self.assertEqual(UserDealRollup.objects.get(user=self.user).won, 1)
+
+    def test_bulk_writes_apply_summed_deltas(self):
+        this_year = date.today().year
+        self.make_transaction(stage='Active', value=Decimal('10.00'))
+        objects = Transaction.objects.bulk_create([
+            Transaction(organization=self.org, name=f'Bulk {n}', property=self.property, contact=self.contact,
+                        stage='Closed Won', value=Decimal('100.00'), close_date=date(this_year, 1, n + 1))
+            for n in range(5)
+        ])
+        with mock.patch.object(rollups, 'rebuild_organization_rollup') as rebuild:
+            bulk_saved.send(sender=Transaction, objects=objects, previous={})
+            previous = {obj.pk: signals.current_state(obj, rollups.TRANSACTION_FIELDS) for obj in objects}
+            for obj in objects:
+                obj.stage = 'Closed Lost'
+            Transaction.objects.bulk_update(objects[:2], ['stage'])
+            bulk_saved.send(sender=Transaction, objects=objects[:2], previous=previous)
+        # The organization's history is not re-aggregated
+        rebuild.assert_not_called()
+        self.assertNoDrift()
+        self.assertEqual(OrganizationRollup.objects.get(organization=self.org).total_sales_volume, Decimal('300.00'))
+
+    def test_check_command_reports_drift(self):
+        self.make_transaction(stage='Closed Won', value=Decimal('100.00'))
+        call_command('rebuild_dashboard_rollups', '--check', stdout=StringIO())
+
+        # Queryset updates bypass the signals
+        Transaction.objects.filter(organization=self.org).update(value=Decimal('999.00'))
+        with self.assertRaises(CommandError):
+            call_command('rebuild_dashboard_rollups', '--check', stdout=StringIO())
+
+        call_command('rebuild_dashboard_rollups', stdout=StringIO())
+        self.assertNoDrift()
+        self.assertEqual(OrganizationRollup.objects.get(organization=self.org).total_sales_volume, Decimal('999.00'))
+
+    def test_dashboard_builds_missing_rollup(self):
+        self.make_transaction(stage='Closed Won', value=Decimal('100.00'))
+        OrganizationRollup.objects.all().delete()
+
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse('dashboard-stats'))
+        self.assertEqual(response.data['financials']['total_sales_volume'], Decimal('100.00'))
+        self.assertTrue(OrganizationRollup.objects.filter(organization=self.org).exists())
+
+
+class SalesTimeseriesTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.org = Organization.objects.create(name="Series Agency")
+        self.user = User.objects.create_user(username='series', password='pass', organization=self.org)
+        self.contact = Contact.objects.create(
+            organization=self.org, first_name='Ann', last_name='Ray',
+            email='ann@example.com', phone='555-0102'
+        )
+        self.property = Property.objects.create(
+            organization=self.org, address='3 Elm St', city='Springfield',
+            state='IL', zip_code='62703', list_price=Decimal('400000.00')
+        )
+        self.client.force_authenticate(self.user)
+        self.this_month = timeseries.current_month()
+        self.last_month = timeseries.add_months(self.this_month, -1)
+
+    def make_transaction(self, **kwargs):
+        return Transaction.objects.create(
+            organization=self.org, name='Txn', property=self.property,
+            contact=self.contact, **kwargs
+        )
+
+    def series_by_month(self, **params):
+        response = self.client.get(reverse('analytics-timeseries'), params)
+        self.assertEqual(response.status_code, 200)
+        return {row['month']: row for row in response.data['series']}
+
+    def test_closed_and_open_months(self):
+        self.make_transaction(stage='Closed Won', value=Decimal('100000.00'), close_date=self.last_month, property_type='Condo')
+        self.make_transaction(stage='Closed Lost', value=Decimal('50000.00'), close_date=self.last_month)
+        self.make_transaction(stage='Closed Won', value=Decimal('20000.00'), close_date=self.this_month)
+
+        series = self.series_by_month()
+        self.assertEqual(len(series), 12)
+        last = series[self.last_month.strftime('%Y-%m')]
+        self.assertEqual(last['closed_volume'], Decimal('100000.00'))
+        self.assertEqual(last['commission'], Decimal('2500.00'))
+        self.assertEqual(last['win_rate'], 50.0)
+        current = series[self.this_month.strftime('%Y-%m')]
+        self.assertEqual(current['closed_volume'], Decimal('20000.00'))
+        self.assertEqual(current['new_transactions'], 3)
+        self.assertTrue(MonthlySalesPeriod.objects.filter(organization=self.org, month=self.last_month).exists())
+
+        condo = self.series_by_month(property_type='Condo')
+        self.assertEqual(condo[self.last_month.strftime('%Y-%m')]['closed_lost'], 0)
+        self.assertEqual(condo[self.this_month.strftime('%Y-%m')]['closed_won'], 0)
+
+    def test_closed_month_rebuilt_after_backdated_write(self):
+        txn = self.make_transaction(stage='Closed Won', value=Decimal('100.00'), close_date=self.last_month)
+        self.series_by_month()
+        self.assertTrue(MonthlySalesPeriod.objects.filter(organization=self.org, month=self.last_month).exists())
+
+        txn.value = Decimal('300.00')
+        txn.save()
+        self.assertFalse(MonthlySalesPeriod.objects.filter(organization=self.org, month=self.last_month).exists())
+        series = self.series_by_month()
+        self.assertEqual(series[self.last_month.strftime('%Y-%m')]['closed_volume'], Decimal('300.00'))
+
+    def test_months_are_aggregated_once_locked(self):
+        txn = self.make_transaction(stage='Closed Won', value=Decimal('100.00'), close_date=self.last_month)
+        lock = timeseries._lock_series
+        written = []
+
+        def write_while_waiting(org_ids):
+            # A write that commits while the materialization waits for its lock
+            if not written:
+                written.append(txn)
+                txn.value = Decimal('300.00')
+                txn.save()
+            lock(org_ids)
+
+        with mock.patch.object(timeseries, '_lock_series', side_effect=write_while_waiting):
+            timeseries.materialize_months(self.org.pk, [self.last_month])
+        self.assertTrue(MonthlySalesPeriod.objects.filter(organization=self.org, month=self.last_month).exists())
+        series = self.series_by_month()
+        self.assertEqual(series[self.last_month.strftime('%Y-%m')]['closed_volume'], Decimal('300.00'))
+
+    def test_invalid_range(self):
+        response = self.client.get(reverse('analytics-timeseries'), {'start': 'last year'})
+        self.assertEqual(response.status_code, 400)
+
+
+class StageFunnelTests(APITestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Funnel Agency")
+        self.user = User.objects.create_user(username='funnel', password='pass', organization=self.org)
+        self.contact = Contact.objects.create(
+            organization=self.org, first_name='Bo', last_name='Li',
+            email='bo@example.com', phone='555-0103'
+        )
+        self.property = Property.objects.create(
+            organization=self.org, address='4 Pine St', city='Springfield',
+            state='IL', zip_code='62704', list_price=Decimal('150000.00')
+        )
+        self.client.force_authenticate(self.user)
+
+    def make_transaction(self, **kwargs):
+        return Transaction.objects.create(
+            organization=self.org, name='Txn', property=self.property,
+            contact=self.contact, **kwargs
+        )
+
+    def test_stage_changes_are_logged(self):
+        txn = self.make_transaction(stage='Prospect')
+        txn.name = 'Renamed'
+        txn.save()
+        txn.stage = 'Active'
+        txn.save()
+        deal = Deal.objects.create(user=self.user, stage='NEW', value=Decimal('1.00'))
+        deal.stage = 'CLOSED_LOST'
+        deal.save()
+
+        history = list(StageHistory.objects.filter(model='transaction').values_list('from_stage', 'to_stage'))
+        self.assertEqual(history, [('', 'Prospect'), ('Prospect', 'Active')])
+        deal_history = StageHistory.objects.filter(model='deal').order_by('id').last()
+        self.assertEqual((deal_history.from_stage, deal_history.to_stage), ('NEW', 'CLOSED_LOST'))
+        self.assertEqual(deal_history.organization_id, self.org.id)
+
+    def test_funnel_conversion_and_time_in_stage(self):
+        converted = self.make_transaction(stage='Prospect')
+        self.make_transaction(stage='Prospect')
+        lost = self.make_transaction(stage='Prospect')
+        converted.stage = 'Under Contract'
+        converted.save()
+        lost.stage = 'Closed Lost'
+        lost.save()
+        # Entered Prospect ten days before moving on
+        StageHistory.objects.filter(object_id=converted.id, to_stage='Prospect').update(
+            changed_at=timezone.now() - timedelta(days=10)
+        )
+
+        response = self.client.get(reverse('analytics-funnel'))
+        self.assertEqual(response.status_code, 200)
+        stages = {row['stage']: row for row in response.data['stages']}
+        self.assertEqual(stages['Prospect']['entered'], 3)
+        self.assertEqual(stages['Prospect']['converted'], 1)
+        self.assertEqual(stages['Prospect']['conversion_rate'], 33.3)
+        self.assertEqual(stages['Prospect']['median_days_in_stage'], 5.0)
+        self.assertEqual(stages['Under Contract']['entered'], 1)
+        self.assertIsNone(stages['Closed Lost']['conversion_rate'])
+
+        self.assertEqual(self.client.get(reverse('analytics-funnel'), {'model': 'lead'}).status_code, 400)
+
+    def test_median_of_an_odd_number_of_stays(self):
+        now = timezone.now()
+        for days in (1, 9, 2):
+            txn = self.make_transaction(stage='Prospect')
+            txn.stage = 'Active'
+            txn.save()
+            StageHistory.objects.filter(object_id=txn.id, to_stage='Prospect').update(
+                changed_at=now - timedelta(days=days)
+            )
+            StageHistory.objects.filter(object_id=txn.id, to_stage='Active').update(changed_at=now)
+
+        stages = {row['stage']: row for row in self.client.get(reverse('analytics-funnel')).data['stages']}
+        self.assertEqual(stages['Prospect']['median_days_in_stage'], 2.0)
+        self.assertIsNone(stages['Active']['median_days_in_stage'])
+
+
+class PlatformMetricsTests(APITestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Test Agency")
+        self.admin = User.objects.create_user(username='admin', password='pass', organization=self.org, is_staff=True)
+        veteran = User.objects.create_user(username='veteran', password='pass', organization=self.org)
+        User.objects.filter(pk=veteran.pk).update(
+            date_joined=timezone.now() - timedelta(days=3), last_login=timezone.now(),
+        )
+        Organization.objects.filter(pk=self.org.pk).update(created_at=timezone.now() - timedelta(days=3))
+        Deal.objects.create(user=veteran, value=Decimal('100.00'))
+        self.client.force_authenticate(self.admin)
+
+    def test_snapshots_serve_totals_and_history(self):
+        call_command('snapshot_platform_metrics', '--backfill', '5', stdout=StringIO())
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('platform_stats') + '?days=6')
+        self.assertEqual(response.data['as_of'], timezone.localdate())
+        self.assertEqual(response.data['total_agents'], 2)
+        self.assertEqual(response.data['total_organizations'], 1)
+        self.assertEqual(response.data['total_deals'], 1)
+        self.assertEqual(response.data['active_users'], 1)
+        self.assertEqual(response.data['avg_deals_per_agent'], 0.5)
+        self.assertEqual(response.data['new_agents_week'], 2)
+
+        history = response.data['history']
+        self.assertEqual([row['agents'] for row in history], [0, 0, 1, 1, 1, 2])
+        self.assertEqual([row['organizations'] for row in history], [0, 0, 1, 1, 1, 1])
+        self.assertIsNone(history[0]['active_users'])
+
+        # Rerunning keeps the backfilled days and replaces today's row
+        call_command('snapshot_platform_metrics', '--backfill', '5', stdout=StringIO())
+        self.assertEqual(PlatformSnapshot.objects.count(), 6)
+
+    def test_joins_after_the_last_snapshot_of_a_day_are_counted(self):
+        yesterday = timezone.localdate() - timedelta(days=1)
+
+        def join(username, hour):
+            user = User.objects.create_user(username=username, password='pass', organization=self.org)
+            joined = timezone.make_aware(datetime.combine(yesterday, datetime.min.time()).replace(hour=hour))
+            User.objects.filter(pk=user.pk).update(date_joined=joined)
+
+        join('morning', 10)
+        platform.snapshot(yesterday)
+        join('evening', 20)
+        platform.snapshot()
+        self.assertEqual(PlatformSnapshot.objects.get(date=yesterday).new_agents, 2)
+        # Plus admin, who joined today
+        self.assertEqual(platform.new_agents_since(timezone.localdate(), 7), 3)
+
+    def test_first_request_takes_a_snapshot(self):
+        response = self.client.get(reverse('platform_stats'))
+        self.assertEqual(response.data['total_agents'], 2)
+        self.assertEqual(len(response.data['history']), 1)
+        response = self.client.get(reverse('platform_stats') + '?days=0')
+        self.assertEqual(response.status_code, 400)
+
+
+class SeedSyntheticDataTests(APITestCase):
+    def test_seeds_consistent_dataset(self):
+        call_command('seed_synthetic_data', '--transactions', '200', '--organizations', '2', stdout=StringIO())
+        self.assertEqual(Transaction.objects.count(), 200)
+        self.assertEqual(Deal.objects.count(), 100)
+        self.assertEqual(StageHistory.objects.filter(model='transaction').count(), 200)
+        # Rollups are rebuilt after the bulk inserts bypass the signals
+        call_command('rebuild_dashboard_rollups', '--check', stdout=StringIO())
+        self.assertEqual(SearchDocument.objects.filter(model='transaction').count(), 200)
+
+
+class BenchmarkEndpointsTests(APITestCase):
+    def setUp(self):
+        call_command('seed_synthetic_data', '--transactions', '200', '--organizations', '2', stdout=StringIO())
+        self.output_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.output_dir.cleanup)
+        self.output = os.path.join(self.output_dir.name, 'report.json')
+
+    def benchmark(self, *args):
+        call_command(
+            'benchmark_endpoints', '--iterations', '2', '--warmup', '0', '--output', self.output, *args,
+            stdout=StringIO(),
+        )
+        with open(self.output) as f:
+            return json.load(f)['endpoints']
+
+    def test_times_the_whole_streamed_export(self):
+        results = self.benchmark()
+        for name in ('contact-export', 'transaction-export', 'deal-export'):
+            self.assertEqual(results[name]['status'], 200)
+            self.assertGreater(results[name]['response_bytes'], 0)
+        # The rows are read while streaming, so their queries count too
+        self.assertGreater(results['transaction-export']['queries'], 0)
+
+    def test_benchmarks_every_endpoint_with_the_params_it_needs(self):
+        User.objects.create_superuser('root', 'root@example.com', 'pass')
+        results = self.benchmark()
+        for name in ('property-nearby', 'property-within', 'property-clusters', 'search', 'sync',
+                     'user_list', 'platform_stats', 'cache_stats', 'dashboard-stats'):
+            self.assertIn(name, results)
+        self.assertTrue(all(200 <= row['status'] < 300 for row in results.values()))
+        self.assertGreater(results['property-nearby']['response_bytes'], len('{"results":[],"has_more":false}'))
+
+    def test_reports_non_2xx_responses_as_failures(self):
+        # The geo actions and search answer 400 without their query params
+        with mock.patch.object(benchmark_endpoints, 'NEEDS_PARAMS', set()), \
+                mock.patch.object(benchmark_endpoints.Command, 'query_params', return_value={}):
+            with self.assertRaisesMessage(CommandError, 'Non-2xx responses from: property-clusters'):
+                self.benchmark()
+        with open(self.output) as f:
+            report = json.load(f)
+        for name in ('property-nearby', 'property-within', 'property-clusters', 'search'):
+            self.assertEqual(report['failures'][name]['status'], 400)
+            self.assertNotIn(name, report['endpoints'])
+        self.assertIn('property-list', report['endpoints'])
+
+
+@override_settings(REQUEST_INSTRUMENTATION={'ENABLED': True, 'N_PLUS_ONE_THRESHOLD': 3})
+class RequestInstrumentationTests(OrganizationTestCase):
+    def setUp(self):
+        cache.clear()
+        endpoint_stats.reset()
+        super().setUp()
+        self.admin = User.objects.create_user(username='admin', password='pass', is_staff=True)
+
+    def test_records_endpoint_timing_and_headers(self):
+        self.client.force_authenticate(self.user)
+        for _ in range(3):
+            response = self.client.get(reverse('dashboard-stats'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertEqual(response['X-DB-Queries'], '2')  # cache hit: change counters for the ETag and the cache key
+        self.assertNotIn('X-N-Plus-One', response)
+
+        self.client.force_authenticate(self.admin)
+        stats = self.client.get(reverse('analytics-request-stats')).data
+        self.assertTrue(stats['enabled'])
+        row = stats['endpoints']['dashboard-stats']
+        self.assertEqual(row['requests'], 3)
+        self.assertEqual(row['queries']['p50'], 2)
+        self.assertGreater(row['queries']['max'], 0)
+        self.assertEqual(sum(bucket['count'] for bucket in row['histogram_ms']), 3)
+
+        self.client.delete(reverse('analytics-request-stats'))
+        # Only the reset request itself remains
+        self.assertEqual(list(endpoint_stats.snapshot()), ['analytics-request-stats'])
+
+    def test_repeated_statements_are_flagged(self):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for pk in range(4):
+                list(User.objects.filter(pk=pk))
+            list(User.objects.filter(pk__in=[1, 2, 3]))
+        repeated = recorder.repeated(3)
+        self.assertEqual(list(repeated.values()), [4])
+        self.assertEqual(recorder.count, 5)
+
+    def test_admin_only(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse('analytics-request-stats'))
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,259 @@
+"""
+Monthly sales time series.
+
+Closed months are materialized once into ``MonthlySalesBucket`` rows, split
+by stage, type and property_type so filters can be answered from the buckets,
+and marked done with a ``MonthlySalesPeriod``. Only the open month is
+aggregated live. A write that touches a closed month drops that month so it
+is rebuilt on the next read.
+"""
+from collections import defaultdict
+from datetime import date, datetime, time
+
+from django.db import transaction as db_transaction
+from django.db.models import Sum, Count, Q, DateField
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from transactions.models import Transaction
+from .models import MonthlySalesBucket, MonthlySalesLock, MonthlySalesPeriod
+from .rollups import COMMISSION_EXPRESSION, win_rate
+
+MAX_MONTHS = 240
+DIMENSIONS = ('stage', 'type_id', 'property_type')
+CLOSED_METRICS = ('closed_volume', 'commission', 'closed_won', 'closed_lost')
+METRICS = CLOSED_METRICS + ('new_transactions',)
+# Row fields that decide which bucket a transaction lands in
+BUCKET_FIELDS = ('stage', 'value', 'commission_rate', 'close_date', 'type_id', 'property_type')
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(month, count):
+    years, index = divmod(month.month - 1 + count, 12)
+    return date(month.year + years, index + 1, 1)
+
+
+def month_range(start, end):
+    """Every month from ``start`` to ``end`` inclusive."""
+    months = []
+    month = start
+    while month <= end:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def current_month():
+    return month_start(timezone.localdate())
+
+
+def _as_month(value):
+    if isinstance(value, datetime):
+        value = timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    return month_start(value)
+
+
+def _aware(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def aggregate_months(transactions, start, end, dimensions=()):
+    """
+    Metrics for the months in [start, end), grouped by month and ``dimensions``.
+
+    Two grouped queries: closed metrics by close_date, new transactions by
+    created_at. Returns ``{(month, *dimension_values): {metric: value}}``.
+    """
+    won, lost = Q(stage='Closed Won'), Q(stage='Closed Lost')
+    rows = defaultdict(lambda: dict.fromkeys(METRICS, 0))
+
+    closed = (
+        transactions.filter(won | lost, close_date__gte=start, close_date__lt=end)
+        .values(*dimensions, month=TruncMonth('close_date'))
+        .annotate(
+            closed_volume=Sum('value', filter=won),
+            commission=Sum(COMMISSION_EXPRESSION, filter=won),
+            closed_won=Count('id', filter=won),
+            closed_lost=Count('id', filter=lost),
+        )
+        .order_by()
+    )
+    for row in closed:
+        key = (_as_month(row['month']), *(row[field] for field in dimensions))
+        for metric in CLOSED_METRICS:
+            rows[key][metric] = row[metric] or 0
+
+    created = (
+        transactions.filter(created_at__gte=_aware(start), created_at__lt=_aware(end))
+        .values(*dimensions, month=TruncMonth('created_at', output_field=DateField()))
+        .annotate(new_transactions=Count('id'))
+        .order_by()
+    )
+    for row in created:
+        key = (_as_month(row['month']), *(row[field] for field in dimensions))
+        rows[key]['new_transactions'] = row['new_transactions']
+    return rows
+
+
+def materialize_months(org_id, months):
+    """Build buckets for any of ``months`` (all closed) not yet materialized."""
+    done = set(MonthlySalesPeriod.objects.filter(organization_id=org_id, month__in=months).values_list('month', flat=True))
+    if not set(months) - done:
+        return
+
+    with db_transaction.atomic():
+        # Lock first: concurrent materialization and invalidation of the
+        # organization's months wait, so the aggregate below reads rows no
+        # write can change before the periods are marked done.
+        _lock_series([org_id])
+        done = set(MonthlySalesPeriod.objects.filter(organization_id=org_id, month__in=months).values_list('month', flat=True))
+        todo = set(months) - done
+        if not todo:
+            return
+        rows = aggregate_months(
+            Transaction.objects.filter(organization_id=org_id),
+            min(todo), add_months(max(todo), 1), DIMENSIONS,
+        )
+        MonthlySalesBucket.objects.filter(organization_id=org_id, month__in=todo).delete()
+        MonthlySalesBucket.objects.bulk_create([
+            MonthlySalesBucket(
+                organization_id=org_id, month=month, stage=stage,
+                type_id=type_id, property_type=property_type, **metrics
+            )
+            for (month, stage, type_id, property_type), metrics in rows.items()
+            if month in todo
+        ])
+        MonthlySalesPeriod.objects.bulk_create([
+            MonthlySalesPeriod(organization_id=org_id, month=month) for month in sorted(todo)
+        ])
+
+
+def _lock_series(org_ids):
+    # A lock row of its own, so writes elsewhere in the organization never
+    # queue behind a materialization.
+    MonthlySalesLock.objects.bulk_create(
+        [MonthlySalesLock(organization_id=org_id) for org_id in org_ids], ignore_conflicts=True,
+    )
+    # Ordered, so two transactions never wait on each other's rows
+    list(
+        MonthlySalesLock.objects.select_for_update()
+        .filter(organization_id__in=org_ids).order_by('organization_id').values_list('pk')
+    )
+
+
+def invalidate_transaction_months(before, after):
+    """Drop the closed months a Transaction change lands in so they are rebuilt on read."""
+    invalidate_transaction_changes([(before, after)])
+
+
+def invalidate_transaction_changes(changes):
+    """``invalidate_transaction_months`` for many (before, after) pairs, one delete per organization."""
+    open_month = current_month()
+    stale = defaultdict(set)
+    for before, after in changes:
+        if before is not None and after is not None and all(before[f] == after[f] for f in BUCKET_FIELDS):
+            continue
+        for row in (before, after):
+            if row is None:
+                continue
+            for day in (row['close_date'], row['created_at']):
+                if day and _as_month(day) < open_month:
+                    stale[row['organization_id']].add(_as_month(day))
+    if not stale:
+        return
+    with db_transaction.atomic():
+        # Waits for a materialization in progress (see materialize_months)
+        _lock_series(stale)
+        for org_id, months in stale.items():
+            MonthlySalesPeriod.objects.filter(organization_id=org_id, month__in=months).delete()
+            MonthlySalesBucket.objects.filter(organization_id=org_id, month__in=months).delete()
+
+
+def _dimension_filters(filters):
+    lookups = {}
+    if filters.get('stage'):
+        lookups['stage__in'] = filters['stage']
+    if filters.get('type'):
+        lookups['type_id__in'] = filters['type']
+    if filters.get('property_type'):
+        lookups['property_type__in'] = filters['property_type']
+    return lookups
+
+
+def monthly_series(org_id, start, end, filters):
+    """
+    Metric series for every month from ``start`` to ``end`` inclusive.
+
+    ``filters`` maps ``stage``/``type``/``property_type`` to lists of accepted
+    values; transactions match on their current stage.
+    """
+    months = month_range(start, end)
+    totals = {month: dict.fromkeys(METRICS, 0) for month in months}
+    open_month = current_month()
+    closed_months = [month for month in months if month < open_month]
+    lookups = _dimension_filters(filters)
+
+    if org_id is not None and closed_months:
+        materialize_months(org_id, closed_months)
+        buckets = (
+            MonthlySalesBucket.objects
+            .filter(organization_id=org_id, month__gte=closed_months[0], month__lte=closed_months[-1], **lookups)
+            .values('month')
+            .annotate(**{metric: Sum(metric) for metric in METRICS})
+            .order_by()
+        )
+        for row in buckets:
+            totals[row['month']].update({metric: row[metric] or 0 for metric in METRICS})
+
+    if org_id is not None and open_month in totals:
+        transactions = Transaction.objects.filter(organization_id=org_id, **lookups)
+        for (month,), metrics in aggregate_months(transactions, open_month, add_months(open_month, 1)).items():
+            totals[month] = metrics
+
+    return [
+        {
+            'month': month.strftime('%Y-%m'),
+            'closed_volume': metrics['closed_volume'],
+            'commission': round(metrics['commission'], 2) if metrics['commission'] else 0,
+            'new_transactions': metrics['new_transactions'],
+            'closed_won': metrics['closed_won'],
+            'closed_lost': metrics['closed_lost'],
+            'win_rate': win_rate(metrics['closed_won'], metrics['closed_lost']),
+        }
+        for month, metrics in totals.items()
+    ]
+
+
+def parse_month(value):
+    try:
+        return datetime.strptime(value, '%Y-%m').date()
+    except ValueError:
+        raise ValueError(f"Invalid month '{value}', expected YYYY-MM.")
+
+
+def parse_range(params):
+    """(start, end) months from ``start``/``end`` query params, defaulting to the last 12 months."""
+    open_month = current_month()
+    end = parse_month(params['end']) if params.get('end') else open_month
+    end = min(end, open_month)
+    start = parse_month(params['start']) if params.get('start') else add_months(end, -11)
+    if start > end:
+        raise ValueError("'start' must not be after 'end'.")
+    if len(month_range(start, end)) > MAX_MONTHS:
+        raise ValueError(f"At most {MAX_MONTHS} months can be requested at once.")
+    return start, end
+
+
+def parse_filters(params):
+    filters = {
+        'stage': params.getlist('stage'),
+        'property_type': params.getlist('property_type'),
+    }
+    try:
+        filters['type'] = [int(value) for value in params.getlist('type')]
+    except ValueError:
+        raise ValueError("'type' must be a transaction type id.")
+    return filters
@@ -1,6 +1,9 @@
 from django.urls import path
-from .views import dashboard_stats
+from .views import dashboard_stats, sales_timeseries, stage_funnel, request_stats
 
 urlpatterns = [
     path('dashboard/stats/', dashboard_stats, name='dashboard-stats'),
+    path('analytics/timeseries/', sales_timeseries, name='analytics-timeseries'),
+    path('analytics/funnel/', stage_funnel, name='analytics-funnel'),
+    path('analytics/request-stats/', request_stats, name='analytics-request-stats'),
 ]
@@ -1,86 +1,143 @@
-from django.db.models import Sum, Count, Q
+from datetime import datetime, time, timedelta
+
 from django.utils import timezone
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
+from rest_framework import status
 from transactions.models import Transaction
 from interactions.models import Event
+from deals.models import Deal
+from accounts.cache import cached_response
+from accounts.changes import conditional_response
+from accounts.tenancy import current_organization_id
+from .rollups import organization_dashboard_totals, user_pipeline, win_rate
+from . import funnel, timeseries
+from .instrumentation import endpoint_stats, instrumentation_settings
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def dashboard_stats(request):
-    org = request.user.organization
+    org_id = current_organization_id()
     today = timezone.localdate()
+    # The rollups it reads are derived from transactions and deals; the
+    # schedule depends on the day, the pipeline on the user.
+    models = [Transaction, Deal, Event]
+    return conditional_response(
+        request, models,
+        lambda: cached_response(
+            request, f'dashboard-stats:{today.isoformat()}:{request.user.pk}', models,
+            lambda: dashboard_payload(request.user, org_id, today),
+        ),
+        today.isoformat(),
+    )
+
+
+def dashboard_payload(user, org_id, today):
     current_year = today.year
 
-    # --- 1. FINANCIALS (Source: Transaction) ---
-    transactions = Transaction.objects.filter(organization=org)
-    
-    # Total Lifetime Sales (Closed Won)
-    total_sales_volume = transactions.filter(stage='Closed Won').aggregate(sum=Sum('value'))['sum'] or 0
-    
-    # Total Transactions Count (All time)
-    total_transactions = transactions.count()
-    
-    # Current Year Volume (Closed Won this year)
-    current_year_volume = transactions.filter(
-        stage='Closed Won', 
-        close_date__year=current_year
-    ).aggregate(sum=Sum('value'))['sum'] or 0
-    
-    # Current Year Transactions Count
-    current_year_count = transactions.filter(created_at__year=current_year).count()
-    
-    # Commission Due (Pending/Active * Commission Rate)
-    # Assuming commission_rate is percentage (e.g. 2.5) -> value * (rate / 100)
-    # Using 'Active' and 'Under Contract' stages as simplified 'Pending' bucket
-    pending_transactions = transactions.filter(stage__in=['Active', 'Under Contract'])
-    commission_due = 0
-    for t in pending_transactions:
-        if t.value and t.commission_rate:
-            commission_due += t.value * (t.commission_rate / 100)
-            
+    # --- 1. FINANCIALS (Source: OrganizationRollup) ---
+    financials = organization_dashboard_totals(org_id, current_year)
+
     # Recent Transactions for Activity Feed
-    recent_transactions = transactions.order_by('-created_at')[:5].values(
+    recent_transactions = Transaction.objects.filter(organization_id=org_id).order_by('-created_at')[:5].values(
         'id', 'name', 'value', 'stage', 'created_at', 'detailed_status'
     )
 
-    # --- 2. PIPELINE (Source: Deal) ---
-    # Need to import Deal model. If not available, use Transaction as fallback for now 
-    # but based on plan we should separate. 
-    # Checking imports... Deal is in deals.models. 
-    from deals.models import Deal
-    deals = Deal.objects.filter(user=request.user) # Deals are per user or org? Model says user.
-    
-    # Active Pipeline Value
-    active_pipeline_val = deals.filter(stage__in=['NEW', 'NEGOTIATION', 'UNDER_CONTRACT']).aggregate(sum=Sum('value'))['sum'] or 0
-    
-    # Win Rate (Closed Won / (Closed Won + Closed Lost))
-    won = deals.filter(stage='CLOSED_WON').count()
-    lost = deals.filter(stage='CLOSED_LOST').count()
-    total_closed = won + lost
-    deal_win_rate = round((won / total_closed * 100), 1) if total_closed > 0 else 0
-
+    # --- 2. PIPELINE (Source: UserDealRollup) ---
+    # Deals are owned per user, not per organization.
+    pipeline = user_pipeline(user.pk)
 
     # --- 3. SCHEDULE ---
+    # A start_time range rather than start_time__date, so the (organization,
+    # start_time) index applies.
+    day_start = timezone.make_aware(datetime.combine(today, time.min))
     todays_events = Event.objects.filter(
-        organization=org,
-        start_time__date=today
+        organization_id=org_id,
+        start_time__gte=day_start,
+        start_time__lt=timezone.make_aware(datetime.combine(today + timedelta(days=1), time.min)),
     ).order_by('start_time').values('id', 'title', 'start_time', 'type')[:5]
 
-    return Response({
-        "financials": {
-            "total_sales_volume": total_sales_volume,
-            "total_transactions": total_transactions,
-            "current_year_volume": current_year_volume,
-            "current_year_transactions": current_year_count,
-            "commission_due": commission_due,
-        },
+    return {
+        "financials": financials,
         "pipeline": {
-            "active_value": active_pipeline_val,
-            "win_rate": deal_win_rate,
-            "active_count": deals.exclude(stage__in=['CLOSED_WON', 'CLOSED_LOST']).count()
+            "active_value": pipeline['active_value'],
+            "win_rate": win_rate(pipeline['won'], pipeline['lost']),
+            "active_count": pipeline['active_count'],
         },
         "recent_activity": list(recent_transactions),
         "todays_schedule": list(todays_events)
+    }
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sales_timeseries(request):
+    """Monthly closed volume, commission, new transactions and win rate."""
+    try:
+        start, end = timeseries.parse_range(request.query_params)
+        filters = timeseries.parse_filters(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    org_id = current_organization_id()
+    return cached_response(
+        request, f'sales-timeseries:{timeseries.current_month().isoformat()}', [Transaction],
+        lambda: {
+            'start': start.strftime('%Y-%m'),
+            'end': end.strftime('%Y-%m'),
+            'filters': filters,
+            'series': timeseries.monthly_series(org_id, start, end, filters),
+        },
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def stage_funnel(request):
+    """Stage conversion and median days-in-stage from the stage history."""
+    model = request.query_params.get('model', 'transaction')
+    if model not in funnel.PIPELINES:
+        return Response({'error': "'model' must be 'transaction' or 'deal'."}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        today = timezone.localdate()
+        end = _parse_date(request.query_params.get('end')) or today
+        start = _parse_date(request.query_params.get('start')) or end - timedelta(days=365)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if start > end:
+        return Response({'error': "'start' must not be after 'end'."}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Both bounds are inclusive days
+    start_at = timezone.make_aware(datetime.combine(start, time.min))
+    end_at = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min))
+    return Response({
+        'model': model,
+        'start': start,
+        'end': end,
+        'stages': funnel.funnel(current_organization_id(), model, start_at, end_at),
     })
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAdminUser])
+def request_stats(request):
+    """Per-endpoint latency, DB time and query counts from the instrumentation middleware. DELETE resets them."""
+    if request.method == 'DELETE':
+        endpoint_stats.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    config = instrumentation_settings()
+    return Response({
+        'enabled': config['ENABLED'],
+        'sample_rate': config['SAMPLE_RATE'],
+        'endpoints': endpoint_stats.snapshot(),
+    })
+
+
+def _parse_date(value):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}', expected YYYY-MM-DD.")
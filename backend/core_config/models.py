@@ -1,11 +1,14 @@
 from django.db import models
 from accounts.models import Organization
+from accounts.tenancy import TenantManager
 
 class TransactionType(models.Model):
     organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='transaction_types')
     name = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = TenantManager()
+
     def __str__(self):
         return f"{self.name} ({self.organization.name})"
 
@@ -14,6 +17,8 @@ class TransactionStatus(models.Model):
     name = models.CharField(max_length=100)
     step_order = models.IntegerField(help_text="Order in the pipeline")
 
+    objects = TenantManager()
+
     class Meta:
         ordering = ['step_order']
 
@@ -25,5 +30,7 @@ class DateDefinition(models.Model):
     name = models.CharField(max_length=100)
     is_milestone = models.BooleanField(default=False)
 
+    objects = TenantManager()
+
     def __str__(self):
         return f"{self.name} ({self.organization.name})"
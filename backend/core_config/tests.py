@@ -1,3 +1,85 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import F
+from django.urls import reverse
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from accounts.cache import cache_stats, reset_cache_stats
+from accounts.models import ChangeCounter, Organization
+from .models import TransactionStatus, TransactionType
+
+User = get_user_model()
+
+
+class ConfigListCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        reset_cache_stats()
+        self.org = Organization.objects.create(name="Config Agency")
+        self.user = User.objects.create_user(username='config', password='pass', organization=self.org)
+        self.client.force_authenticate(self.user)
+        TransactionType.objects.create(organization=self.org, name='Purchase')
+
+    def test_list_is_cached_per_organization(self):
+        url = reverse('transactiontype-list')
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+        # The change counters, once for the ETag and once for the cache key
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual([row['name'] for row in response.data], ['Purchase'])
+
+        other_org = Organization.objects.create(name="Other Agency")
+        other_user = User.objects.create_user(username='other', password='pass', organization=other_org)
+        self.client.force_authenticate(other_user)
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data, [])
+
+        stats = cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+
+    def test_superusers_do_not_widen_the_cached_list(self):
+        other_org = Organization.objects.create(name="Other Agency")
+        TransactionType.objects.create(organization=other_org, name='Lease')
+        url = reverse('transactiontype-list')
+        admin = User.objects.create_user(username='root', password='pass', organization=self.org, is_superuser=True)
+        self.client.force_authenticate(admin)
+        self.assertEqual([row['name'] for row in self.client.get(url).data], ['Purchase'])
+
+        self.client.force_authenticate(self.user)
+        response = self.client.get(url)
+        self.assertEqual([row['name'] for row in response.data], ['Purchase'])
+
+    def test_versions_are_shared_between_workers(self):
+        url = reverse('transactiontype-list')
+        self.client.get(url)
+        # Another worker's write: only the stored counter moves.
+        ChangeCounter.objects.filter(organization=self.org, model='core_config.transactiontype').update(
+            version=F('version') + 1,
+        )
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+
+    def test_superusers_and_members_get_separate_entries(self):
+        url = reverse('transactiontype-list')
+        self.client.get(url)
+        admin = User.objects.create_user(username='root', password='pass', organization=self.org, is_superuser=True)
+        self.client.force_authenticate(admin)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+
+    def test_write_invalidates_list(self):
+        url = reverse('transactiontype-list')
+        self.client.get(url)
+        # Other models' writes leave it cached
+        TransactionStatus.objects.create(organization=self.org, name='Open', step_order=1)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+        self.client.post(url, {'name': 'Listing'})
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data), 2)
+
+    def test_stats_endpoint_is_admin_only(self):
+        self.assertEqual(self.client.get(reverse('cache_stats')).status_code, 403)
+        admin = User.objects.create_user(username='ops', password='pass', is_staff=True)
+        self.client.force_authenticate(admin)
+        self.assertIn('hit_rate', self.client.get(reverse('cache_stats')).data)
@@ -1,25 +1,44 @@
 from rest_framework import viewsets, permissions
+from accounts.cache import cached_response
+from accounts.changes import ConditionalGetMixin
+from accounts.tenancy import current_organization
+from realtor_crm_backend.fieldsets import SparseQuerysetMixin
 from .models import TransactionType, TransactionStatus, DateDefinition
 from .serializers import TransactionTypeSerializer, TransactionStatusSerializer, DateDefinitionSerializer
 
-class BaseConfigViewSet(viewsets.ModelViewSet):
+class BaseConfigViewSet(ConditionalGetMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     """Base ViewSet to handle organization filtering and creation."""
     permission_classes = [permissions.IsAuthenticated]
+    # Small per-organization lookup tables without created_at; always served whole.
+    pagination_class = None
 
     def get_queryset(self):
-        return self.queryset.filter(organization=self.request.user.organization)
+        # Superusers included: the cached list is keyed on the organization alone.
+        return self.queryset.for_organization()
+
+    def list(self, request, *args, **kwargs):
+        # Config lists are fetched on nearly every screen and rarely change;
+        # a write to the listed model invalidates them.
+        list_response = super().list
+        return cached_response(
+            request, f'{self.basename}-list', self.etag_models,
+            lambda: list_response(request, *args, **kwargs).data,
+        )
 
     def perform_create(self, serializer):
-        serializer.save(organization=self.request.user.organization)
+        serializer.save(organization=current_organization())
 
 class TransactionTypeViewSet(BaseConfigViewSet):
     queryset = TransactionType.objects.all()
     serializer_class = TransactionTypeSerializer
+    etag_models = [TransactionType]
 
 class TransactionStatusViewSet(BaseConfigViewSet):
     queryset = TransactionStatus.objects.all()
     serializer_class = TransactionStatusSerializer
+    etag_models = [TransactionStatus]
 
 class DateDefinitionViewSet(BaseConfigViewSet):
     queryset = DateDefinition.objects.all()
     serializer_class = DateDefinitionSerializer
+    etag_models = [DateDefinition]
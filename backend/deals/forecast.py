@@ -0,0 +1,86 @@
+"""
+Probability-weighted revenue forecast over a user's deals.
+
+Each open deal is expected to bring ``value * probability / 100`` in the
+month of its ``closing_date``. The best case assumes every open deal closes,
+the worst case that none do; won deals count in full in all three. Lost
+deals are left out. Everything is aggregated by the database in one grouped
+query over (month, stage).
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Sum, Count, F, DecimalField, ExpressionWrapper
+from django.db.models.functions import Greatest, Least, TruncMonth
+
+from .models import Deal
+
+ZERO = Decimal('0')
+CENTS = Decimal('0.01')
+
+EXPECTED_VALUE = ExpressionWrapper(
+    F('value') * Least(Greatest(F('probability'), 0), 100) / 100,
+    output_field=DecimalField(max_digits=17, decimal_places=4),
+)
+
+
+def _empty_band():
+    return {'expected': ZERO, 'best_case': ZERO, 'worst_case': ZERO, 'deal_count': 0}
+
+
+def _bands(row):
+    value = row['total_value'] or ZERO
+    if row['stage'] == 'CLOSED_WON':
+        return {'expected': value, 'best_case': value, 'worst_case': value}
+    return {'expected': row['expected'] or ZERO, 'best_case': value, 'worst_case': ZERO}
+
+
+def _finish(band):
+    return {
+        key: value.quantize(CENTS) if isinstance(value, Decimal) else value
+        for key, value in band.items()
+    }
+
+
+def deal_forecast(deals, start=None, end=None):
+    """
+    Forecast bands per closing month, per stage and overall for ``deals``.
+
+    ``start``/``end`` bound the closing month (inclusive, first-of-month
+    dates). Deals without a closing date are reported under ``month: None``
+    unless a bound is given.
+    """
+    deals = deals.exclude(stage='CLOSED_LOST')
+    if start:
+        deals = deals.filter(closing_date__gte=start)
+    if end:
+        deals = deals.filter(closing_date__lt=end)
+
+    rows = (
+        deals.values('stage', month=TruncMonth('closing_date'))
+        .annotate(deal_count=Count('id'), total_value=Sum('value'), expected=Sum(EXPECTED_VALUE))
+        .order_by()
+    )
+
+    months = defaultdict(_empty_band)
+    stages = defaultdict(_empty_band)
+    totals = _empty_band()
+    for row in rows:
+        bands = _bands(row)
+        for target in (months[row['month']], stages[row['stage']], totals):
+            for key, amount in bands.items():
+                target[key] += amount
+            target['deal_count'] += row['deal_count']
+
+    stage_order = [code for code, _ in Deal.STAGE_CHOICES]
+    return {
+        'months': [
+            {'month': month.strftime('%Y-%m') if month else None, **_finish(band)}
+            for month, band in sorted(months.items(), key=lambda item: (item[0] is None, item[0] or 0))
+        ],
+        'stages': [
+            {'stage': stage, **_finish(stages[stage])}
+            for stage in stage_order if stage in stages
+        ],
+        'totals': _finish(totals),
+    }
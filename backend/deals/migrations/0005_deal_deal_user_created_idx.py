@@ -0,0 +1,20 @@
+# Generated by Django 6.0.2 on 2026-10-17 11:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deals', '0004_alter_deal_title'),
+        ('transactions', '0005_transaction_detailed_status_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='deal',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='deal_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 6.0.2 on 2026-10-17 11:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deals', '0005_deal_deal_user_created_idx'),
+        ('transactions', '0006_contact_contact_org_created_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='deal',
+            index=models.Index(fields=['user', 'stage'], name='deal_user_stage_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deal',
+            index=models.Index(fields=['user', 'closing_date'], name='deal_user_closing_idx'),
+        ),
+    ]
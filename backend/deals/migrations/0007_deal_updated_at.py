@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-17 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deals', '0006_deal_deal_user_stage_idx_deal_deal_user_closing_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deal',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -24,6 +24,16 @@ class Deal(models.Model):
     probability = models.IntegerField(default=10)
     closing_date = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of a user's deals
+            models.Index(fields=['user', 'created_at', 'id'], name='deal_user_created_idx'),
+            models.Index(fields=['user', 'stage'], name='deal_user_stage_idx'),
+            # Forecast ranges over closing dates
+            models.Index(fields=['user', 'closing_date'], name='deal_user_closing_idx'),
+        ]
 
     def __str__(self):
         client = f"{self.contact.first_name} {self.contact.last_name}" if self.contact else "Unknown Client"
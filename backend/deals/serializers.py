@@ -1,22 +1,23 @@
 from rest_framework import serializers
+from accounts.tenancy import TenantPrimaryKeyRelatedField
 from .models import Deal
-from transactions.serializers import ContactSerializer
+from realtor_crm_backend.fieldsets import SparseFieldsMixin
+from transactions.serializers import ContactSerializer, PropertySerializer, ValuesReader
 from transactions.models import Contact, Property
 
-class DealSerializer(serializers.ModelSerializer):
+class DealSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = serializers.ReadOnlyField(source='user.username')
     
-    # Write-only ID fields
-    contact_id = serializers.PrimaryKeyRelatedField(
+    # Write-only ID fields, limited to the request's organization
+    contact_id = TenantPrimaryKeyRelatedField(
         queryset=Contact.objects.all(), source='contact', write_only=True
     )
-    property_id = serializers.PrimaryKeyRelatedField(
+    property_id = TenantPrimaryKeyRelatedField(
         queryset=Property.objects.all(), source='property', write_only=True
     )
     
     # Read-only nested details
     contact_details = ContactSerializer(source='contact', read_only=True)
-    # property_details = PropertySerializer(source='property', read_only=True) # Start simple, maybe add PropertySerializer later if needed
     
     client_name = serializers.SerializerMethodField()
     property_address = serializers.SerializerMethodField()
@@ -27,12 +28,64 @@ class DealSerializer(serializers.ModelSerializer):
             'id', 'user', 'title', 
             'contact_id', 'contact_details', 'client_name',
             'property_id', 'property_address',
-            'stage', 'value', 'probability', 'closing_date', 'created_at'
+            'stage', 'value', 'probability', 'closing_date', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['user', 'created_at']
+        read_only_fields = ['user', 'created_at', 'updated_at']
+        field_sources = {
+            'client_name': ['contact__first_name', 'contact__last_name'],
+            'property_address': ['property__address'],
+        }
+        # ?expand=property_details
+        expandable_fields = {
+            'property_details': (PropertySerializer, {'source': 'property', 'read_only': True}),
+        }
 
     def get_property_address(self, obj):
         return obj.property.address if obj.property else "Unknown Property"
 
     def get_client_name(self, obj):
         return f"{obj.contact.first_name} {obj.contact.last_name}" if obj.contact else "Unknown"
+
+
+# The nested contact's values() lookups, one per ContactSerializer field
+# (all plain model fields of the same name)
+CONTACT_LOOKUPS = {name: f'contact__{name}' for name in ContactSerializer.Meta.fields}
+
+
+class DealValuesReader(ValuesReader):
+    serializer_class = DealSerializer
+    sources = {
+        'id': ('id',),
+        'user': ('user__username',),
+        'title': ('title',),
+        'contact_details': tuple(CONTACT_LOOKUPS.values()),
+        'client_name': ('contact_id', 'contact__first_name', 'contact__last_name'),
+        'property_address': ('property__address',),
+        'stage': ('stage',),
+        'value': ('value',),
+        'probability': ('probability',),
+        'closing_date': ('closing_date',),
+        'created_at': ('created_at',),
+        'updated_at': ('updated_at',),
+    }
+    formatted = ('value', 'closing_date', 'created_at', 'updated_at')
+
+    def __init__(self, fields=None):
+        super().__init__(fields)
+        self.contact_fields = ContactSerializer().fields
+
+    def render_contact_details(self, row):
+        if row[CONTACT_LOOKUPS['id']] is None:
+            return None
+        return {
+            name: self.format(name, row[lookup], self.contact_fields)
+            for name, lookup in CONTACT_LOOKUPS.items()
+        }
+
+    def render_client_name(self, row):
+        if row['contact_id'] is None:
+            return "Unknown"
+        return f"{row['contact__first_name']} {row['contact__last_name']}"
+
+    def render_property_address(self, row):
+        return row['property__address'] if row['property__address'] is not None else "Unknown Property"
@@ -0,0 +1,136 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from accounts.models import Organization
+from transactions.models import Contact, Property
+from transactions.serializers import ContactSerializer
+from realtor_crm_backend.testcases import OrganizationTestCase
+from .models import Deal
+from .serializers import DealSerializer
+
+User = get_user_model()
+
+
+class DealForecastTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.org = Organization.objects.create(name="Forecast Agency")
+        self.user = User.objects.create_user(username='forecaster', password='pass', organization=self.org)
+        self.client.force_authenticate(self.user)
+
+    def make_deal(self, **kwargs):
+        return Deal.objects.create(user=self.user, **kwargs)
+
+    def test_bands_by_month_and_stage(self):
+        self.make_deal(stage='NEW', value=Decimal('1000.00'), probability=10, closing_date=date(2030, 1, 5))
+        self.make_deal(stage='UNDER_CONTRACT', value=Decimal('2000.00'), probability=90, closing_date=date(2030, 1, 20))
+        self.make_deal(stage='CLOSED_WON', value=Decimal('500.00'), probability=100, closing_date=date(2030, 2, 1))
+        self.make_deal(stage='CLOSED_LOST', value=Decimal('9999.00'), closing_date=date(2030, 2, 1))
+        self.make_deal(stage='NEGOTIATION', value=Decimal('300.00'), probability=50)
+        other = User.objects.create_user(username='other', password='pass', organization=self.org)
+        Deal.objects.create(user=other, stage='NEW', value=Decimal('1.00'), closing_date=date(2030, 1, 1))
+
+        response = self.client.get(reverse('deal-forecast'))
+        self.assertEqual(response.status_code, 200)
+        months = {row['month']: row for row in response.data['months']}
+        self.assertEqual(list(months), ['2030-01', '2030-02', None])
+        self.assertEqual(months['2030-01']['expected'], Decimal('1900.00'))
+        self.assertEqual(months['2030-01']['best_case'], Decimal('3000.00'))
+        self.assertEqual(months['2030-01']['worst_case'], Decimal('0.00'))
+        self.assertEqual(months['2030-02']['worst_case'], Decimal('500.00'))
+
+        stages = {row['stage']: row for row in response.data['stages']}
+        self.assertNotIn('CLOSED_LOST', stages)
+        self.assertEqual(stages['NEGOTIATION']['expected'], Decimal('150.00'))
+        self.assertEqual(response.data['totals']['deal_count'], 4)
+
+        january = self.client.get(reverse('deal-forecast'), {'start': '2030-01', 'end': '2030-01'})
+        self.assertEqual([row['month'] for row in january.data['months']], ['2030-01'])
+
+    def test_cached_until_deal_changes(self):
+        deal = self.make_deal(stage='NEW', value=Decimal('1000.00'), probability=50)
+        self.client.get(reverse('deal-forecast'))
+        # The cache key's change counter only
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(reverse('deal-forecast'))['X-Cache'], 'HIT')
+
+        deal.probability = 100
+        deal.save()
+        response = self.client.get(reverse('deal-forecast'))
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['totals']['expected'], Decimal('1000.00'))
+
+
+class DealListQueryTests(OrganizationTestCase):
+    def add_deals(self, count):
+        for n in range(count):
+            contact = Contact.objects.create(
+                organization=self.org, first_name=f'C{n}', last_name='Doe',
+                email=f'c{n}@example.com', phone='555-0100',
+            )
+            prop = Property.objects.create(
+                organization=self.org, address=f'{n} Main St', city='Springfield',
+                state='IL', zip_code='62701', list_price=Decimal('250000.00'),
+            )
+            Deal.objects.create(
+                user=self.user, contact=contact if n % 2 else None, property=prop if n % 3 else None,
+                value=Decimal('1000.50'), closing_date=date(2030, 1, n + 1),
+            )
+
+    def test_list_query_count_is_constant(self):
+        # The ETag's change counters, then the page
+        self.add_deals(2)
+        with self.assertNumQueries(2):
+            self.client.get(reverse('deal-list'))
+        self.add_deals(8)
+        with self.assertNumQueries(2):
+            self.client.get(reverse('deal-list'))
+        with self.assertNumQueries(2):
+            self.client.get(reverse('deal-list') + '?page_size=5')
+
+    def test_values_rows_match_serializer(self):
+        self.add_deals(4)
+        response = self.client.get(reverse('deal-list') + '?paginate=false')
+        expected = DealSerializer(Deal.objects.order_by('id'), many=True).data
+        self.assertEqual(sorted(response.data, key=lambda row: row['id']), expected)
+
+    def test_values_contact_details_match_contact_serializer(self):
+        self.add_deals(2)
+        response = self.client.get(reverse('deal-list') + '?paginate=false&fields=id,contact_details')
+        details = {row['id']: row['contact_details'] for row in response.data}
+        for deal in Deal.objects.select_related('contact'):
+            expected = ContactSerializer(deal.contact).data if deal.contact else None
+            self.assertEqual(details[deal.pk], expected)
+
+    def test_export_streams_joined_rows(self):
+        self.add_deals(4)
+        url = reverse('deal-export')
+        with self.assertNumQueries(1):
+            response = self.client.get(url + '?start=2030-01-02&end=2030-01-03&stage=NEW')
+            lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,title,stage,value,probability,closing_date,client_name,contact_email,'
+                                   'property_address,agent,created_at')
+        self.assertEqual([line.split(',')[5:10] for line in lines[1:]], [
+            ['2030-01-02', 'C1 Doe', 'c1@example.com', '1 Main St', 'agent'],
+            ['2030-01-03', '', '', '2 Main St', 'agent'],
+        ])
+        self.assertEqual(self.client.get(url + '?stage=CLOSED').status_code, 400)
+
+    def test_sparse_fields(self):
+        self.add_deals(4)
+        # The ETag's change counters, then the selected columns
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('deal-list') + '?fields=id,client_name')
+        self.assertEqual({tuple(row) for row in response.data['results']}, {('id', 'client_name')})
+        self.assertEqual(sorted(row['client_name'] for row in response.data['results']),
+                         ['C1 Doe', 'C3 Doe', 'Unknown', 'Unknown'])
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('deal-list') + '?fields=id,stage&expand=property_details')
+        details = [row['property_details'] for row in response.data['results']]
+        self.assertEqual(sorted(d['address'] for d in details if d), ['1 Main St', '2 Main St'])
@@ -1,13 +1,61 @@
-from rest_framework import viewsets, permissions
+from datetime import datetime
+
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from accounts.cache import cached_response
+from accounts.changes import ConditionalGetMixin
+from accounts.models import User
+from transactions.models import Contact, Property
 from .models import Deal
-from .serializers import DealSerializer
+from realtor_crm_backend.fieldsets import SparseQuerysetMixin
+from transactions.views import ExportMixin, ValuesListMixin
+from .serializers import DealSerializer, DealValuesReader
+from .forecast import deal_forecast
 
-class DealViewSet(viewsets.ModelViewSet):
+class DealViewSet(ExportMixin, ConditionalGetMixin, ValuesListMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     serializer_class = DealSerializer
+    values_reader_class = DealValuesReader
     permission_classes = [permissions.IsAuthenticated]
+    etag_models = [Deal, Contact, Property, User]
+    export_columns = [
+        ('id', 'id'), ('title', 'title'), ('stage', 'stage'), ('value', 'value'),
+        ('probability', 'probability'), ('closing_date', 'closing_date'),
+        ('client_name', ('contact__first_name', 'contact__last_name')), ('contact_email', 'contact__email'),
+        ('property_address', 'property__address'), ('agent', 'user__username'), ('created_at', 'created_at'),
+    ]
+    export_date_field = 'closing_date'
+    export_choice_filters = {'stage': 'stage'}
 
     def get_queryset(self):
-        return Deal.objects.filter(user=self.request.user)
+        return Deal.objects.filter(user=self.request.user).select_related('user', 'contact', 'property')
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+
+    @action(detail=False, methods=['get'])
+    def forecast(self, request):
+        """Expected revenue per closing month and per stage, with best/worst-case bands."""
+        try:
+            start = self._parse_month('start')
+            end = self._parse_month('end')
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if end:
+            # 'end' is inclusive; filter up to the first day of the next month
+            end = end.replace(year=end.year + end.month // 12, month=end.month % 12 + 1)
+
+        # Cached per user until a deal in the organization changes.
+        return cached_response(
+            request, f'deal-forecast:{request.user.pk}', [Deal],
+            lambda: deal_forecast(self.get_queryset(), start, end),
+        )
+
+    def _parse_month(self, param):
+        value = self.request.query_params.get(param)
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m').date()
+        except ValueError:
+            raise ValueError(f"Invalid '{param}' month '{value}', expected YYYY-MM.")
@@ -0,0 +1,24 @@
+# Generated by Django 6.0.2 on 2026-10-17 11:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_user_joined_idx'),
+        ('interactions', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['organization', 'created_at', 'id'], name='event_org_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['organization', 'created_at', 'id'], name='task_org_created_idx'),
+        ),
+    ]
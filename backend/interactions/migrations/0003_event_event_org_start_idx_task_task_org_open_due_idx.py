@@ -0,0 +1,24 @@
+# Generated by Django 6.0.2 on 2026-10-17 11:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_user_joined_idx'),
+        ('interactions', '0002_event_event_org_created_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['organization', 'start_time'], name='event_org_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('is_completed', False)), fields=['organization', 'due_date'], name='task_org_open_due_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-17 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interactions', '0003_event_event_org_start_idx_task_task_org_open_due_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
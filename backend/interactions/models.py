@@ -1,6 +1,7 @@
 from django.db import models
 from django.conf import settings
 from accounts.models import Organization
+from accounts.tenancy import TenantManager
 
 class Task(models.Model):
     organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='tasks')
@@ -9,6 +10,20 @@ class Task(models.Model):
     is_completed = models.BooleanField(default=False)
     due_date = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TenantManager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination within an organization
+            models.Index(fields=['organization', 'created_at', 'id'], name='task_org_created_idx'),
+            # Open tasks by due date
+            models.Index(
+                fields=['organization', 'due_date'], name='task_org_open_due_idx',
+                condition=models.Q(is_completed=False),
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -27,6 +42,16 @@ class Event(models.Model):
     start_time = models.DateTimeField()
     type = models.CharField(max_length=20, choices=TYPE_CHOICES, default='Meeting')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TenantManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['organization', 'created_at', 'id'], name='event_org_created_idx'),
+            # Schedule lookups by day
+            models.Index(fields=['organization', 'start_time'], name='event_org_start_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -1,14 +1,15 @@
 from rest_framework import serializers
+from realtor_crm_backend.fieldsets import SparseFieldsMixin
 from .models import Task, Event
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Task
-        fields = ['id', 'title', 'is_completed', 'due_date', 'user', 'created_at']
-        read_only_fields = ['id', 'created_at', 'user']
+        fields = ['id', 'title', 'is_completed', 'due_date', 'user', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'user']
 
-class EventSerializer(serializers.ModelSerializer):
+class EventSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Event
-        fields = ['id', 'title', 'start_time', 'type', 'user', 'created_at']
-        read_only_fields = ['id', 'created_at', 'user']
+        fields = ['id', 'title', 'start_time', 'type', 'user', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'user']
@@ -1,30 +1,35 @@
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
+from accounts.changes import ConditionalGetMixin
+from accounts.tenancy import current_organization
+from realtor_crm_backend.fieldsets import SparseQuerysetMixin
 from .models import Task, Event
 from .serializers import TaskSerializer, EventSerializer
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(ConditionalGetMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     serializer_class = TaskSerializer
+    etag_models = [Task]
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Task.objects.filter(organization=self.request.user.organization)
+        return Task.objects.for_organization()
 
     def perform_create(self, serializer):
         serializer.save(
-            organization=self.request.user.organization,
+            organization=current_organization(),
             user=self.request.user
         )
 
-class EventViewSet(viewsets.ModelViewSet):
+class EventViewSet(ConditionalGetMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     serializer_class = EventSerializer
+    etag_models = [Event]
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Event.objects.filter(organization=self.request.user.organization)
+        return Event.objects.for_organization()
 
     def perform_create(self, serializer):
         serializer.save(
-            organization=self.request.user.organization,
+            organization=current_organization(),
             user=self.request.user
         )
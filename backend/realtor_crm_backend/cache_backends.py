@@ -0,0 +1,43 @@
+"""
+Cache backends used by the project.
+
+Django's LocMemCache already evicts least-recently-used entries once
+MAX_ENTRIES is reached; FileBasedCache culls a random sample instead. The
+file backend here keeps the same on-disk format but refreshes an entry's
+mtime on every hit and culls the stalest files first.
+"""
+import os
+
+from django.core.cache.backends.filebased import FileBasedCache
+
+_MISSING = object()
+
+
+class LRUFileBasedCache(FileBasedCache):
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        if value is _MISSING:
+            return default
+        try:
+            os.utime(self._key_to_file(key, version))
+        except FileNotFoundError:
+            pass
+        return value
+
+    def _cull(self):
+        filelist = self._list_cache_files()
+        num_entries = len(filelist)
+        if num_entries < self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            return self.clear()
+
+        def last_used(fname):
+            try:
+                return os.path.getmtime(fname)
+            except FileNotFoundError:
+                return 0
+
+        filelist.sort(key=last_used)
+        for fname in filelist[:int(num_entries / self._cull_frequency)]:
+            self._delete(fname)
@@ -0,0 +1,126 @@
+"""
+Sparse fieldsets for GET requests: ``?fields=`` and ``?expand=``.
+
+``?fields=id,name,stage`` limits each representation to the named fields;
+``?expand=property_details`` adds representations a serializer only renders
+on request (``Meta.expandable_fields``). Both take comma-separated names;
+unknown names are ignored.
+
+``SparseFieldsMixin`` drops the unrequested fields from the top-level
+serializer before it renders anything, and ``SparseQuerysetMixin`` narrows
+the view's queryset to what the remaining fields read: ``.only()`` those
+columns, and ``select_related`` just the relations they traverse.
+``SerializerMethodField``s declare the lookups they read in
+``Meta.field_sources``; a field whose columns cannot be worked out leaves
+the queryset as it is.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def _names(request, param):
+    value = request.query_params.get(param)
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def requested_fields(request):
+    """
+    ``(fields, expand)`` asked for by ``request``: the set of field names or
+    ``None`` when not limited, and the set of expansions.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None, set()
+    return _names(request, FIELDS_PARAM), _names(request, EXPAND_PARAM) or set()
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin applying ``?fields=``/``?expand=`` to the top-level
+    representation (or each item of a list); nested serializers render whole.
+
+    ``Meta.expandable_fields`` maps names to ``(serializer class, kwargs)``.
+    """
+    def get_fields(self):
+        fields = super().get_fields()
+        parent = self.parent.parent if isinstance(self.parent, serializers.ListSerializer) else self.parent
+        if parent is not None:
+            return fields
+        requested, expand = requested_fields(self.context.get('request'))
+        if requested is not None:
+            fields = {name: field for name, field in fields.items() if name in requested}
+        for name, (serializer_class, kwargs) in getattr(self.Meta, 'expandable_fields', {}).items():
+            if name in expand:
+                fields[name] = serializer_class(**kwargs)
+        return fields
+
+
+def field_lookups(serializer, prefix=''):
+    """
+    The ORM lookups ``serializer``'s readable fields read, or ``None`` when
+    some field's cannot be derived.
+    """
+    sources = getattr(getattr(serializer, 'Meta', None), 'field_sources', {})
+    lookups = set()
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if name in sources:
+            lookups.update(prefix + lookup for lookup in sources[name])
+            continue
+        if isinstance(field, (serializers.SerializerMethodField, serializers.ListSerializer)) or field.source == '*':
+            return None
+        path = prefix + '__'.join(field.source_attrs)
+        if isinstance(field, serializers.BaseSerializer):
+            nested = field_lookups(field, path + '__')
+            if nested is None:
+                return None
+            lookups |= nested
+        else:
+            lookups.add(path)
+    return lookups
+
+
+def narrow(queryset, lookups):
+    """``queryset`` loading only ``lookups`` and joining only the relations they traverse."""
+    relations = set()
+    for lookup in lookups:
+        model, parts = queryset.model, lookup.split('__')
+        for depth, part in enumerate(parts, 1):
+            try:
+                field = model._meta.get_field(part)
+            except FieldDoesNotExist:
+                return queryset  # A property or annotation: leave the queryset whole
+            if not field.concrete or (field.many_to_many and depth < len(parts)):
+                return queryset
+            if depth < len(parts):
+                if not field.is_relation:
+                    return queryset
+                relations.add('__'.join(parts[:depth]))
+                model = field.related_model
+    queryset = queryset.select_related(None)
+    if relations:
+        queryset = queryset.select_related(*relations)
+    return queryset.only(*lookups)
+
+
+class SparseQuerysetMixin:
+    """View mixin narrowing the queryset of GET requests to the fields asked for."""
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        requested, expand = requested_fields(self.request)
+        if requested is None and not expand:
+            return queryset
+        lookups = field_lookups(self.get_serializer())
+        if lookups is None:
+            return queryset
+        # Keyset pagination reads the cursor field of every row.
+        cursor_field = getattr(self, 'cursor_field', 'created_at')
+        if any(field.name == cursor_field for field in queryset.model._meta.concrete_fields):
+            lookups.add(cursor_field)
+        return narrow(queryset, lookups or {queryset.model._meta.pk.name})
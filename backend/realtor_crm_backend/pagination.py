@@ -0,0 +1,141 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+
+Rows are ordered newest first on ``(cursor_field, id)``, ``cursor_field``
+being ``created_at`` unless the view sets another. A cursor encodes the last
+row's key, so each page is one index range scan of ``page_size + 1`` rows
+wherever it falls in the table, instead of an OFFSET that grows with depth.
+The composite key keeps rows sharing a timestamp (bulk inserts) in a stable
+order without falling back to offsets.
+
+``?page_size=`` overrides the page size up to ``max_page_size``.
+``?paginate=false`` opts back into the legacy unpaginated list.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    page_size = api_settings.PAGE_SIZE or 50
+    max_page_size = 500
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    legacy_query_param = 'paginate'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        if request.query_params.get(self.legacy_query_param, '').lower() in ('false', '0'):
+            return None
+
+        self.field = getattr(view, 'cursor_field', 'created_at')
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        position, reverse = self.decode_cursor(queryset.model)
+
+        if reverse:
+            # Walking back towards newer rows: ascending, then flip the page.
+            queryset = queryset.order_by(self.field, 'id')
+            if position is not None:
+                queryset = queryset.filter(self._after(position, '__gt'))
+        else:
+            queryset = queryset.order_by(f'-{self.field}', '-id')
+            if position is not None:
+                queryset = queryset.filter(self._after(position, '__lt'))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.has_next = has_more if not reverse else position is not None
+        self.has_previous = has_more if reverse else position is not None
+        self.first = self._key(rows[0]) if rows else None
+        self.last = self._key(rows[-1]) if rows else None
+        # An empty page reached backwards or forwards still links back to its origin.
+        if not rows and position is not None:
+            self.first = self.last = position
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or self.last is None:
+            return None
+        return self.encode_cursor(self.last, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or self.first is None:
+            return None
+        return self.encode_cursor(self.first, reverse=True)
+
+    def _key(self, row):
+        # Model instances, or dicts from a .values() list path
+        if isinstance(row, dict):
+            return row[self.field], row['id']
+        return getattr(row, self.field), row.pk
+
+    def _after(self, position, lookup):
+        value, pk = position
+        return Q(**{f'{self.field}{lookup}': value}) | Q(**{self.field: value, f'id{lookup}': pk})
+
+    def encode_cursor(self, position, reverse):
+        value, pk = position
+        payload = {'v': value.isoformat(), 'id': pk}
+        if reverse:
+            payload['r'] = 1
+        token = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, model):
+        token = self.request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+            value = model._meta.get_field(self.field).to_python(payload['v'])
+            pk = int(payload['id'])
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if value is None:
+            raise NotFound(self.invalid_cursor_message)
+        return (value, pk), bool(payload.get('r'))
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {'name': self.cursor_query_param, 'required': False, 'in': 'query', 'schema': {'type': 'string'}},
+            {'name': self.page_size_query_param, 'required': False, 'in': 'query', 'schema': {'type': 'integer'}},
+            {'name': self.legacy_query_param, 'required': False, 'in': 'query', 'schema': {'type': 'boolean'}},
+        ]
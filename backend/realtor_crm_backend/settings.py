@@ -48,9 +48,13 @@ INSTALLED_APPS = [
     'analytics',
     'interactions',
     'deals',
+    'search',
+    'sync',
 ]
 
 MIDDLEWARE = [
+    # Removes itself at startup unless REQUEST_INSTRUMENTATION is enabled
+    'analytics.instrumentation.RequestInstrumentationMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -58,6 +62,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Scopes tenant querysets to the request user's organization (accounts.tenancy)
+    'accounts.tenancy.TenantContextMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -94,6 +100,72 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# Local memory per process by default; CACHE_BACKEND=file shares entries
+# between workers on one host. Both evict least-recently-used entries once
+# MAX_ENTRIES is reached.
+
+CACHE_TIMEOUT = int(os.environ.get('CACHE_TIMEOUT', 300))
+CACHE_OPTIONS = {
+    'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 5000)),
+    'CULL_FREQUENCY': 4,
+}
+
+if os.environ.get('CACHE_BACKEND') == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'realtor_crm_backend.cache_backends.LRUFileBasedCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', str(BASE_DIR / 'cache')),
+            'TIMEOUT': CACHE_TIMEOUT,
+            'OPTIONS': CACHE_OPTIONS,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'realtor-crm',
+            'TIMEOUT': CACHE_TIMEOUT,
+            'OPTIONS': CACHE_OPTIONS,
+        }
+    }
+
+# Dashboard/config responses are keyed on the per-organization change counters
+# stored in the database (accounts.cache), so they are current on every worker
+# whatever the backend; the TTL only bounds how long orphans linger.
+RESPONSE_CACHE_TIMEOUT = CACHE_TIMEOUT
+
+# Per-endpoint timing/query instrumentation (analytics.instrumentation),
+# read back from /api/analytics/request-stats/.
+REQUEST_INSTRUMENTATION = {
+    'ENABLED': os.environ.get('REQUEST_INSTRUMENTATION') == '1',
+    'SAMPLE_RATE': float(os.environ.get('REQUEST_INSTRUMENTATION_SAMPLE_RATE', 1.0)),
+}
+
+# CSV/MLS imports (transactions.imports): uploads are stored here until their
+# job ends and processed in a background thread unless disabled. A running
+# job that has committed no chunk for IMPORT_STALE_SECONDS is taken to have
+# lost its worker and may be resumed.
+IMPORT_UPLOAD_DIR = os.environ.get('IMPORT_UPLOAD_DIR', str(BASE_DIR / 'imports'))
+IMPORT_RUN_IN_BACKGROUND = os.environ.get('IMPORT_RUN_IN_BACKGROUND', '1') == '1'
+IMPORT_STALE_SECONDS = int(os.environ.get('IMPORT_STALE_SECONDS', 600))
+
+# Closed transactions older than this are moved to the archive table by the
+# archive_transactions command (transactions.archive).
+TRANSACTION_ARCHIVE_AFTER_DAYS = int(os.environ.get('TRANSACTION_ARCHIVE_AFTER_DAYS', 365))
+
+# Delta sync (sync.changelog): cursors stay behind log entries younger than
+# SYNC_SETTLE_SECONDS, which should exceed the longest write transaction;
+# entries are pruned after SYNC_LOG_RETENTION_DAYS.
+SYNC_SETTLE_SECONDS = int(os.environ.get('SYNC_SETTLE_SECONDS', 5))
+SYNC_LOG_RETENTION_DAYS = int(os.environ.get('SYNC_LOG_RETENTION_DAYS', 30))
+
+# Platform metrics (analytics.platform): users count as active for this many
+# days after logging in.
+PLATFORM_ACTIVE_DAYS = int(os.environ.get('PLATFORM_ACTIVE_DAYS', 30))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -136,9 +208,10 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 # Custom User Model
 AUTH_USER_MODEL = 'accounts.User'
 
+# EmailBackend also takes usernames (and serves permissions as a ModelBackend),
+# so a failed login checks one password hash, not one per backend.
 AUTHENTICATION_BACKENDS = [
     'accounts.backends.EmailBackend',
-    'django.contrib.auth.backends.ModelBackend',
 ]
 
 # CORS Settings
@@ -160,14 +233,26 @@ CORS_ALLOW_CREDENTIALS = True
 # DRF Settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+        'accounts.authentication.ClaimsJWTAuthentication',
+    ),
+    # Keyset pagination on (created_at, id); ?paginate=false returns the full list.
+    'DEFAULT_PAGINATION_CLASS': 'realtor_crm_backend.pagination.KeysetPagination',
+    'PAGE_SIZE': int(os.environ.get('API_PAGE_SIZE', 50)),
 }
 
 SIMPLE_JWT = {
     'TOKEN_OBTAIN_SERIALIZER': 'accounts.serializers.MyTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.VersionedTokenRefreshSerializer',
+    # Logins through the API count towards the active users metric.
+    'UPDATE_LAST_LOGIN': True,
 }
 
+# Request users come from the token and a per-process cache of each user's
+# role, organization and token version (accounts.authentication). Workers
+# other than the one that saved a change see it after JWT_USER_CACHE_SECONDS.
+JWT_USER_CACHE_SECONDS = int(os.environ.get('JWT_USER_CACHE_SECONDS', 30))
+JWT_USER_CACHE_MAX_ENTRIES = int(os.environ.get('JWT_USER_CACHE_MAX_ENTRIES', 10000))
+
 # EMAIL CONFIGURATION (Development)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 EMAIL_HOST = 'localhost'
@@ -0,0 +1,33 @@
+"""
+Shared test fixtures.
+
+``OrganizationTestCase`` is the usual starting point for API tests: one
+organization ("Test Agency") with its agent logged in, and the stock contact
+(Jane Doe) and property (1 Main St) a test can create on demand.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+
+from accounts.models import Organization
+from transactions.models import Contact, Property
+
+
+class OrganizationTestCase(APITestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Test Agency")
+        self.user = get_user_model().objects.create_user(username='agent', password='pass', organization=self.org)
+        self.client.force_authenticate(self.user)
+
+    def make_contact(self, **fields):
+        return Contact.objects.create(**{
+            'organization': self.org, 'first_name': 'Jane', 'last_name': 'Doe',
+            'email': 'jane@example.com', 'phone': '555-0100', **fields,
+        })
+
+    def make_property(self, **fields):
+        return Property.objects.create(**{
+            'organization': self.org, 'address': '1 Main St', 'city': 'Springfield',
+            'state': 'IL', 'zip_code': '62701', 'list_price': Decimal('250000.00'), **fields,
+        })
@@ -31,4 +31,6 @@ urlpatterns = [
     path('api/', include('interactions.urls')),
     path('api/accounts/', include('accounts.urls')),
     path('api/', include('deals.urls')),
+    path('api/', include('search.urls')),
+    path('api/', include('sync.urls')),
 ]
@@ -0,0 +1,167 @@
+"""
+Full-text search over contacts, properties and transactions.
+
+Each object is mirrored into a ``SearchDocument`` on save and dropped on
+delete (see ``search.signals``); the database's own full-text index over
+``SearchDocument.body`` does the matching and ranking:
+
+* SQLite: the ``search_document_fts`` FTS5 table, ranked by bm25. It indexes
+  each document's organization_id as well, so the match itself is confined
+  to one organization's documents.
+* PostgreSQL: a GIN index on ``to_tsvector('simple', body)``, ranked by ts_rank.
+
+Other backends fall back to ``icontains`` per term, unranked. Every query
+term is matched as a prefix, so partial input ("jan 555") finds "Jane",
+"555-0100". Bulk writes that bypass signals should call ``index_objects`` or
+``reindex``.
+"""
+import re
+
+from django.db import connection
+
+from transactions.models import Contact, Property, Transaction
+from .models import SearchDocument
+
+FTS_TABLE = 'search_document_fts'
+MAX_TERMS = 8
+_TERM = re.compile(r'\w+', re.UNICODE)
+
+
+def contact_document(contact):
+    name = f"{contact.first_name} {contact.last_name}"
+    return {
+        'title': name,
+        'subtitle': contact.email,
+        'body': ' '.join([name, contact.email, contact.phone]),
+    }
+
+
+def property_document(prop):
+    place = f"{prop.city}, {prop.state} {prop.zip_code}"
+    return {
+        'title': prop.address,
+        'subtitle': place,
+        'body': ' '.join([prop.address, place]),
+    }
+
+
+def transaction_document(transaction):
+    return {
+        'title': transaction.name,
+        'subtitle': transaction.detailed_status or transaction.stage,
+        'body': ' '.join(filter(None, [transaction.name, transaction.detailed_status])),
+    }
+
+
+# model key -> (model class, document builder)
+DOCUMENTS = {
+    'contact': (Contact, contact_document),
+    'property': (Property, property_document),
+    'transaction': (Transaction, transaction_document),
+}
+MODEL_KEYS = {model: key for key, (model, _) in DOCUMENTS.items()}
+
+
+def index_instance(instance):
+    """Create or refresh the document for a saved Contact/Property/Transaction."""
+    key = MODEL_KEYS[type(instance)]
+    document = DOCUMENTS[key][1](instance)
+    SearchDocument.objects.update_or_create(
+        model=key, object_id=instance.pk,
+        defaults={'organization_id': instance.organization_id, **document},
+    )
+
+
+def remove_instance(instance):
+    SearchDocument.objects.filter(model=MODEL_KEYS[type(instance)], object_id=instance.pk).delete()
+
+
+def remove_objects(objects):
+    """Drop the documents of ``objects`` (instances of one model) in one query."""
+    if objects:
+        SearchDocument.objects.filter(
+            model=MODEL_KEYS[type(objects[0])], object_id__in=[obj.pk for obj in objects]
+        ).delete()
+
+
+def index_objects(objects):
+    """Replace the documents of ``objects`` (instances of one model) in two queries."""
+    if not objects:
+        return
+    key = MODEL_KEYS[type(objects[0])]
+    build = DOCUMENTS[key][1]
+    SearchDocument.objects.filter(model=key, object_id__in=[obj.pk for obj in objects]).delete()
+    SearchDocument.objects.bulk_create([
+        SearchDocument(organization_id=obj.organization_id, model=key, object_id=obj.pk, **build(obj))
+        for obj in objects
+    ])
+
+
+def reindex(queryset, batch_size=1000):
+    """Rebuild the documents for every object in ``queryset``; returns the number indexed."""
+    indexed = 0
+    batch = []
+    for instance in queryset.order_by('pk').iterator(chunk_size=batch_size):
+        batch.append(instance)
+        if len(batch) >= batch_size:
+            index_objects(batch)
+            indexed += len(batch)
+            batch = []
+    index_objects(batch)
+    return indexed + len(batch)
+
+
+def query_terms(query):
+    return _TERM.findall(query.lower())[:MAX_TERMS]
+
+
+def search(org_id, query, models=None, limit=20, offset=0):
+    """
+    Ranked documents of ``org_id`` matching every term of ``query``.
+
+    Returns ``[(model, object_id, title, subtitle, score)]`` best first;
+    ``models`` optionally restricts to some of ``DOCUMENTS``' keys.
+    """
+    terms = query_terms(query)
+    if org_id is None or not terms:
+        return []
+    models = list(models or DOCUMENTS)
+    model_sql = ', '.join(['%s'] * len(models))
+
+    if connection.vendor == 'sqlite':
+        prefixes = ' '.join(f'"{term}"*' for term in terms)
+        match = f'organization_id : "{int(org_id)}" AND body : ({prefixes})'
+        # organization_id weighs nothing: every candidate matches it alike.
+        sql = f"""
+            SELECT d.model, d.object_id, d.title, d.subtitle, -bm25({FTS_TABLE}, 1.0, 0.0) AS score
+            FROM {FTS_TABLE}
+            JOIN search_searchdocument d ON d.id = {FTS_TABLE}.rowid
+            WHERE {FTS_TABLE} MATCH %s AND d.model IN ({model_sql})
+            ORDER BY score DESC, d.id
+            LIMIT %s OFFSET %s
+        """
+        params = [match, *models, limit, offset]
+    elif connection.vendor == 'postgresql':
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        sql = f"""
+            SELECT model, object_id, title, subtitle,
+                   ts_rank(to_tsvector('simple', body), to_tsquery('simple', %s)) AS score
+            FROM search_searchdocument
+            WHERE to_tsvector('simple', body) @@ to_tsquery('simple', %s)
+              AND organization_id = %s AND model IN ({model_sql})
+            ORDER BY score DESC, id
+            LIMIT %s OFFSET %s
+        """
+        params = [tsquery, tsquery, org_id, *models, limit, offset]
+    else:
+        documents = SearchDocument.objects.filter(organization_id=org_id, model__in=models)
+        for term in terms:
+            documents = documents.filter(body__icontains=term)
+        return [
+            (*row, 0.0)
+            for row in documents.order_by('id').values_list('model', 'object_id', 'title', 'subtitle')[offset:offset + limit]
+        ]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
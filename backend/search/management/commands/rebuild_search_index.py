@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from search.index import DOCUMENTS, reindex
+from search.models import SearchDocument
+
+
+class Command(BaseCommand):
+    help = "Rebuild the search documents for contacts, properties and transactions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organization', type=int, help="Only rebuild this organization.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        org_id = options['organization']
+        stale = SearchDocument.objects.all()
+        if org_id:
+            stale = stale.filter(organization_id=org_id)
+        stale.delete()
+
+        for key, (model, _) in DOCUMENTS.items():
+            objects = model.objects.all()
+            if org_id:
+                objects = objects.filter(organization_id=org_id)
+            count = reindex(objects, options['batch_size'])
+            self.stdout.write(f"Indexed {count} {key} document(s).")
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
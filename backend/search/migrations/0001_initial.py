@@ -0,0 +1,123 @@
+# Generated by Django 6.0.2 on 2026-10-17 12:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SQLITE_FTS = [
+    # External-content FTS5 table over search_searchdocument.body, kept in sync by triggers.
+    # organization_id is indexed too, so a query matches within one tenant's documents.
+    "CREATE VIRTUAL TABLE search_document_fts USING fts5("
+    "body, organization_id, content='search_searchdocument', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER search_document_ai AFTER INSERT ON search_searchdocument BEGIN "
+    "INSERT INTO search_document_fts(rowid, body, organization_id) "
+    "VALUES (new.id, new.body, new.organization_id); END",
+    "CREATE TRIGGER search_document_ad AFTER DELETE ON search_searchdocument BEGIN "
+    "INSERT INTO search_document_fts(search_document_fts, rowid, body, organization_id) "
+    "VALUES ('delete', old.id, old.body, old.organization_id); END",
+    "CREATE TRIGGER search_document_au AFTER UPDATE OF body, organization_id ON search_searchdocument BEGIN "
+    "INSERT INTO search_document_fts(search_document_fts, rowid, body, organization_id) "
+    "VALUES ('delete', old.id, old.body, old.organization_id); "
+    "INSERT INTO search_document_fts(rowid, body, organization_id) "
+    "VALUES (new.id, new.body, new.organization_id); END",
+]
+SQLITE_FTS_DROP = [
+    "DROP TRIGGER IF EXISTS search_document_au",
+    "DROP TRIGGER IF EXISTS search_document_ad",
+    "DROP TRIGGER IF EXISTS search_document_ai",
+    "DROP TABLE IF EXISTS search_document_fts",
+]
+POSTGRES_FTS = [
+    "CREATE INDEX search_doc_body_gin ON search_searchdocument USING GIN (to_tsvector('simple', body))",
+]
+POSTGRES_FTS_DROP = [
+    "DROP INDEX IF EXISTS search_doc_body_gin",
+]
+
+
+def _execute(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def create_full_text_index(apps, schema_editor):
+    _execute(schema_editor, {'sqlite': SQLITE_FTS, 'postgresql': POSTGRES_FTS})
+
+
+def drop_full_text_index(apps, schema_editor):
+    _execute(schema_editor, {'sqlite': SQLITE_FTS_DROP, 'postgresql': POSTGRES_FTS_DROP})
+
+
+# Copies of the search.index document builders as of this migration, so it
+# keeps building the same documents whatever those become.
+def contact_document(contact):
+    name = f"{contact.first_name} {contact.last_name}"
+    return {'title': name, 'subtitle': contact.email, 'body': ' '.join([name, contact.email, contact.phone])}
+
+
+def property_document(prop):
+    place = f"{prop.city}, {prop.state} {prop.zip_code}"
+    return {'title': prop.address, 'subtitle': place, 'body': ' '.join([prop.address, place])}
+
+
+def transaction_document(transaction):
+    return {
+        'title': transaction.name,
+        'subtitle': transaction.detailed_status or transaction.stage,
+        'body': ' '.join(filter(None, [transaction.name, transaction.detailed_status])),
+    }
+
+
+# model key -> (historical model name, document builder)
+DOCUMENTS = {
+    'contact': ('transactions.Contact', contact_document),
+    'property': ('transactions.Property', property_document),
+    'transaction': ('transactions.Transaction', transaction_document),
+}
+
+
+def index_existing_objects(apps, schema_editor):
+    SearchDocument = apps.get_model('search', 'SearchDocument')
+    for key, (model_name, build) in DOCUMENTS.items():
+        Model = apps.get_model(model_name)
+        batch = []
+        for instance in Model.objects.order_by('pk').iterator(chunk_size=2000):
+            batch.append(SearchDocument(
+                organization_id=instance.organization_id, model=key, object_id=instance.pk, **build(instance)
+            ))
+            if len(batch) >= 2000:
+                SearchDocument.objects.bulk_create(batch)
+                batch = []
+        SearchDocument.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('accounts', '0002_user_user_joined_idx'),
+        ('transactions', '0007_transaction_txn_org_close_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(choices=[('contact', 'Contact'), ('property', 'Property'), ('transaction', 'Transaction')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('subtitle', models.CharField(blank=True, default='', max_length=255)),
+                ('body', models.TextField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='accounts.organization')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['organization', 'model'], name='search_doc_org_model_idx')],
+                'constraints': [models.UniqueConstraint(fields=('model', 'object_id'), name='search_doc_unique_object')],
+            },
+        ),
+        migrations.RunPython(create_full_text_index, drop_full_text_index),
+        migrations.RunPython(index_existing_objects, migrations.RunPython.noop),
+    ]
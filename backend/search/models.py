@@ -0,0 +1,36 @@
+from django.db import models
+from accounts.models import Organization
+
+
+class SearchDocument(models.Model):
+    """
+    One searchable row per Contact, Property or Transaction.
+
+    ``body`` holds the indexed text. The full-text index over it is created
+    per database in the migration: an FTS5 table kept in sync by triggers on
+    SQLite, a GIN index on ``to_tsvector('simple', body)`` on PostgreSQL.
+    """
+    MODEL_CHOICES = [
+        ('contact', 'Contact'),
+        ('property', 'Property'),
+        ('transaction', 'Transaction'),
+    ]
+
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='search_documents')
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField()
+    title = models.CharField(max_length=255)
+    subtitle = models.CharField(max_length=255, blank=True, default='')
+    body = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['model', 'object_id'], name='search_doc_unique_object'),
+        ]
+        indexes = [
+            models.Index(fields=['organization', 'model'], name='search_doc_org_model_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id}: {self.title}"
@@ -0,0 +1,35 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from transactions.models import Contact, Property, Transaction
+from transactions.signals import bulk_deleted, bulk_saved
+from .index import index_instance, remove_instance, index_objects, remove_objects
+
+
+@receiver(post_save, sender=Contact)
+@receiver(post_save, sender=Property)
+@receiver(post_save, sender=Transaction)
+def update_search_document(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    index_instance(instance)
+
+
+@receiver(post_delete, sender=Contact)
+@receiver(post_delete, sender=Property)
+@receiver(post_delete, sender=Transaction)
+def delete_search_document(sender, instance, **kwargs):
+    remove_instance(instance)
+
+
+@receiver(bulk_saved, sender=Contact)
+@receiver(bulk_saved, sender=Property)
+@receiver(bulk_saved, sender=Transaction)
+def index_bulk_saved(sender, objects, **kwargs):
+    for start in range(0, len(objects), 1000):
+        index_objects(objects[start:start + 1000])
+
+
+@receiver(bulk_deleted, sender=Transaction)
+def remove_bulk_deleted(sender, objects, **kwargs):
+    remove_objects(objects)
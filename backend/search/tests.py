@@ -0,0 +1,95 @@
+import importlib
+from io import StringIO
+
+from django.apps import apps
+from django.core.management import call_command
+from django.urls import reverse
+
+from accounts.models import Organization
+from realtor_crm_backend.testcases import OrganizationTestCase
+from transactions.models import Contact, Transaction
+from . import index as search_index
+from .models import SearchDocument
+
+
+class SearchTests(OrganizationTestCase):
+    def setUp(self):
+        super().setUp()
+        self.contact = self.make_contact(last_name='Maple')
+        self.property = self.make_property(address='12 Maple Avenue')
+        self.transaction = Transaction.objects.create(
+            organization=self.org, name='Maple Avenue purchase', property=self.property,
+            contact=self.contact, detailed_status='Awaiting inspection',
+        )
+        other = Organization.objects.create(name="Other Agency")
+        Contact.objects.create(
+            organization=other, first_name='Maple', last_name='Other',
+            email='maple@example.com', phone='555-0199',
+        )
+
+    def search(self, **params):
+        response = self.client.get(reverse('search'), params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_ranked_and_tenant_scoped(self):
+        results = self.search(q='maple')['results']
+        self.assertEqual(
+            sorted((row['type'], row['id']) for row in results),
+            [('contact', self.contact.pk), ('property', self.property.pk), ('transaction', self.transaction.pk)],
+        )
+        scores = [row['score'] for row in results]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+        self.assertEqual([row['id'] for row in self.search(q='maple', type='contact')['results']], [self.contact.pk])
+        # Prefix matching across fields
+        self.assertEqual([row['type'] for row in self.search(q='jan 555')['results']], ['contact'])
+        self.assertEqual([row['type'] for row in self.search(q='inspect')['results']], ['transaction'])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.contact.last_name = 'Birch'
+        self.contact.save()
+        self.assertEqual([row['type'] for row in self.search(q='birch')['results']], ['contact'])
+        self.assertNotIn('contact', [row['type'] for row in self.search(q='maple')['results']])
+
+        self.transaction.delete()
+        self.assertEqual([row['type'] for row in self.search(q='maple')['results']], ['property'])
+
+    def test_documents_follow_their_organization(self):
+        other = Organization.objects.get(name="Other Agency")
+        SearchDocument.objects.filter(model='property').update(organization=other)
+        self.assertEqual([row['type'] for row in self.search(q='avenue')['results']], ['transaction'])
+        self.assertEqual([row[0] for row in search_index.search(other.pk, 'avenue')], ['property'])
+
+    def test_pagination(self):
+        for n in range(4):
+            Contact.objects.create(
+                organization=self.org, first_name=f'Oak{n}', last_name='Smith',
+                email=f'oak{n}@example.com', phone='555-0101',
+            )
+        first = self.search(q='smith', page_size=3)
+        self.assertEqual(len(first['results']), 3)
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).data
+        self.assertEqual(len(second['results']), 1)
+        self.assertIsNone(second['next'])
+        ids = [row['id'] for row in first['results'] + second['results']]
+        self.assertEqual(len(set(ids)), 4)
+
+    def test_invalid_query(self):
+        self.assertEqual(self.client.get(reverse('search'), {'q': '  '}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('search'), {'q': 'maple', 'type': 'deal'}).status_code, 400)
+
+    def test_rebuild_command(self):
+        SearchDocument.objects.all().delete()
+        self.assertEqual(self.search(q='maple')['results'], [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(self.search(q='maple')['results']), 3)
+
+    def test_initial_migration_builds_the_same_documents(self):
+        migration = importlib.import_module('search.migrations.0001_initial')
+        fields = ('organization_id', 'model', 'object_id', 'title', 'subtitle', 'body')
+        indexed = sorted(SearchDocument.objects.values_list(*fields))
+        SearchDocument.objects.all().delete()
+        migration.index_existing_objects(apps, None)
+        self.assertEqual(sorted(SearchDocument.objects.values_list(*fields)), indexed)
@@ -0,0 +1,62 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+from accounts.tenancy import current_organization_id
+from . import index
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# Deep pages of a ranked search are never useful; bound the OFFSET.
+MAX_PAGE = 50
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search(request):
+    """
+    Ranked full-text search over the organization's contacts, properties and transactions.
+
+    ``q`` is the query, ``type`` (repeatable) restricts to contact/property/
+    transaction, ``page``/``page_size`` page through the results.
+    """
+    query = request.query_params.get('q', '').strip()
+    if not index.query_terms(query):
+        return Response({'error': "'q' must contain at least one word."}, status=status.HTTP_400_BAD_REQUEST)
+    models = request.query_params.getlist('type')
+    unknown = set(models) - set(index.DOCUMENTS)
+    if unknown:
+        return Response(
+            {'error': f"Unknown type(s): {', '.join(sorted(unknown))}. Expected contact, property or transaction."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    try:
+        page = int(request.query_params.get('page', 1))
+        page_size = int(request.query_params.get('page_size', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return Response({'error': "'page' and 'page_size' must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+    if not 1 <= page <= MAX_PAGE:
+        return Response({'error': f"'page' must be between 1 and {MAX_PAGE}."}, status=status.HTTP_400_BAD_REQUEST)
+    page_size = min(max(page_size, 1), MAX_PAGE_SIZE)
+
+    # One extra row tells whether another page exists without a COUNT.
+    rows = index.search(
+        current_organization_id(), query, models,
+        limit=page_size + 1, offset=(page - 1) * page_size,
+    )
+    url = request.build_absolute_uri()
+    has_next = len(rows) > page_size and page < MAX_PAGE
+    return Response({
+        'query': query,
+        'next': replace_query_param(url, 'page', page + 1) if has_next else None,
+        'previous': (
+            None if page == 1 else
+            remove_query_param(url, 'page') if page == 2 else replace_query_param(url, 'page', page - 1)
+        ),
+        'results': [
+            {'type': model, 'id': object_id, 'title': title, 'subtitle': subtitle, 'score': round(score, 4)}
+            for model, object_id, title, subtitle, score in rows[:page_size]
+        ],
+    })
@@ -0,0 +1,195 @@
+"""
+Delta sync: the rows created, updated or deleted since a client's cursor.
+
+Every write to a synced model appends a ``Change`` inside the writing
+transaction (see ``sync.signals``): per-row saves and deletes as well as the
+``bulk_saved`` batches of the bulk endpoints and imports, so nothing that
+reaches the database escapes the log. Deletes leave a tombstone.
+
+A sync reads the log past its cursor off the ``(organization, id)`` index,
+keeps the latest entry per row, and loads the surviving rows with one query
+per model, so it costs O(changes since the cursor) however large the
+dataset. Rows render exactly as their list endpoints render them. Rows that
+embed another row's fields (a transaction's ``contact_name``, a deal's
+``contact_details``) are logged again when that contact or property changes.
+
+Log ids are allocated when a write happens but become visible when its
+transaction commits, so a cursor never moves past an entry younger than
+SYNC_SETTLE_SECONDS: those are sent, and sent again on the next sync, rather
+than risk skipping an older id that commits later. Entries older than
+SYNC_LOG_RETENTION_DAYS are pruned (``prune_sync_log``); a cursor issued
+before then asks the client to reset.
+"""
+import base64
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from accounts import changes
+from deals.models import Deal
+from deals.serializers import DealValuesReader
+from interactions.models import Event, Task
+from interactions.serializers import EventSerializer, TaskSerializer
+from transactions.models import Contact, Property, Transaction
+from transactions.serializers import ContactSerializer, PropertySerializer, TransactionValuesReader
+from .models import Change
+
+BATCH_SIZE = 1000
+
+
+class Feed:
+    """How one synced model is scoped and rendered."""
+    def __init__(self, model, key, serializer_class=None, reader_class=None, owned=False):
+        self.model = model
+        # Key of the model's rows in a sync response
+        self.key = key
+        self.serializer_class = serializer_class
+        self.reader_class = reader_class
+        # Rows only their owner (``user``) sees, rather than the whole organization
+        self.owned = owned
+
+    def queryset(self, user):
+        if self.owned:
+            return self.model.objects.filter(user=user)
+        if user.organization_id is None:
+            return self.model.objects.none()
+        return self.model.objects.filter(organization_id=user.organization_id)
+
+    def render(self, user, ids):
+        """``{id: representation}`` of the rows of ``ids`` the user can still see."""
+        queryset = self.queryset(user).filter(pk__in=ids).order_by('pk')
+        if self.reader_class is not None:
+            reader = self.reader_class()
+            return {row['id']: reader.to_representation(row) for row in reader.rows(queryset, keys=('id',))}
+        return {data['id']: data for data in self.serializer_class(queryset, many=True).data}
+
+
+FEEDS = {
+    'contact': Feed(Contact, 'contacts', serializer_class=ContactSerializer),
+    'property': Feed(Property, 'properties', serializer_class=PropertySerializer),
+    'transaction': Feed(Transaction, 'transactions', reader_class=TransactionValuesReader),
+    'deal': Feed(Deal, 'deals', reader_class=DealValuesReader, owned=True),
+    'task': Feed(Task, 'tasks', serializer_class=TaskSerializer),
+    'event': Feed(Event, 'events', serializer_class=EventSerializer),
+}
+NAMES = {feed.model: name for name, feed in FEEDS.items()}
+
+# Synced rows that render fields of another model, by the foreign key to it
+DEPENDENTS = {
+    Contact: [(Transaction, 'contact'), (Deal, 'contact')],
+    Property: [(Transaction, 'property'), (Deal, 'property')],
+}
+
+
+def _append(name, rows, deleted=False):
+    """Log ``(object id, organization id, owner id)`` rows of model ``name``."""
+    Change.objects.bulk_create(
+        [
+            Change(model=name, object_id=pk, organization_id=org_id, owner_id=owner_id, deleted=deleted)
+            for pk, org_id, owner_id in rows
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+
+def record(model, objects, deleted=False):
+    """Log a write (or with ``deleted``, the deletion) of each of ``objects``."""
+    name = NAMES[model]
+    if FEEDS[name].owned:
+        rows = [(obj.pk, changes.organization_id(obj), obj.user_id) for obj in objects]
+    else:
+        rows = [(obj.pk, obj.organization_id, None) for obj in objects]
+    _append(name, rows, deleted)
+
+
+def record_dependents(model, ids):
+    """Log the rows rendering fields of the ``model`` rows ``ids``, which changed."""
+    for dependent, field in DEPENDENTS.get(model, ()):
+        name = NAMES[dependent]
+        queryset = dependent.objects.filter(**{f'{field}_id__in': ids})
+        if FEEDS[name].owned:
+            rows = queryset.values_list('pk', 'user__organization_id', 'user_id')
+        else:
+            rows = ((pk, org_id, None) for pk, org_id in queryset.values_list('pk', 'organization_id'))
+        _append(name, rows)
+
+
+def visible(user):
+    """The log entries ``user`` syncs: the organization's, and their own rows'."""
+    own = Q(owner=user)
+    if user.organization_id is None:
+        return Change.objects.filter(own)
+    return Change.objects.filter(Q(organization_id=user.organization_id, owner__isnull=True) | own)
+
+
+def _settled_before():
+    return timezone.now() - timedelta(seconds=getattr(settings, 'SYNC_SETTLE_SECONDS', 5))
+
+
+def head():
+    """Log position a client that has just loaded everything can sync from."""
+    settled = Change.objects.filter(created_at__lte=_settled_before()).order_by('-id')
+    return settled.values_list('id', flat=True).first() or 0
+
+
+def encode_cursor(position):
+    payload = {'id': position, 't': timezone.now().isoformat()}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+
+
+def decode_cursor(token):
+    """``(position, issued_at)`` of a cursor; ``ValueError`` if it is not one."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+        position, issued_at = int(payload['id']), parse_datetime(payload['t'])
+    except (TypeError, ValueError, KeyError):
+        raise ValueError("Invalid cursor")
+    if issued_at is None or timezone.is_naive(issued_at) or position < 0:
+        raise ValueError("Invalid cursor")
+    return position, issued_at
+
+
+def expired(issued_at):
+    """Whether entries a cursor issued at ``issued_at`` still needs may have been pruned."""
+    retention = timedelta(days=getattr(settings, 'SYNC_LOG_RETENTION_DAYS', 30))
+    return issued_at < timezone.now() - retention
+
+
+def changes_since(user, position, limit):
+    """
+    Up to ``limit`` log entries past ``position`` as
+    ``(upserted rows by key, deleted ids by key, new position, has_more)``.
+    """
+    entries = list(
+        visible(user).filter(id__gt=position).order_by('id')
+        .values_list('id', 'model', 'object_id', 'deleted', 'created_at')[:limit + 1]
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    settled_before = _settled_before()
+    latest, settled = {}, True
+    for entry_id, name, object_id, deleted, created_at in entries:
+        latest[name, object_id] = deleted
+        settled = settled and created_at <= settled_before
+        if settled:
+            position = entry_id
+    if not settled:
+        # The unsettled tail is sent again next time; no point asking for more now.
+        has_more = False
+
+    upserted, removed = {}, {}
+    for name, feed in FEEDS.items():
+        ids = [object_id for (model, object_id), deleted in latest.items() if model == name and not deleted]
+        rows = feed.render(user, ids) if ids else {}
+        upserted[feed.key] = list(rows.values())
+        # Rows gone by now (or no longer visible) are deletions too.
+        removed[feed.key] = sorted(
+            [object_id for (model, object_id), deleted in latest.items() if model == name and deleted]
+            + [object_id for object_id in ids if object_id not in rows]
+        )
+    return upserted, removed, position, has_more
@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from sync.models import Change
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete sync log entries older than SYNC_LOG_RETENTION_DAYS. Clients whose cursor is "
+        "older than that are asked to reset on their next sync."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        # The same period the sync endpoint expires cursors after, so no live cursor skips a pruned entry.
+        days = getattr(settings, 'SYNC_LOG_RETENTION_DAYS', 30)
+        cutoff = timezone.now() - timedelta(days=days)
+        total = 0
+        while True:
+            # Old entries are the lowest ids: each batch is a short scan of the primary key.
+            ids = list(
+                Change.objects.filter(created_at__lt=cutoff).order_by('id')
+                .values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            Change.objects.filter(id__in=ids).delete()
+            total += len(ids)
+        self.stdout.write(self.style.SUCCESS(f"Pruned {total} sync log entries older than {days} days."))
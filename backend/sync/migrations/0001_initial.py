@@ -0,0 +1,33 @@
+# Generated by Django 6.0.2 on 2026-10-17 13:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('accounts', '0003_changecounter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(choices=[('contact', 'Contact'), ('property', 'Property'), ('transaction', 'Transaction'), ('deal', 'Deal'), ('task', 'Task'), ('event', 'Event')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('organization', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sync_changes', to='accounts.organization')),
+                ('owner', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['organization', 'id'], name='sync_change_org_idx'), models.Index(fields=['owner', 'id'], name='sync_change_owner_idx')],
+            },
+        ),
+    ]
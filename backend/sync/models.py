@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.db import models
+from accounts.models import Organization
+
+
+class Change(models.Model):
+    """
+    One write to a synced row, appended in the writing transaction.
+
+    The auto-incrementing ``id`` orders the log and is what sync cursors
+    point into. ``deleted`` entries are the tombstones of deleted rows.
+    ``owner`` is set for rows only their owner sees (deals); everything else
+    is shared by the organization.
+    """
+    MODEL_CHOICES = [
+        ('contact', 'Contact'),
+        ('property', 'Property'),
+        ('transaction', 'Transaction'),
+        ('deal', 'Deal'),
+        ('task', 'Task'),
+        ('event', 'Event'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    organization = models.ForeignKey(
+        Organization, on_delete=models.CASCADE, null=True, related_name='sync_changes'
+    )
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, related_name='+'
+    )
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # A sync reads the organization's (or owner's) entries past its cursor.
+            models.Index(fields=['organization', 'id'], name='sync_change_org_idx'),
+            models.Index(fields=['owner', 'id'], name='sync_change_owner_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.id}: {'delete' if self.deleted else 'upsert'} {self.model} {self.object_id}"
@@ -0,0 +1,51 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from accounts.models import Organization, User
+from transactions.signals import bulk_deleted, bulk_saved
+from . import changelog
+
+
+@receiver(post_save)
+def log_save(sender, instance, created, raw=False, **kwargs):
+    if sender not in changelog.NAMES or raw:
+        return
+    changelog.record(sender, [instance])
+    if not created:
+        changelog.record_dependents(sender, [instance.pk])
+
+
+@receiver(pre_delete)
+def log_dependents_before_delete(sender, instance, origin=None, **kwargs):
+    # Deals keep their row when their contact or property goes (SET_NULL, no
+    # signals), so log them while they still point at it.
+    if sender in changelog.DEPENDENTS and not isinstance(origin, Organization):
+        changelog.record_dependents(sender, [instance.pk])
+
+
+@receiver(post_delete)
+def log_delete(sender, instance, origin=None, **kwargs):
+    if sender not in changelog.NAMES:
+        return
+    # Rows deleted along with their organization take its log with them, and
+    # owned rows deleted with their owner have nobody left to sync them.
+    if isinstance(origin, Organization):
+        return
+    if changelog.FEEDS[changelog.NAMES[sender]].owned and isinstance(origin, User):
+        return
+    changelog.record(sender, [instance], deleted=True)
+
+
+@receiver(bulk_saved)
+def log_bulk_save(sender, objects, previous, **kwargs):
+    if sender not in changelog.NAMES:
+        return
+    changelog.record(sender, objects)
+    if previous:
+        changelog.record_dependents(sender, list(previous))
+
+
+@receiver(bulk_deleted)
+def log_bulk_delete(sender, objects, **kwargs):
+    if sender in changelog.NAMES:
+        changelog.record(sender, objects, deleted=True)
@@ -0,0 +1,172 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Organization
+from deals.models import Deal
+from interactions.models import Task
+from realtor_crm_backend.testcases import OrganizationTestCase
+from transactions.models import Contact, Transaction
+from . import changelog
+from .models import Change
+
+User = get_user_model()
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class SyncTests(OrganizationTestCase):
+    def setUp(self):
+        super().setUp()
+        self.contact = self.make_contact()
+        self.property = self.make_property()
+        self.cursor = self.sync().data['cursor']
+
+    def sync(self, **params):
+        response = self.client.get(reverse('sync'), params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response
+
+    def sync_since(self):
+        data = self.sync(cursor=self.cursor).data
+        self.assertFalse(data['reset'])
+        self.cursor = data['cursor']
+        return data
+
+    def test_without_cursor_the_client_resets(self):
+        data = self.sync().data
+        self.assertTrue(data['reset'])
+        self.assertEqual(data['changes']['contacts'], [])
+        # Everything up to now is already reflected in a full reload.
+        self.assertEqual(self.sync_since()['changes']['contacts'], [])
+
+    def test_returns_rows_changed_since_the_cursor(self):
+        transaction = Transaction.objects.create(
+            organization=self.org, name='Sale', property=self.property, contact=self.contact,
+        )
+        Task.objects.create(organization=self.org, user=self.user, title='Call Jane')
+        data = self.sync_since()
+        self.assertEqual(len(data['changes']['tasks']), 1)
+        detail = self.client.get(reverse('transaction-detail', args=[transaction.pk])).data
+        self.assertEqual(data['changes']['transactions'], [detail])
+        self.assertEqual(data['changes']['contacts'], [])
+
+        self.contact.phone = '555-0199'
+        self.contact.save()
+        data = self.sync_since()
+        self.assertEqual([row['phone'] for row in data['changes']['contacts']], ['555-0199'])
+        self.assertEqual(data['changes']['tasks'], [])
+        self.assertEqual(self.sync_since()['changes']['contacts'], [])
+
+    def test_deletes_leave_tombstones(self):
+        contact_id = self.contact.pk
+        transaction = Transaction.objects.create(
+            organization=self.org, name='Sale', property=self.property, contact=self.contact,
+        )
+        deal = Deal.objects.create(user=self.user, contact=self.contact, value=Decimal('1000.00'))
+        self.cursor = self.sync_since()['cursor']
+
+        self.contact.delete()
+        data = self.sync_since()
+        self.assertEqual(data['deleted']['contacts'], [contact_id])
+        self.assertEqual(data['deleted']['transactions'], [transaction.pk])
+        # The deal survives with its contact cleared.
+        self.assertEqual([row['id'] for row in data['changes']['deals']], [deal.pk])
+        self.assertIsNone(data['changes']['deals'][0]['contact_details'])
+
+    def test_embedded_fields_follow_their_source(self):
+        transaction = Transaction.objects.create(
+            organization=self.org, name='Sale', property=self.property, contact=self.contact,
+        )
+        self.sync_since()
+        self.contact.last_name = 'Smith'
+        self.contact.save()
+        data = self.sync_since()
+        self.assertEqual(data['changes']['transactions'][0]['id'], transaction.pk)
+        self.assertEqual(data['changes']['transactions'][0]['contact_name'], 'Jane Smith')
+
+    def test_bulk_writes_are_logged(self):
+        rows = [
+            {'first_name': f'C{n}', 'last_name': 'Doe', 'email': f'c{n}@example.com', 'phone': '555'}
+            for n in range(3)
+        ]
+        created = self.client.post(reverse('contact-bulk'), rows, format='json').data['created']
+        self.assertEqual(sorted(row['id'] for row in self.sync_since()['changes']['contacts']), sorted(created))
+
+        before = Contact.objects.get(pk=created[0]).updated_at
+        self.client.patch(reverse('contact-bulk'), [{'id': created[0], 'phone': '1'}], format='json')
+        [row] = self.sync_since()['changes']['contacts']
+        self.assertEqual(row['phone'], '1')
+        self.assertGreater(Contact.objects.get(pk=created[0]).updated_at, before)
+
+        self.client.delete(reverse('contact-bulk'), {'ids': created}, format='json')
+        self.assertEqual(self.sync_since()['deleted']['contacts'], sorted(created))
+
+    def test_only_the_callers_rows(self):
+        other_org = Organization.objects.create(name="Other Agency")
+        other = User.objects.create_user(username='other', password='pass', organization=other_org)
+        Contact.objects.create(organization=other_org, first_name='X', last_name='Y', email='x@example.com')
+        colleague = User.objects.create_user(username='colleague', password='pass', organization=self.org)
+        Deal.objects.create(user=colleague, value=Decimal('1.00'))
+        Deal.objects.create(user=other, value=Decimal('1.00'))
+        mine = Deal.objects.create(user=self.user, value=Decimal('1.00'))
+        data = self.sync_since()
+        self.assertEqual(data['changes']['contacts'], [])
+        self.assertEqual([row['id'] for row in data['changes']['deals']], [mine.pk])
+
+    def test_costs_queries_per_change_not_per_row(self):
+        Contact.objects.bulk_create([
+            Contact(organization=self.org, first_name='C', last_name=str(n), email=f'{n}@example.com')
+            for n in range(200)
+        ])
+        Task.objects.create(organization=self.org, user=self.user, title='Call Jane')
+        self.property.save()
+        # The log past the cursor, then one query per model with changes.
+        with self.assertNumQueries(3):
+            data = self.sync_since()
+        self.assertEqual(len(data['changes']['tasks']), 1)
+        self.assertEqual(len(data['changes']['properties']), 1)
+
+    def test_pages_through_the_log(self):
+        for n in range(5):
+            Task.objects.create(organization=self.org, user=self.user, title=f'Task {n}')
+        seen = []
+        while True:
+            data = self.sync(cursor=self.cursor, limit=2).data
+            seen += [row['title'] for row in data['changes']['tasks']]
+            self.cursor = data['cursor']
+            if not data['has_more']:
+                break
+        self.assertEqual(seen, [f'Task {n}' for n in range(5)])
+
+    @override_settings(SYNC_SETTLE_SECONDS=60)
+    def test_cursor_stays_behind_unsettled_changes(self):
+        Task.objects.create(organization=self.org, user=self.user, title='Call Jane')
+        cursor = self.cursor
+        data = self.sync_since()
+        self.assertEqual(len(data['changes']['tasks']), 1)
+        self.assertFalse(data['has_more'])
+        self.assertEqual(changelog.decode_cursor(data['cursor'])[0], changelog.decode_cursor(cursor)[0])
+        # Sent again until it settles
+        self.assertEqual(len(self.sync_since()['changes']['tasks']), 1)
+
+    def test_old_or_invalid_cursors(self):
+        response = self.client.get(reverse('sync'), {'cursor': 'nonsense'})
+        self.assertEqual(response.status_code, 400)
+
+        with override_settings(SYNC_LOG_RETENTION_DAYS=0):
+            self.assertTrue(self.sync(cursor=self.cursor).data['reset'])
+
+    def test_prune(self):
+        Task.objects.create(organization=self.org, user=self.user, title='Call Jane')
+        Change.objects.update(created_at=timezone.now() - timedelta(days=31))
+        Task.objects.create(organization=self.org, user=self.user, title='Email Jane')
+        out = StringIO()
+        with override_settings(SYNC_LOG_RETENTION_DAYS=30):
+            call_command('prune_sync_log', stdout=out)
+        self.assertEqual(Change.objects.count(), 1)
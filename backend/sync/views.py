@@ -0,0 +1,53 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from . import changelog
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 2000
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sync(request):
+    """
+    Contacts, properties, transactions, deals, tasks and events changed since ``cursor``.
+
+    Returns the rows created or updated (``changes``) and the ids deleted
+    (``deleted``) per model, and the ``cursor`` to send next time. Without a
+    cursor, or with one too old to replay, ``reset`` is true: the client
+    reloads everything from the list endpoints, then syncs from the returned
+    cursor. ``has_more`` asks the client to sync again right away; ``limit``
+    bounds the log entries read per call.
+    """
+    try:
+        limit = int(request.query_params.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        return Response({'error': "'limit' must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+    limit = min(max(limit, 1), MAX_LIMIT)
+
+    token = request.query_params.get('cursor')
+    if token:
+        try:
+            position, issued_at = changelog.decode_cursor(token)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    if not token or changelog.expired(issued_at):
+        return Response({
+            'cursor': changelog.encode_cursor(changelog.head()),
+            'reset': True,
+            'has_more': False,
+            'changes': {feed.key: [] for feed in changelog.FEEDS.values()},
+            'deleted': {feed.key: [] for feed in changelog.FEEDS.values()},
+        })
+
+    upserted, deleted, position, has_more = changelog.changes_since(request.user, position, limit)
+    return Response({
+        'cursor': changelog.encode_cursor(position),
+        'reset': False,
+        'has_more': has_more,
+        'changes': upserted,
+        'deleted': deleted,
+    })
@@ -1,10 +1,11 @@
 from django.contrib import admin
-from .models import Property, Contact, Transaction
+from .models import ArchivedTransaction, ImportJob, Property, Contact, Transaction
 
 @admin.register(Property)
 class PropertyAdmin(admin.ModelAdmin):
     list_display = ('address', 'city', 'list_price', 'status', 'created_at')
     search_fields = ('address', 'city')
+    readonly_fields = ('geohash',)
     list_filter = ('status', 'property_type', 'organization')
 
 @admin.register(Contact)
@@ -18,3 +19,14 @@ class TransactionAdmin(admin.ModelAdmin):
     list_display = ('name', 'property', 'contact', 'stage', 'value', 'close_date')
     list_filter = ('stage', 'organization')
     search_fields = ('name', 'property__address', 'contact__first_name', 'contact__last_name')
+
+@admin.register(ArchivedTransaction)
+class ArchivedTransactionAdmin(admin.ModelAdmin):
+    list_display = ('name', 'stage', 'value', 'close_date', 'archived_at')
+    list_filter = ('stage', 'organization')
+    search_fields = ('name',)
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'organization', 'status', 'rows_processed', 'error_count', 'created_at')
+    list_filter = ('kind', 'status', 'organization')
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class TransactionsConfig(AppConfig):
     name = 'transactions'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,138 @@
+"""
+Hot/cold storage for transactions.
+
+Archiving moves a transaction out of the live ``Transaction`` table into
+``ArchivedTransaction`` under the same id, its ``StageHistory`` rows folded
+into the archived row as JSON. The live table and its indexes, and so every
+list, dashboard rollup, monthly series, search and sync over it, then only
+cover active business however much history piles up. Restoring moves the row
+and its history back.
+
+Both directions work a batch at a time in one database transaction: a read of
+the rows and their history, bulk inserts on one side, bulk deletes on the
+other. The per-row save/delete signals are skipped; ``bulk_deleted`` and
+``bulk_saved`` let the rollups, search index, response caches and sync log
+catch up once per batch instead. A restored row keeps the ``created_at`` and
+``updated_at`` it was archived with.
+
+``archive_stale`` (the ``archive_transactions`` command) archives closed
+transactions older than TRANSACTION_ARCHIVE_AFTER_DAYS, batch by batch.
+"""
+from datetime import datetime, time
+
+from django.db import transaction as db_transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from analytics.models import StageHistory
+from .models import ArchivedTransaction, Transaction
+from .signals import bulk_deleted, bulk_saved
+
+BATCH_SIZE = 500
+ARCHIVABLE_STAGES = ('Closed Won', 'Closed Lost')
+
+# Columns copied between the live and the archived row
+FIELDS = (
+    'organization_id', 'name', 'property_id', 'contact_id', 'type_id', 'status_id', 'stage', 'value',
+    'close_date', 'commission_rate', 'detailed_status', 'property_type', 'created_at', 'updated_at',
+)
+
+
+def _history(ids):
+    """Stage history of the transactions ``ids``, oldest first, as JSON-ready dicts by id."""
+    history = {}
+    rows = (
+        StageHistory.objects.filter(model='transaction', object_id__in=ids)
+        .order_by('changed_at', 'id')
+        .values_list('object_id', 'from_stage', 'to_stage', 'changed_at', 'user_id')
+    )
+    for object_id, from_stage, to_stage, changed_at, user_id in rows:
+        history.setdefault(object_id, []).append({
+            'from_stage': from_stage, 'to_stage': to_stage,
+            'changed_at': changed_at.isoformat(), 'user': user_id,
+        })
+    return history
+
+
+def archive(transactions):
+    """Move ``transactions`` (live rows) to cold storage; returns the archived rows."""
+    transactions = list(transactions)
+    if not transactions:
+        return []
+    ids = [obj.pk for obj in transactions]
+    with db_transaction.atomic():
+        history = _history(ids)
+        archived = ArchivedTransaction.objects.bulk_create([
+            ArchivedTransaction(
+                id=obj.pk, stage_history=history.get(obj.pk, []),
+                **{field: getattr(obj, field) for field in FIELDS},
+            )
+            for obj in transactions
+        ], batch_size=BATCH_SIZE)
+        StageHistory.objects.filter(model='transaction', object_id__in=ids).delete()
+        # Nothing references a transaction, so the rows can go without the
+        # deletion collector and its per-row signals; bulk_deleted stands in.
+        live = Transaction.objects.filter(pk__in=ids)
+        live._raw_delete(live.db)
+        bulk_deleted.send(sender=Transaction, objects=transactions)
+        bulk_saved.send(sender=ArchivedTransaction, objects=archived, previous={})
+    return archived
+
+
+def restore(archived):
+    """Move ``archived`` rows back into the live table; returns the live rows."""
+    archived = list(archived)
+    if not archived:
+        return []
+    ids = [row.pk for row in archived]
+    with db_transaction.atomic():
+        restored = Transaction.objects.bulk_create([
+            Transaction(id=row.pk, **{field: getattr(row, field) for field in FIELDS}) for row in archived
+        ], batch_size=BATCH_SIZE)
+        # bulk_create stamps created_at and updated_at (auto_now_add/auto_now);
+        # put the archived ones back. bulk_update leaves auto_now alone.
+        for obj, row in zip(restored, archived):
+            obj.created_at, obj.updated_at = row.created_at, row.updated_at
+        Transaction.objects.bulk_update(restored, ['created_at', 'updated_at'], batch_size=BATCH_SIZE)
+        StageHistory.objects.bulk_create([
+            StageHistory(
+                organization_id=row.organization_id, user_id=entry['user'], model='transaction',
+                object_id=row.pk, from_stage=entry['from_stage'], to_stage=entry['to_stage'],
+                changed_at=parse_datetime(entry['changed_at']),
+            )
+            for row in archived for entry in row.stage_history
+        ], batch_size=BATCH_SIZE)
+        cold = ArchivedTransaction.objects.filter(pk__in=ids)
+        cold._raw_delete(cold.db)
+        bulk_deleted.send(sender=ArchivedTransaction, objects=archived)
+        bulk_saved.send(sender=Transaction, objects=restored, previous={}, restored=True)
+    return restored
+
+
+def archivable(before, organization_id=None):
+    """Closed transactions that closed (or, without a close date, last changed) before the date ``before``."""
+    cutoff = timezone.make_aware(datetime.combine(before, time.min))
+    queryset = Transaction.objects.filter(
+        Q(close_date__lt=before) | Q(close_date__isnull=True, updated_at__lt=cutoff),
+        stage__in=ARCHIVABLE_STAGES,
+    )
+    if organization_id is not None:
+        queryset = queryset.filter(organization_id=organization_id)
+    return queryset
+
+
+def archive_stale(before, organization_id=None, batch_size=BATCH_SIZE, progress=None):
+    """
+    Archive ``archivable`` transactions ``batch_size`` at a time, calling
+    ``progress(total)`` after each committed batch. Returns how many moved.
+    """
+    total, last = 0, 0
+    queryset = archivable(before, organization_id).order_by('pk')
+    while batch := list(queryset.filter(pk__gt=last)[:batch_size]):
+        archive(batch)
+        total += len(batch)
+        last = batch[-1].pk
+        if progress:
+            progress(total)
+    return total
@@ -0,0 +1,117 @@
+"""
+Bulk create/update/delete for the transactions viewsets.
+
+Rows are validated with the viewset's serializer, but every writable
+primary-key field is resolved from one query per referenced table (scoped to
+the organization) instead of one per row. Writes go through
+``bulk_create``/``bulk_update`` in a single transaction and are all-or-nothing:
+any invalid row fails the batch and the response lists the errors per row
+index. ``bulk_saved`` then lets the rollups, search index and response cache
+catch up once per batch.
+"""
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from .signals import bulk_saved
+
+MAX_ROWS = 5000
+BATCH_SIZE = 1000
+
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Resolves ids from ``objects`` (loaded up front) rather than querying per value."""
+    def __init__(self, objects, **kwargs):
+        self.objects = objects
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return self.objects[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+def snapshot(instance):
+    """Field values of ``instance`` by attname."""
+    return {field.attname: getattr(instance, field.attname) for field in instance._meta.concrete_fields}
+
+
+def touch(instances, fields):
+    """Set ``updated_at`` and add it to ``fields``: bulk_update skips ``auto_now``."""
+    now = timezone.now()
+    for instance in instances:
+        instance.updated_at = now
+    fields.add('updated_at')
+
+
+def _prefetch_related(serializer, rows, organization_id):
+    for name, field in list(serializer.fields.items()):
+        if field.read_only or not isinstance(field, serializers.PrimaryKeyRelatedField):
+            continue
+        ids = set()
+        for row in rows:
+            try:
+                ids.add(int(row[name]))
+            except (KeyError, TypeError, ValueError):
+                pass
+        queryset = field.get_queryset()
+        if organization_id is not None and any(f.name == 'organization' for f in queryset.model._meta.fields):
+            # References must stay inside the organization being written.
+            queryset = queryset.filter(organization_id=organization_id)
+        kwargs = {**field._kwargs, 'queryset': queryset}
+        serializer.fields[name] = PrefetchedPrimaryKeyRelatedField(queryset.in_bulk(ids), **kwargs)
+
+
+def validate_rows(serializer, rows, organization_id):
+    """
+    Validate ``rows`` with ``serializer`` (a ``many=True`` serializer).
+
+    Returns ``(validated, errors)``: validated data per row, and
+    ``[{'index': i, 'errors': ...}]`` for the rows that failed.
+    """
+    child = serializer.child
+    dict_rows = [row for row in rows if isinstance(row, dict)]
+    _prefetch_related(child, dict_rows, organization_id)
+
+    validated, errors = [], []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append({'index': index, 'errors': {'non_field_errors': ['Expected an object.']}})
+            continue
+        try:
+            validated.append(child.run_validation(row))
+        except ValidationError as exc:
+            errors.append({'index': index, 'errors': exc.detail})
+    return validated, errors
+
+
+def create_rows(model, validated, organization):
+    with db_transaction.atomic():
+        objects = model.objects.bulk_create(
+            [model(organization=organization, **data) for data in validated], batch_size=BATCH_SIZE
+        )
+        bulk_saved.send(sender=model, objects=objects, previous={})
+    return objects
+
+
+def update_rows(model, instances, validated):
+    """Apply ``validated`` (one dict per instance, same order) and save with one bulk_update."""
+    previous = {instance.pk: snapshot(instance) for instance in instances}
+    fields = set()
+    for instance, data in zip(instances, validated):
+        for name, value in data.items():
+            setattr(instance, name, value)
+            fields.add(name)
+    if fields:
+        touch(instances, fields)
+    with db_transaction.atomic():
+        if fields:
+            model.objects.bulk_update(instances, sorted(fields), batch_size=BATCH_SIZE)
+        bulk_saved.send(sender=model, objects=instances, previous=previous)
+    return instances
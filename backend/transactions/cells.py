@@ -0,0 +1,159 @@
+"""
+Pre-counted map clusters for zoomed-out views.
+
+A zoomed-out map tile can cover most of an organization's properties, so
+clustering it from the ``Property`` table costs a pass over all of them.
+Instead every property counts towards one ``PropertyCell`` per geohash
+length up to ROLLUP_LENGTH (its cell, the cell containing that, ...), which
+also sums the coordinates for the cluster's mean position. A cluster query
+at one of those lengths reads just the cells covering the box, however many
+properties they hold; finer clusters (boxes a kilometre or two across)
+are aggregated live by ``geo.clusters``.
+
+Writes that move, add or remove a located property apply the difference to
+its cells in the same transaction (see ``transactions.signals``); bulk
+writes apply a whole batch with one read and one write per organization.
+A cluster belongs to the box holding its mean position, so adjacent tiles
+never both show the same one.
+"""
+from collections import defaultdict
+
+from django.db import transaction as db_transaction
+from django.db.models import Q
+
+from accounts.models import Organization
+from . import geo
+from .models import Property, PropertyCell
+
+ROLLUP_LENGTH = 6
+BATCH_SIZE = 500
+# Fields of a Property row that decide its cells
+LOCATION_FIELDS = ('organization_id', 'latitude', 'longitude')
+
+
+def location(row):
+    """``(organization id, latitude, longitude)`` of a row (dict by attname), or None without coordinates."""
+    if row is None or row['latitude'] is None or row['longitude'] is None:
+        return None
+    return row['organization_id'], row['latitude'], row['longitude']
+
+
+def apply_changes(changes):
+    """Apply ``(before, after)`` pairs of ``location()`` values (None: no location) to the cells."""
+    deltas = defaultdict(lambda: [0, 0.0, 0.0])
+    for before, after in changes:
+        if before == after:
+            continue
+        for state, sign in ((before, -1), (after, 1)):
+            if state is None:
+                continue
+            org_id, latitude, longitude = state
+            code = geo.encode(latitude, longitude, ROLLUP_LENGTH)
+            for length in range(1, ROLLUP_LENGTH + 1):
+                delta = deltas[org_id, code[:length]]
+                delta[0] += sign
+                delta[1] += sign * latitude
+                delta[2] += sign * longitude
+
+    by_organization = defaultdict(dict)
+    for (org_id, cell), delta in deltas.items():
+        if any(delta):
+            by_organization[org_id][cell] = delta
+    for org_id, org_deltas in by_organization.items():
+        _apply(org_id, org_deltas)
+
+
+def _apply(org_id, deltas):
+    with db_transaction.atomic():
+        # Read-modify-write: serialize concurrent updates of the organization's cells.
+        Organization.objects.select_for_update().filter(pk=org_id).exists()
+        by_length = defaultdict(list)
+        for cell in deltas:
+            by_length[len(cell)].append(cell)
+        existing = {}
+        for length, cells in by_length.items():
+            for start in range(0, len(cells), BATCH_SIZE):
+                rows = PropertyCell.objects.filter(
+                    organization_id=org_id, precision=length, cell__in=cells[start:start + BATCH_SIZE],
+                )
+                existing.update((row.cell, row) for row in rows)
+
+        updated, created, emptied = [], [], []
+        for cell, (count, latitude, longitude) in deltas.items():
+            row = existing.get(cell)
+            if row is None:
+                if count > 0:
+                    created.append(PropertyCell(
+                        organization_id=org_id, precision=len(cell), cell=cell,
+                        count=count, latitude_sum=latitude, longitude_sum=longitude,
+                    ))
+                continue
+            row.count += count
+            row.latitude_sum += latitude
+            row.longitude_sum += longitude
+            (updated if row.count > 0 else emptied).append(row)
+        PropertyCell.objects.bulk_update(updated, ['count', 'latitude_sum', 'longitude_sum'], batch_size=BATCH_SIZE)
+        PropertyCell.objects.bulk_create(created, batch_size=BATCH_SIZE)
+        # Nothing references a cell: no need for the deletion collector.
+        emptied = PropertyCell.objects.filter(pk__in=[row.pk for row in emptied])
+        emptied._raw_delete(emptied.db)
+
+
+def rebuild(org_id):
+    """Recount the organization's cells from its properties (after writes that skipped the signals)."""
+    located = (
+        Property.objects.filter(organization_id=org_id).exclude(geohash='')
+        .values_list('latitude', 'longitude', 'geohash')
+    )
+    with db_transaction.atomic():
+        Organization.objects.select_for_update().filter(pk=org_id).exists()
+        # One pass over the properties; grouping by each length in SQL takes one per length.
+        totals = defaultdict(lambda: [0, 0.0, 0.0])
+        for latitude, longitude, geohash in located.iterator(chunk_size=5000):
+            for length in range(1, ROLLUP_LENGTH + 1):
+                total = totals[geohash[:length]]
+                total[0] += 1
+                total[1] += latitude
+                total[2] += longitude
+        stale = PropertyCell.objects.filter(organization_id=org_id)
+        stale._raw_delete(stale.db)
+        PropertyCell.objects.bulk_create(
+            [
+                PropertyCell(
+                    organization_id=org_id, precision=len(cell), cell=cell,
+                    count=count, latitude_sum=latitude, longitude_sum=longitude,
+                )
+                for cell, (count, latitude, longitude) in totals.items()
+            ],
+            batch_size=BATCH_SIZE,
+        )
+
+
+def clusters(queryset, south, west, north, east, length, organization_id=None):
+    """
+    ``geo.clusters`` of ``queryset`` (the organization's properties), read
+    from the organization's cells when ``length`` is within ROLLUP_LENGTH.
+    """
+    if organization_id is None or length > ROLLUP_LENGTH:
+        return geo.clusters(queryset, south, west, north, east, length)
+
+    condition = Q()
+    for box in geo.boxes(south, west, north, east):
+        condition |= geo.cell_filter(geo.cover(*box, max_length=length), field='cell')
+    rows = (
+        PropertyCell.objects.filter(condition, organization_id=organization_id, precision=length)
+        .order_by('cell').values_list('cell', 'count', 'latitude_sum', 'longitude_sum')
+    )
+    found = []
+    for cell, count, latitude_sum, longitude_sum in rows:
+        latitude, longitude = latitude_sum / count, longitude_sum / count
+        if geo.in_box(latitude, longitude, south, west, north, east):
+            found.append({'cell': cell, 'count': count, 'latitude': latitude, 'longitude': longitude, 'id': None})
+
+    singles = {cluster['cell']: cluster for cluster in found if cluster['count'] == 1}
+    if singles:
+        ids = queryset.filter(geo.cell_filter(list(singles))).values_list('geohash', 'pk')
+        for geohash, pk in ids:
+            if geohash[:length] in singles:
+                singles[geohash[:length]]['id'] = pk
+    return found
@@ -0,0 +1,227 @@
+"""
+Spatial lookups over ``Property`` coordinates without PostGIS.
+
+Each property with coordinates stores its geohash: a base32 string that
+names a grid cell, each further character splitting the cell into 32, so a
+cell's properties are exactly the hashes starting with its code and nearby
+points mostly share a prefix. The ``(organization, geohash)`` index turns
+"properties in this cell" into one index range scan on SQLite and
+PostgreSQL alike.
+
+A bounding box is covered by at most MAX_CELLS cells of the finest precision
+that fits (neighbouring cells that sort consecutively merge into one range),
+which is the coarse filter; comparing ``latitude``/``longitude`` to the box
+then drops the candidates that fall in a covering cell but outside the box.
+A radius query is the box around the circle, refined by great-circle
+distance. Clusters group the box's properties by a shorter geohash prefix,
+so the cells line up from tile to tile; zoomed-out ones are read from
+pre-counted cells (``transactions.cells``) rather than aggregated here.
+"""
+import math
+
+from django.db.models import Avg, Count, Min, Q
+from django.db.models.functions import Substr
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+# Stored precision: cells of about 5 x 5 m
+GEOHASH_LENGTH = 9
+# Sorts after every base32 digit, closing a prefix range
+_PREFIX_END = '{'
+MAX_CELLS = 32
+EARTH_RADIUS_KM = 6371.0088
+# Most clusters a tile or view is split into by default
+MAX_CLUSTERS = 128
+MAX_TILE_ZOOM = 22
+
+
+def encode(latitude, longitude, length=GEOHASH_LENGTH):
+    """Geohash of a point, ``length`` characters long."""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    code, bits, value, even = [], 0, 0, True
+    while len(code) < length:
+        interval, coordinate = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            code.append(BASE32[value])
+            bits, value = 0, 0
+    return ''.join(code)
+
+
+def cell_size(length):
+    """``(height, width)`` in degrees of the cells of a geohash ``length`` long."""
+    lng_bits = (5 * length + 1) // 2
+    lat_bits = 5 * length // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def boxes(south, west, north, east):
+    """The box as ``(south, west, north, east)`` boxes, split where it crosses the antimeridian."""
+    if west <= east:
+        return [(south, west, north, east)]
+    return [(south, west, north, 180.0), (south, -180.0, north, east)]
+
+
+def _cells(south, west, north, east, length):
+    height, width = cell_size(length)
+
+    def span(low, high, size, origin):
+        last = round(2 * origin / size) - 1
+        return range(min(last, math.floor((low + origin) / size)), min(last, math.floor((high + origin) / size)) + 1)
+
+    return span(south, north, height, 90), span(west, east, width, 180), height, width
+
+
+def cover(south, west, north, east, max_cells=MAX_CELLS, max_length=GEOHASH_LENGTH):
+    """
+    Geohash cells covering the box: the finest precision (up to
+    ``max_length``) needing at most ``max_cells``.
+    """
+    for length in range(max_length, 0, -1):
+        rows, columns, height, width = _cells(south, west, north, east, length)
+        if len(rows) * len(columns) <= max_cells or length == 1:
+            return sorted({
+                encode(-90 + (row + 0.5) * height, -180 + (column + 0.5) * width, length)
+                for row in rows for column in columns
+            })
+
+
+def _value(cell):
+    value = 0
+    for char in cell:
+        value = value * 32 + BASE32.index(char)
+    return value
+
+
+def prefix_ranges(cells):
+    """``(first, last)`` runs of same-length ``cells`` that sort consecutively."""
+    runs = []
+    for cell in sorted(cells):
+        if runs and _value(cell) == _value(runs[-1][1]) + 1:
+            runs[-1][1] = cell
+        else:
+            runs.append([cell, cell])
+    return [tuple(run) for run in runs]
+
+
+def cell_filter(cells, field='geohash'):
+    """``Q`` for the values of ``field`` starting with any of the same-length ``cells``."""
+    ranges = prefix_ranges(cells)
+    condition = Q()
+    for first, last in ranges:
+        condition |= Q(**{f'{field}__gte': first, f'{field}__lt': last + _PREFIX_END})
+    # The single range spanning them all is what lets a planner without
+    # OR-of-ranges index scans (SQLite) seek on the composite index at all.
+    hull = Q(**{f'{field}__gte': ranges[0][0], f'{field}__lt': ranges[-1][1] + _PREFIX_END})
+    return hull & condition
+
+
+def box_filter(south, west, north, east, max_cells=MAX_CELLS):
+    """``Q`` for the properties inside the box: geohash ranges, then the exact bounds."""
+    condition = Q()
+    for box in boxes(south, west, north, east):
+        condition |= (
+            cell_filter(cover(*box, max_cells=max_cells))
+            & Q(latitude__range=(box[0], box[2]), longitude__range=(box[1], box[3]))
+        )
+    return condition
+
+
+def in_box(latitude, longitude, south, west, north, east):
+    return any(
+        box[0] <= latitude <= box[2] and box[1] <= longitude <= box[3]
+        for box in boxes(south, west, north, east)
+    )
+
+
+def distance_km(lat1, lng1, lat2, lng2):
+    """Great-circle (haversine) distance between two points."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi, d_lambda = phi2 - phi1, math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def radius_box(latitude, longitude, radius_km):
+    """Bounding box ``(south, west, north, east)`` of the circle around a point."""
+    d_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    south, north = max(-90.0, latitude - d_lat), min(90.0, latitude + d_lat)
+    cos_lat = min(math.cos(math.radians(south)), math.cos(math.radians(north)))
+    if south == -90.0 or north == 90.0 or cos_lat <= 0:
+        return south, -180.0, north, 180.0
+    d_lng = math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat))
+    if d_lng >= 180:
+        return south, -180.0, north, 180.0
+    west, east = longitude - d_lng, longitude + d_lng
+    # Wrap across the antimeridian; ``boxes`` splits it again.
+    west = west + 360 if west < -180 else west
+    east = east - 360 if east > 180 else east
+    return south, west, north, east
+
+
+def nearest(queryset, latitude, longitude, radius_km, limit):
+    """
+    ``([(distance, id)], has_more)``: up to ``limit`` properties within
+    ``radius_km`` of a point, nearest first, and whether more matched.
+    """
+    box = radius_box(latitude, longitude, radius_km)
+    candidates = queryset.filter(box_filter(*box)).values_list('pk', 'latitude', 'longitude')
+    found = []
+    for pk, lat, lng in candidates.iterator(chunk_size=2000):
+        distance = distance_km(latitude, longitude, lat, lng)
+        if distance <= radius_km:
+            found.append((distance, pk))
+    found.sort()
+    return found[:limit], len(found) > limit
+
+
+def tile_box(zoom, x, y):
+    """Bounds ``(south, west, north, east)`` of web-map (XYZ) tile ``zoom/x/y``."""
+    scale = 2 ** zoom
+
+    def latitude(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / scale))))
+
+    return latitude(y + 1), x / scale * 360 - 180, latitude(y), (x + 1) / scale * 360 - 180
+
+
+def cluster_length(south, west, north, east):
+    """The longest geohash length splitting the box into at most about MAX_CLUSTERS cells."""
+    width = sum(box[3] - box[1] for box in boxes(south, west, north, east))
+    height = north - south
+    best = 1
+    for length in range(1, GEOHASH_LENGTH + 1):
+        cell_height, cell_width = cell_size(length)
+        if (width / cell_width) * (height / cell_height) > MAX_CLUSTERS:
+            break
+        best = length
+    return best
+
+
+def clusters(queryset, south, west, north, east, length):
+    """
+    The box's properties grouped by geohash cell of ``length``: cell, count,
+    mean position, and the property's id for cells holding just one.
+    """
+    rows = (
+        queryset.filter(box_filter(south, west, north, east))
+        .annotate(cell=Substr('geohash', 1, length))
+        .order_by('cell')
+        .values('cell')
+        .annotate(count=Count('pk'), latitude=Avg('latitude'), longitude=Avg('longitude'), first_id=Min('pk'))
+    )
+    return [
+        {
+            'cell': row['cell'], 'count': row['count'],
+            'latitude': row['latitude'], 'longitude': row['longitude'],
+            'id': row['first_id'] if row['count'] == 1 else None,
+        }
+        for row in rows
+    ]
@@ -0,0 +1,344 @@
+"""
+Streaming CSV/MLS import of contacts and properties.
+
+The file is never loaded whole: each stage is a generator feeding the next,
+
+    parse -> normalize -> chunked -> upsert
+
+so at most ``chunk_size`` rows are held at once whatever the file size.
+
+* ``parse`` reads the file line by line and yields each record with the byte
+  offset just past it (quoted fields may span lines, as MLS remarks do).
+* ``normalize`` maps MLS/RESO and spreadsheet column names onto our fields
+  (``ListPrice`` -> ``price``, ``StandardStatus`` ``Closed`` -> ``Sold``, ...)
+  and validates each row with the API serializer; invalid rows become errors.
+* ``upsert_chunk`` dedupes the chunk against existing rows of the
+  organization (``Contact.email``, ``Property.address`` + ``zip_code``, both
+  case-insensitive) in one query, then ``bulk_create``s the new rows and
+  ``bulk_update``s the existing ones. Within the same transaction the job
+  records the offset reached, so an interrupted import resumes after the last
+  committed chunk instead of starting over.
+
+``bulk_saved`` lets the search index and response cache catch up per chunk.
+
+A job runs once ``claim`` has moved it to ``running``: a conditional update,
+so of two concurrent starts only one gets it. Every committed chunk stamps
+``updated_at``; a running job silent for IMPORT_STALE_SECONDS lost its worker
+(e.g. a restart) and can be claimed again. Uploaded sources (in
+IMPORT_UPLOAD_DIR) are deleted once their job completes or fails.
+"""
+import csv
+import itertools
+import os
+import re
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction as db_transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .bulk import BATCH_SIZE, snapshot, touch
+from .models import Contact, ImportJob, Property
+from .serializers import ContactSerializer, PropertySerializer
+from .signals import bulk_saved
+
+MAX_ERRORS = 100
+
+# Normalized header (lowercase alphanumerics) -> serializer field
+CONTACT_COLUMNS = {
+    'firstname': 'first_name', 'first': 'first_name', 'givenname': 'first_name',
+    'lastname': 'last_name', 'last': 'last_name', 'surname': 'last_name', 'familyname': 'last_name',
+    'email': 'email', 'emailaddress': 'email',
+    'phone': 'phone', 'phonenumber': 'phone', 'mobile': 'phone', 'mobilephone': 'phone', 'cellphone': 'phone',
+    'role': 'role', 'contacttype': 'role',
+}
+PROPERTY_COLUMNS = {
+    'address': 'address', 'streetaddress': 'address', 'unparsedaddress': 'address', 'fulladdress': 'address',
+    'city': 'city',
+    'state': 'state', 'stateorprovince': 'state',
+    'zip': 'zip_code', 'zipcode': 'zip_code', 'postalcode': 'zip_code',
+    'price': 'price', 'listprice': 'price', 'listingprice': 'price',
+    'status': 'status', 'standardstatus': 'status', 'mlsstatus': 'status',
+    'propertytype': 'property_type', 'propertysubtype': 'property_type',
+    'bedrooms': 'bedrooms', 'beds': 'bedrooms', 'bedroomstotal': 'bedrooms',
+    'bathrooms': 'bathrooms', 'baths': 'bathrooms',
+    'bathroomstotaldecimal': 'bathrooms', 'bathroomstotalinteger': 'bathrooms',
+    'squarefeet': 'square_feet', 'sqft': 'square_feet', 'livingarea': 'square_feet',
+    'latitude': 'latitude', 'lat': 'latitude',
+    'longitude': 'longitude', 'lng': 'longitude', 'lon': 'longitude', 'long': 'longitude',
+}
+
+# Normalized value -> choice, for MLS vocabularies
+PROPERTY_STATUSES = {
+    'active': 'Active', 'comingsoon': 'Active',
+    'pending': 'Pending', 'activeundercontract': 'Pending', 'undercontract': 'Pending',
+    'sold': 'Sold', 'closed': 'Sold',
+}
+PROPERTY_TYPES = {
+    'singlefamily': 'Single Family', 'singlefamilyresidence': 'Single Family', 'residential': 'Single Family',
+    'condo': 'Condo', 'condominium': 'Condo',
+    'townhouse': 'Townhouse', 'townhome': 'Townhouse',
+    'multifamily': 'Multi-Family', 'duplex': 'Multi-Family', 'triplex': 'Multi-Family', 'quadruplex': 'Multi-Family',
+    'land': 'Land', 'lot': 'Land', 'lotsandland': 'Land',
+}
+CONTACT_ROLES = {'buyer': 'Buyer', 'seller': 'Seller', 'agent': 'Agent', 'other': 'Other'}
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]')
+
+
+def _key(value):
+    return _NON_ALNUM.sub('', value.lower())
+
+
+def _number(value):
+    return value.replace('$', '').replace(',', '')
+
+
+class ImportKind:
+    """How one model is read, validated and matched to existing rows."""
+    def __init__(self, model, serializer_class, columns, required, cleaners):
+        self.model = model
+        self.serializer_class = serializer_class
+        self.columns = columns
+        self.required = required
+        self.cleaners = cleaners
+
+    def dedupe_key(self, data):
+        if self.model is Contact:
+            return data['email'].lower()
+        return data['zip_code'], data['address'].lower()
+
+    def existing(self, organization_id, keys):
+        """Existing rows of the organization matching ``keys``, by key (oldest row wins)."""
+        queryset = self.model.objects.filter(organization_id=organization_id).order_by('-pk')
+        if self.model is Contact:
+            queryset = queryset.alias(email_key=Lower('email')).filter(email_key__in=keys)
+        else:
+            queryset = queryset.alias(address_key=Lower('address')).filter(
+                zip_code__in={zip_code for zip_code, _ in keys},
+                address_key__in={address for _, address in keys},
+            )
+        # Ordered newest first so the oldest duplicate is the one kept.
+        return {self.dedupe_key(obj.__dict__): obj for obj in queryset}
+
+
+KINDS = {
+    'contact': ImportKind(
+        Contact, ContactSerializer, CONTACT_COLUMNS, required={'email'},
+        cleaners={
+            'email': str.lower,
+            'role': lambda value: CONTACT_ROLES.get(_key(value), value),
+        },
+    ),
+    'property': ImportKind(
+        Property, PropertySerializer, PROPERTY_COLUMNS, required={'address', 'zip_code'},
+        cleaners={
+            'price': _number,
+            'square_feet': _number,
+            'status': lambda value: PROPERTY_STATUSES.get(_key(value), value),
+            'property_type': lambda value: PROPERTY_TYPES.get(_key(value), value),
+        },
+    ),
+}
+
+
+def parse(path, offset=0):
+    """
+    Yield ``(end_offset, row)`` for every record of the CSV at ``path``.
+
+    ``row`` maps the header's columns to the record's values; ``end_offset``
+    is the byte position just past the record, from which ``parse`` can be
+    restarted. Blank lines are skipped.
+    """
+    with open(path, 'rb') as source:
+        header = next(csv.reader([source.readline().decode('utf-8-sig')]), [])
+        if offset > source.tell():
+            source.seek(offset)
+        record = b''
+        for line in iter(source.readline, b''):
+            record += line
+            # Quotes are doubled when escaped, so an odd count means a quoted
+            # field continues on the next line.
+            if record.count(b'"') % 2:
+                continue
+            text, record = record.decode('utf-8'), b''
+            if not text.strip():
+                continue
+            values = next(csv.reader([text]))
+            yield source.tell(), dict(zip(header, values))
+
+
+def normalize(rows, kind):
+    """
+    Yield ``(end_offset, data, errors)`` per parsed row: validated data ready
+    for the model, or ``None`` and the validation errors.
+    """
+    spec = KINDS[kind]
+    serializer = spec.serializer_class()
+    for offset, row in rows:
+        data = {}
+        for column, value in row.items():
+            field = spec.columns.get(_key(column or ''))
+            value = (value or '').strip()
+            if field and value:
+                cleaner = spec.cleaners.get(field)
+                data[field] = cleaner(value) if cleaner else value
+        try:
+            yield offset, serializer.run_validation(data), None
+        except ValidationError as exc:
+            yield offset, None, exc.detail
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def check_header(path, kind):
+    """Raise ``ValueError`` unless the file's header maps to the kind's required fields."""
+    spec = KINDS[kind]
+    with open(path, 'rb') as source:
+        header = next(csv.reader([source.readline().decode('utf-8-sig')]), [])
+    fields = {spec.columns.get(_key(column)) for column in header}
+    missing = sorted(spec.required - fields)
+    if missing:
+        raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+
+
+def upsert_chunk(job, chunk):
+    """Write one chunk and checkpoint ``job`` past it, in one transaction."""
+    spec = KINDS[job.kind]
+    model = spec.model
+    first_row = job.rows_processed + 1
+
+    # Later rows of the chunk win over earlier ones with the same key.
+    latest, errors = {}, []
+    for index, (_, data, row_errors) in enumerate(chunk):
+        if row_errors is not None:
+            errors.append({'row': first_row + index, 'errors': row_errors})
+        else:
+            latest[spec.dedupe_key(data)] = data
+
+    existing = spec.existing(job.organization_id, list(latest)) if latest else {}
+    created, updated, previous, fields = [], [], {}, set()
+    for key, data in latest.items():
+        obj = existing.get(key)
+        if obj is None:
+            created.append(model(organization_id=job.organization_id, **data))
+            continue
+        previous[obj.pk] = snapshot(obj)
+        for name, value in data.items():
+            setattr(obj, name, value)
+            fields.add(name)
+        updated.append(obj)
+    if updated:
+        touch(updated, fields)
+
+    with db_transaction.atomic():
+        if created:
+            model.objects.bulk_create(created, batch_size=BATCH_SIZE)
+        if updated:
+            model.objects.bulk_update(updated, sorted(fields), batch_size=BATCH_SIZE)
+        if created or updated:
+            bulk_saved.send(sender=model, objects=created + updated, previous=previous)
+
+        job.offset = chunk[-1][0]
+        job.rows_processed += len(chunk)
+        job.created_count += len(created)
+        job.updated_count += len(updated)
+        job.error_count += len(errors)
+        job.errors = (job.errors + errors)[:MAX_ERRORS]
+        job.save(update_fields=[
+            'offset', 'rows_processed', 'created_count', 'updated_count',
+            'error_count', 'errors', 'updated_at',
+        ])
+
+
+def run(job, progress=None):
+    """
+    Import ``job.source`` from ``job.offset`` on, calling ``progress(job)``
+    after each committed chunk. A failure marks the job failed and re-raises;
+    running the job again resumes from its checkpoint.
+    """
+    try:
+        check_header(job.source, job.kind)
+        job.size = os.path.getsize(job.source)
+        job.status = 'running'
+        job.message = ''
+        job.save(update_fields=['size', 'status', 'message', 'updated_at'])
+
+        rows = normalize(parse(job.source, job.offset), job.kind)
+        for chunk in chunked(rows, job.chunk_size):
+            upsert_chunk(job, chunk)
+            if progress:
+                progress(job)
+    except Exception as exc:
+        job.status = 'failed'
+        job.message = str(exc)
+        job.save(update_fields=['status', 'message', 'updated_at'])
+        discard_upload(job)
+        raise
+
+    job.status = 'completed'
+    job.offset = job.size
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'offset', 'finished_at', 'updated_at'])
+    discard_upload(job)
+    return job
+
+
+def discard_upload(job):
+    """Delete the job's source if it was uploaded; files given to the command are left alone."""
+    upload_dir = os.path.realpath(settings.IMPORT_UPLOAD_DIR)
+    if os.path.dirname(os.path.realpath(job.source)) != upload_dir:
+        return
+    try:
+        os.remove(job.source)
+    except FileNotFoundError:
+        pass
+
+
+def claim(job):
+    """
+    Mark ``job`` running unless it already is (and isn't stale) or has
+    completed; returns whether this caller got it.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=getattr(settings, 'IMPORT_STALE_SECONDS', 600))
+    claimed = ImportJob.objects.filter(
+        Q(status__in=['pending', 'failed']) | Q(status='running', updated_at__lt=stale), pk=job.pk,
+    ).update(status='running', updated_at=now)
+    if claimed:
+        job.status, job.updated_at = 'running', now
+    return bool(claimed)
+
+
+def _run_in_thread(job_id):
+    try:
+        run(ImportJob.objects.get(pk=job_id))
+    except Exception:
+        pass  # Recorded on the job
+    finally:
+        connection.close()
+
+
+def start(job):
+    """
+    Claim ``job`` and run it in a background thread, or inline when
+    IMPORT_RUN_IN_BACKGROUND is off; returns False when it couldn't be claimed.
+    """
+    if not claim(job):
+        return False
+    if not getattr(settings, 'IMPORT_RUN_IN_BACKGROUND', True):
+        try:
+            run(job)
+        except Exception:
+            pass  # Recorded on the job
+        return True
+    threading.Thread(target=_run_in_thread, args=(job.pk,), daemon=True).start()
+    return True
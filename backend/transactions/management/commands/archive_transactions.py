@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from transactions import archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Move closed transactions older than TRANSACTION_ARCHIVE_AFTER_DAYS (or --days) to the "
+        "archive table, in batches of --batch-size (default 500) transactions. Safe to interrupt and rerun."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help="Archive transactions closed more than this many days ago.")
+        parser.add_argument('--organization', type=int, help="Only archive this organization's transactions.")
+        parser.add_argument('--batch-size', type=int, default=archive.BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help="Only count what would be archived.")
+
+    def handle(self, *args, **options):
+        days = options['days']
+        if days is None:
+            days = getattr(settings, 'TRANSACTION_ARCHIVE_AFTER_DAYS', 365)
+        if days < 0:
+            raise CommandError("--days cannot be negative.")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive.")
+        before = timezone.localdate() - timedelta(days=days)
+
+        if options['dry_run']:
+            count = archive.archivable(before, options['organization']).count()
+            self.stdout.write(f"{count} transaction(s) closed before {before} would be archived.")
+            return
+
+        total = archive.archive_stale(
+            before, options['organization'], options['batch_size'],
+            progress=lambda total: self.stdout.write(f"  {total} archived"),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Archived {total} transaction(s) closed before {before}."))
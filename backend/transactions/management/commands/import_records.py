@@ -0,0 +1,68 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Organization
+from transactions import imports
+from transactions.models import ImportJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream a CSV/MLS export of contacts or properties into an organization, upserting in "
+        "fixed-size chunks. Each chunk is checkpointed, so --resume continues an interrupted import."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', nargs='?', choices=sorted(imports.KINDS), help="What the file holds.")
+        parser.add_argument('path', nargs='?', help="CSV file to import.")
+        parser.add_argument('--organization', type=int, help="Organization id to import into.")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Rows per chunk (default 1000).")
+        parser.add_argument('--resume', type=int, metavar='JOB_ID', help="Resume this import job instead.")
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            job = ImportJob.objects.filter(pk=options['resume']).first()
+            if job is None:
+                raise CommandError(f"No import job {options['resume']}.")
+            if job.status == 'completed':
+                raise CommandError(f"Import job {job.pk} has already completed.")
+        else:
+            job = self.new_job(options)
+
+        if not imports.claim(job):
+            raise CommandError(f"Import job {job.pk} is already running.")
+        self.stdout.write(f"Import job {job.pk}: {job.kind} rows from {job.source}")
+        try:
+            imports.run(job, progress=self.report)
+        except Exception as exc:
+            raise CommandError(f"Import job {job.pk} failed: {exc} (resume with --resume {job.pk})")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {job.rows_processed} rows: {job.created_count} created, "
+            f"{job.updated_count} updated, {job.error_count} errors."
+        ))
+        for error in job.errors:
+            self.stdout.write(f"  row {error['row']}: {error['errors']}")
+
+    def new_job(self, options):
+        if not options['kind'] or not options['path']:
+            raise CommandError("Give the kind and path of the file to import, or --resume JOB_ID.")
+        if not options['organization']:
+            raise CommandError("--organization is required for a new import.")
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be positive.")
+        organization = Organization.objects.filter(pk=options['organization']).first()
+        if organization is None:
+            raise CommandError(f"No organization {options['organization']}.")
+        path = os.path.abspath(options['path'])
+        if not os.path.isfile(path):
+            raise CommandError(f"No such file: {path}")
+        return ImportJob.objects.create(
+            organization=organization, kind=options['kind'], source=path, chunk_size=options['chunk_size'],
+        )
+
+    def report(self, job):
+        self.stdout.write(
+            f"  {job.rows_processed} rows ({job.progress}%): {job.created_count} created, "
+            f"{job.updated_count} updated, {job.error_count} errors"
+        )
@@ -0,0 +1,27 @@
+# Generated by Django 6.0.2 on 2026-10-17 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_user_joined_idx'),
+        ('core_config', '0001_initial'),
+        ('transactions', '0005_transaction_detailed_status_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['organization', 'created_at', 'id'], name='contact_org_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['organization', 'created_at', 'id'], name='property_org_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['organization', 'created_at', 'id'], name='txn_org_created_idx'),
+        ),
+    ]
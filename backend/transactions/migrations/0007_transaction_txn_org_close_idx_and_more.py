@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-17 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_user_joined_idx'),
+        ('core_config', '0001_initial'),
+        ('transactions', '0006_contact_contact_org_created_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['organization', 'close_date'], name='txn_org_close_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('is_archived', False)), fields=['organization', 'stage'], name='txn_org_live_stage_idx'),
+        ),
+    ]
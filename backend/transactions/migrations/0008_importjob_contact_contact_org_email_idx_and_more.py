@@ -0,0 +1,61 @@
+# Generated by Django 6.0.2 on 2026-10-17 12:40
+
+import django.db.models.deletion
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_user_joined_idx'),
+        ('transactions', '0007_transaction_txn_org_close_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('property', 'Property'), ('contact', 'Contact')], max_length=20)),
+                ('source', models.CharField(help_text='Path of the CSV file being imported', max_length=500)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('chunk_size', models.PositiveIntegerField(default=1000)),
+                ('size', models.BigIntegerField(default=0, help_text='Source file size in bytes')),
+                ('offset', models.BigIntegerField(default=0, help_text='Bytes committed so far')),
+                ('rows_processed', models.PositiveIntegerField(default=0)),
+                ('created_count', models.PositiveIntegerField(default=0)),
+                ('updated_count', models.PositiveIntegerField(default=0)),
+                ('error_count', models.PositiveIntegerField(default=0)),
+                ('errors', models.JSONField(blank=True, default=list)),
+                ('message', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(models.F('organization'), django.db.models.functions.text.Lower('email'), name='contact_org_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(models.F('organization'), models.F('zip_code'), django.db.models.functions.text.Lower('address'), name='property_org_address_idx'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='organization',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='import_jobs', to='accounts.organization'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='import_jobs', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='importjob',
+            index=models.Index(fields=['organization', 'created_at', 'id'], name='import_org_created_idx'),
+        ),
+    ]
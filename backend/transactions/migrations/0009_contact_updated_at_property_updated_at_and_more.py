@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-17 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0008_importjob_contact_contact_org_email_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contact',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
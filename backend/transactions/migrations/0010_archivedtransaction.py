@@ -0,0 +1,162 @@
+# Generated by Django 6.0.2 on 2026-10-17 14:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+FIELDS = (
+    'organization_id', 'name', 'property_id', 'contact_id', 'type_id', 'status_id', 'stage', 'value',
+    'close_date', 'commission_rate', 'detailed_status', 'property_type', 'created_at', 'updated_at',
+)
+
+
+def _invalidate_derived(apps, org_ids, ids, deleted):
+    """Search documents, sync log, counters and rollups of the moved rows' organizations."""
+    if not ids:
+        return
+    apps.get_model('search', 'SearchDocument').objects.filter(model='transaction', object_id__in=ids).delete()
+    Change = apps.get_model('sync', 'Change')
+    Change.objects.bulk_create([
+        Change(organization_id=org_id, model='transaction', object_id=pk, deleted=deleted)
+        for pk, org_id in ids.items()
+    ], batch_size=1000)
+    apps.get_model('accounts', 'ChangeCounter').objects.filter(
+        organization_id__in=org_ids, model='transactions.transaction'
+    ).update(version=F('version') + 1)
+    # Rebuilt from the live table on their next read
+    for model in ('OrganizationRollup', 'MonthlySalesPeriod', 'MonthlySalesBucket'):
+        apps.get_model('analytics', model).objects.filter(organization_id__in=org_ids).delete()
+
+
+def move_archived_rows(apps, schema_editor):
+    """Transactions flagged ``is_archived`` move to the archive table with their stage history."""
+    Transaction = apps.get_model('transactions', 'Transaction')
+    ArchivedTransaction = apps.get_model('transactions', 'ArchivedTransaction')
+    StageHistory = apps.get_model('analytics', 'StageHistory')
+    flagged = Transaction.objects.filter(is_archived=True).order_by('pk')
+    moved, last = {}, 0
+    while batch := list(flagged.filter(pk__gt=last)[:500]):
+        ids = [obj.pk for obj in batch]
+        history = StageHistory.objects.filter(model='transaction', object_id__in=ids)
+        entries = {}
+        for entry in history.order_by('changed_at', 'id'):
+            entries.setdefault(entry.object_id, []).append({
+                'from_stage': entry.from_stage, 'to_stage': entry.to_stage,
+                'changed_at': entry.changed_at.isoformat(), 'user': entry.user_id,
+            })
+        ArchivedTransaction.objects.bulk_create([
+            ArchivedTransaction(
+                id=obj.pk, stage_history=entries.get(obj.pk, []),
+                **{field: getattr(obj, field) for field in FIELDS},
+            )
+            for obj in batch
+        ])
+        history.delete()
+        Transaction.objects.filter(pk__in=ids).delete()
+        moved.update((obj.pk, obj.organization_id) for obj in batch)
+        last = ids[-1]
+    _invalidate_derived(apps, set(moved.values()), moved, deleted=True)
+
+
+def restore_archived_rows(apps, schema_editor):
+    """Archived transactions move back, flagged ``is_archived``."""
+    Transaction = apps.get_model('transactions', 'Transaction')
+    ArchivedTransaction = apps.get_model('transactions', 'ArchivedTransaction')
+    StageHistory = apps.get_model('analytics', 'StageHistory')
+    archived = ArchivedTransaction.objects.order_by('pk')
+    moved, last = {}, 0
+    while batch := list(archived.filter(pk__gt=last)[:500]):
+        ids = [row.pk for row in batch]
+        restored = Transaction.objects.bulk_create([
+            Transaction(id=row.pk, is_archived=True, **{field: getattr(row, field) for field in FIELDS})
+            for row in batch
+        ])
+        for obj, row in zip(restored, batch):
+            obj.created_at = row.created_at
+        Transaction.objects.bulk_update(restored, ['created_at'])
+        StageHistory.objects.bulk_create([
+            StageHistory(
+                organization_id=row.organization_id, user_id=entry['user'], model='transaction',
+                object_id=row.pk, from_stage=entry['from_stage'], to_stage=entry['to_stage'],
+                changed_at=entry['changed_at'],
+            )
+            for row in batch for entry in row.stage_history
+        ])
+        ArchivedTransaction.objects.filter(pk__in=ids).delete()
+        moved.update((row.pk, row.organization_id) for row in batch)
+        last = ids[-1]
+    _invalidate_derived(apps, set(moved.values()), moved, deleted=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_changecounter'),
+        ('analytics', '0003_stage_history'),
+        ('core_config', '0001_initial'),
+        ('search', '0001_initial'),
+        ('sync', '0001_initial'),
+        ('transactions', '0009_contact_updated_at_property_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTransaction',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255)),
+                ('stage', models.CharField(choices=[('Prospect', 'Prospect'), ('Active', 'Active'), ('Under Contract', 'Under Contract'), ('Closed Won', 'Closed Won'), ('Closed Lost', 'Closed Lost')], max_length=50)),
+                ('value', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('close_date', models.DateField(blank=True, null=True)),
+                ('commission_rate', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('detailed_status', models.CharField(blank=True, max_length=100, null=True)),
+                ('property_type', models.CharField(blank=True, choices=[('Single Family', 'Single Family'), ('Condo', 'Condo'), ('Townhouse', 'Townhouse'), ('Multi-Family', 'Multi-Family'), ('Land', 'Land')], max_length=50, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('stage_history', models.JSONField(blank=True, default=list)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='archivedtransaction',
+            name='contact',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_transactions', to='transactions.contact'),
+        ),
+        migrations.AddField(
+            model_name='archivedtransaction',
+            name='organization',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_transactions', to='accounts.organization'),
+        ),
+        migrations.AddField(
+            model_name='archivedtransaction',
+            name='property',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_transactions', to='transactions.property'),
+        ),
+        migrations.AddField(
+            model_name='archivedtransaction',
+            name='status',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='archived_transactions', to='core_config.transactionstatus'),
+        ),
+        migrations.AddField(
+            model_name='archivedtransaction',
+            name='type',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='archived_transactions', to='core_config.transactiontype'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedtransaction',
+            index=models.Index(fields=['organization', 'archived_at', 'id'], name='archived_txn_org_idx'),
+        ),
+        migrations.RunPython(move_archived_rows, restore_archived_rows),
+        migrations.RemoveIndex(
+            model_name='transaction',
+            name='txn_org_live_stage_idx',
+        ),
+        migrations.RemoveField(
+            model_name='transaction',
+            name='is_archived',
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['organization', 'stage'], name='txn_org_stage_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 6.0.2 on 2026-10-17 09:40
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_changecounter'),
+        ('transactions', '0010_archivedtransaction'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertyCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('precision', models.PositiveSmallIntegerField(help_text="Length of the cell's geohash")),
+                ('cell', models.CharField(max_length=9)),
+                ('count', models.IntegerField(default=0)),
+                ('latitude_sum', models.FloatField(default=0)),
+                ('longitude_sum', models.FloatField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='geohash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=9),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)]),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)]),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['organization', 'geohash'], name='property_org_geohash_idx'),
+        ),
+        migrations.AddField(
+            model_name='propertycell',
+            name='organization',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='property_cells', to='accounts.organization'),
+        ),
+        migrations.AddConstraint(
+            model_name='propertycell',
+            constraint=models.UniqueConstraint(fields=('organization', 'precision', 'cell'), name='unique_org_property_cell'),
+        ),
+    ]
@@ -1,6 +1,11 @@
+from django.conf import settings
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models.functions import Lower
 from accounts.models import Organization
+from accounts.tenancy import TenantManager
 from core_config.models import TransactionType, TransactionStatus
+from . import geo
 
 class Contact(models.Model):
     organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='contacts')
@@ -18,6 +23,17 @@ class Contact(models.Model):
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='Buyer')
     
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TenantManager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination within an organization
+            models.Index(fields=['organization', 'created_at', 'id'], name='contact_org_created_idx'),
+            # Import dedupe on email
+            models.Index('organization', Lower('email'), name='contact_org_email_idx'),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
@@ -49,15 +65,66 @@ class Property(models.Model):
     bedrooms = models.IntegerField(default=0)
     bathrooms = models.DecimalField(max_digits=4, decimal_places=1, default=0)
     square_feet = models.IntegerField(default=0)
+
+    # Location; geohash is derived from it (see transactions.geo)
+    latitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)]
+    )
+    geohash = models.CharField(max_length=geo.GEOHASH_LENGTH, blank=True, default='', editable=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TenantManager()
 
     class Meta:
         verbose_name_plural = "Properties"
+        indexes = [
+            models.Index(fields=['organization', 'created_at', 'id'], name='property_org_created_idx'),
+            # Import dedupe on address + zip code
+            models.Index('organization', 'zip_code', Lower('address'), name='property_org_address_idx'),
+            # Radius, bounding-box and cluster queries
+            models.Index(fields=['organization', 'geohash'], name='property_org_geohash_idx'),
+        ]
 
     def __str__(self):
         return self.address
 
+    @staticmethod
+    def geohash_of(latitude, longitude):
+        if latitude is None or longitude is None:
+            return ''
+        return geo.encode(latitude, longitude)
+
+    def save(self, *args, **kwargs):
+        self.geohash = self.geohash_of(self.latitude, self.longitude)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+        super().save(*args, **kwargs)
+
+class PropertyCell(models.Model):
+    """
+    How many of an organization's properties lie in one geohash cell, and the
+    sums of their coordinates, for every cell length up to
+    ``cells.ROLLUP_LENGTH``; zoomed-out map clusters read these.
+    """
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='property_cells')
+    precision = models.PositiveSmallIntegerField(help_text="Length of the cell's geohash")
+    cell = models.CharField(max_length=geo.GEOHASH_LENGTH)
+    count = models.IntegerField(default=0)
+    latitude_sum = models.FloatField(default=0)
+    longitude_sum = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['organization', 'precision', 'cell'], name='unique_org_property_cell'),
+        ]
+
+    def __str__(self):
+        return f"{self.organization_id} {self.cell}"
+
 class Transaction(models.Model):
     organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='transactions')
     name = models.CharField(max_length=255)
@@ -83,8 +150,121 @@ class Transaction(models.Model):
     detailed_status = models.CharField(max_length=100, blank=True, null=True, help_text="Specific status details")
     property_type = models.CharField(max_length=50, choices=Property.PROPERTY_TYPE_CHOICES, blank=True, null=True)
 
-    is_archived = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TenantManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['organization', 'created_at', 'id'], name='txn_org_created_idx'),
+            # Closed-volume and time-series range scans
+            models.Index(fields=['organization', 'close_date'], name='txn_org_close_idx'),
+            # Stage filters over the pipeline
+            models.Index(fields=['organization', 'stage'], name='txn_org_stage_idx'),
+        ]
 
     def __str__(self):
         return self.name
+
+
+class ArchivedTransaction(models.Model):
+    """
+    Cold storage for archived transactions (see ``transactions.archive``).
+
+    Archiving moves a row out of ``Transaction``, keeping its id, so every
+    list, aggregate and index over the live table only ever covers active
+    business. The row's stage history moves with it into ``stage_history``.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='archived_transactions')
+    name = models.CharField(max_length=255)
+    # Same references as the live row, so a restore always finds them
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='archived_transactions')
+    contact = models.ForeignKey(Contact, on_delete=models.CASCADE, related_name='archived_transactions')
+    type = models.ForeignKey(
+        TransactionType, on_delete=models.PROTECT, related_name='archived_transactions', null=True, blank=True
+    )
+    status = models.ForeignKey(
+        TransactionStatus, on_delete=models.PROTECT, related_name='archived_transactions', null=True, blank=True
+    )
+    stage = models.CharField(max_length=50, choices=Transaction.STAGE_CHOICES)
+    value = models.DecimalField(max_digits=12, decimal_places=2)
+    close_date = models.DateField(null=True, blank=True)
+    commission_rate = models.DecimalField(max_digits=5, decimal_places=2)
+    detailed_status = models.CharField(max_length=100, blank=True, null=True)
+    property_type = models.CharField(max_length=50, choices=Property.PROPERTY_TYPE_CHOICES, blank=True, null=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    # [{"from_stage", "to_stage", "changed_at", "user"}], oldest first
+    stage_history = models.JSONField(default=list, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    objects = TenantManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['organization', 'archived_at', 'id'], name='archived_txn_org_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class ImportJob(models.Model):
+    """
+    A CSV/MLS import of contacts or properties (see ``transactions.imports``).
+
+    ``offset`` is the byte position in the source file just past the last
+    committed chunk; a resumed job seeks there and carries on.
+    """
+    KIND_CHOICES = [
+        ('property', 'Property'),
+        ('contact', 'Contact'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='import_jobs')
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='import_jobs'
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    source = models.CharField(max_length=500, help_text="Path of the CSV file being imported")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    chunk_size = models.PositiveIntegerField(default=1000)
+
+    size = models.BigIntegerField(default=0, help_text="Source file size in bytes")
+    offset = models.BigIntegerField(default=0, help_text="Bytes committed so far")
+    rows_processed = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    updated_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    # The first errors only, so a bad file cannot grow the row without bound
+    errors = models.JSONField(default=list, blank=True)
+    message = models.TextField(blank=True, default='')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    objects = TenantManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['organization', 'created_at', 'id'], name='import_org_created_idx'),
+        ]
+
+    @property
+    def progress(self):
+        """Share of the source file committed, 0-100."""
+        if self.status == 'completed':
+            return 100.0
+        return round(self.offset / self.size * 100, 1) if self.size else 0.0
+
+    def __str__(self):
+        return f"{self.get_kind_display()} import #{self.pk} ({self.status})"
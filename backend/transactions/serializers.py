@@ -1,13 +1,15 @@
 from rest_framework import serializers
-from .models import Contact, Property, Transaction
+from accounts.tenancy import TenantPrimaryKeyRelatedField
+from realtor_crm_backend.fieldsets import SparseFieldsMixin
+from .models import ArchivedTransaction, Contact, ImportJob, Property, Transaction
 
-class ContactSerializer(serializers.ModelSerializer):
+class ContactSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Contact
-        fields = ['id', 'first_name', 'last_name', 'email', 'phone', 'role', 'created_at']
-        read_only_fields = ['id', 'created_at']
+        fields = ['id', 'first_name', 'last_name', 'email', 'phone', 'role', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at']
 
-class PropertySerializer(serializers.ModelSerializer):
+class PropertySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     price = serializers.DecimalField(max_digits=12, decimal_places=2, source='list_price')
 
     class Meta:
@@ -15,11 +17,23 @@ class PropertySerializer(serializers.ModelSerializer):
         fields = [
             'id', 'address', 'city', 'state', 'zip_code', 'price', 
             'bedrooms', 'bathrooms', 'square_feet', 'property_type', 'status',
-            'created_at'
+            'latitude', 'longitude', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at']
+        read_only_fields = ['id', 'created_at', 'updated_at']
 
-class TransactionSerializer(serializers.ModelSerializer):
+    def validate(self, attrs):
+        # Bulk writes skip Property.save(), so the geohash is set here too.
+        if 'latitude' in attrs or 'longitude' in attrs:
+            latitude = attrs.get('latitude', getattr(self.instance, 'latitude', None))
+            longitude = attrs.get('longitude', getattr(self.instance, 'longitude', None))
+            if (latitude is None) != (longitude is None):
+                raise serializers.ValidationError("latitude and longitude must be set together.")
+            attrs['geohash'] = Property.geohash_of(latitude, longitude)
+        return attrs
+
+class TransactionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    # Contacts, properties, types and statuses of the request's organization only
+    serializer_related_field = TenantPrimaryKeyRelatedField
     type_name = serializers.CharField(source='type.name', read_only=True)
     status_name = serializers.CharField(source='status.name', read_only=True)
     property_address = serializers.CharField(source='property.address', read_only=True)
@@ -30,10 +44,132 @@ class TransactionSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Transaction
-        fields = ['id', 'organization', 'name', 'property', 'property_address', 'contact', 'contact_name', 'type', 'type_name', 'status', 'status_name', 'stage', 'value', 'close_date', 'commission_rate', 'detailed_status', 'property_type', 'is_archived', 'created_at']
-        read_only_fields = ['organization', 'created_at']
+        fields = ['id', 'organization', 'name', 'property', 'property_address', 'contact', 'contact_name', 'type', 'type_name', 'status', 'status_name', 'stage', 'value', 'close_date', 'commission_rate', 'detailed_status', 'property_type', 'created_at', 'updated_at']
+        read_only_fields = ['organization', 'created_at', 'updated_at']
         extra_kwargs = {
             'type': {'required': False},
             'status': {'required': False},
             'name': {'required': False}, # We might generate name automatically
         }
+        field_sources = {'contact_name': ['contact__first_name', 'contact__last_name']}
+        expandable_fields = {
+            'property_details': (PropertySerializer, {'source': 'property', 'read_only': True}),
+            'contact_details': (ContactSerializer, {'source': 'contact', 'read_only': True}),
+        }
+
+
+class ArchivedTransactionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    type_name = serializers.CharField(source='type.name', read_only=True)
+    status_name = serializers.CharField(source='status.name', read_only=True)
+    property_address = serializers.CharField(source='property.address', read_only=True)
+    contact_name = serializers.SerializerMethodField()
+
+    def get_contact_name(self, obj):
+        return f"{obj.contact.first_name} {obj.contact.last_name}"
+
+    class Meta:
+        model = ArchivedTransaction
+        fields = [
+            'id', 'organization', 'name', 'property', 'property_address', 'contact', 'contact_name',
+            'type', 'type_name', 'status', 'status_name', 'stage', 'value', 'close_date', 'commission_rate',
+            'detailed_status', 'property_type', 'created_at', 'updated_at', 'archived_at', 'stage_history',
+        ]
+        field_sources = {'contact_name': ['contact__first_name', 'contact__last_name']}
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    progress = serializers.FloatField(read_only=True)
+    chunk_size = serializers.IntegerField(min_value=1, max_value=10000, default=1000)
+
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id', 'kind', 'status', 'chunk_size', 'progress', 'rows_processed',
+            'created_count', 'updated_count', 'error_count', 'errors', 'message',
+            'created_at', 'finished_at',
+        ]
+        read_only_fields = [
+            'id', 'status', 'rows_processed', 'created_count', 'updated_count',
+            'error_count', 'errors', 'message', 'created_at', 'finished_at',
+        ]
+
+
+# Returned by ``render_<field>`` to leave the field out, as DRF does for
+# dotted sources through a null relation.
+OMIT = object()
+
+
+class ValuesReader:
+    """
+    Read-only list serialization over ``.values()`` rows.
+
+    Lists skip model instantiation and per-row relation lookups: related
+    names are joined into the same query and each row is rendered to exactly
+    what ``serializer_class`` would produce. Subclasses map every output
+    field to the ``values`` lookups it reads (``sources``), and build
+    computed fields in ``render_<field>``. Only the requested fields'
+    lookups are selected, so ``?fields=`` narrows the query as well.
+    """
+    serializer_class = None
+    # Output field -> values() lookups, in representation order
+    sources = {}
+    # Fields rendered through their serializer field (Decimals, dates)
+    formatted = ()
+
+    def __init__(self, fields=None):
+        self.fields = self.serializer_class().fields
+        self.output = [name for name in self.sources if fields is None or name in fields]
+        self.values = list(dict.fromkeys(lookup for name in self.output for lookup in self.sources[name]))
+
+    def rows(self, queryset, keys=()):
+        """``queryset``'s rows, also selecting ``keys`` (e.g. the pagination key)."""
+        return queryset.values(*dict.fromkeys([*self.values, *keys]))
+
+    def format(self, key, value, fields=None):
+        """Render ``value`` with the serializer field ``key``, e.g. Decimals and datetimes."""
+        return None if value is None else (fields or self.fields)[key].to_representation(value)
+
+    def to_representation(self, row):
+        data = {}
+        for name in self.output:
+            render = getattr(self, f'render_{name}', None)
+            value = render(row) if render else row[self.sources[name][0]]
+            if value is OMIT:
+                continue
+            data[name] = self.format(name, value) if name in self.formatted else value
+        return data
+
+
+class TransactionValuesReader(ValuesReader):
+    serializer_class = TransactionSerializer
+    sources = {
+        'id': ('id',),
+        'organization': ('organization_id',),
+        'name': ('name',),
+        'property': ('property_id',),
+        'property_address': ('property__address',),
+        'contact': ('contact_id',),
+        'contact_name': ('contact__first_name', 'contact__last_name'),
+        'type': ('type_id',),
+        'type_name': ('type__name',),
+        'status': ('status_id',),
+        'status_name': ('status__name',),
+        'stage': ('stage',),
+        'value': ('value',),
+        'close_date': ('close_date',),
+        'commission_rate': ('commission_rate',),
+        'detailed_status': ('detailed_status',),
+        'property_type': ('property_type',),
+        'created_at': ('created_at',),
+        'updated_at': ('updated_at',),
+    }
+    formatted = ('value', 'close_date', 'commission_rate', 'created_at', 'updated_at')
+
+    def render_contact_name(self, row):
+        return f"{row['contact__first_name']} {row['contact__last_name']}"
+
+    def render_type_name(self, row):
+        return OMIT if row['type__name'] is None else row['type__name']
+
+    def render_status_name(self, row):
+        return OMIT if row['status__name'] is None else row['status__name']
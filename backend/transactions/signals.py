@@ -0,0 +1,57 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from accounts.models import Organization
+from . import cells
+from .models import Property
+
+# Sent after bulk_create/bulk_update, which skip the per-row model signals.
+# ``sender`` is the model; ``objects`` the saved instances; ``previous`` maps
+# the pk of each updated object to its field values (by attname) before the
+# write, and is empty for inserts. ``restored`` is true when the rows come
+# back from the archive with their stage history (see transactions.archive).
+# Receivers refresh whatever they derive from these rows once per batch.
+bulk_saved = Signal()
+
+# Sent after rows are deleted in bulk without per-row signals (archiving).
+# ``sender`` is the model and ``objects`` the deleted instances.
+bulk_deleted = Signal()
+
+
+# Map cells (transactions.cells) follow property locations.
+
+@receiver(pre_save, sender=Property)
+def capture_property_location(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        instance._previous_location = None
+        return
+    row = sender._base_manager.filter(pk=instance.pk).values(*cells.LOCATION_FIELDS).first()
+    instance._previous_location = cells.location(row)
+
+
+@receiver(post_save, sender=Property)
+def property_location_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    after = cells.location({field: getattr(instance, field) for field in cells.LOCATION_FIELDS})
+    cells.apply_changes([(getattr(instance, '_previous_location', None), after)])
+
+
+@receiver(post_delete, sender=Property)
+def property_location_deleted(sender, instance, origin=None, **kwargs):
+    # The organization's cells go with it.
+    if isinstance(origin, Organization):
+        return
+    before = cells.location({field: getattr(instance, field) for field in cells.LOCATION_FIELDS})
+    cells.apply_changes([(before, None)])
+
+
+@receiver(bulk_saved, sender=Property)
+def properties_bulk_saved(sender, objects, previous, **kwargs):
+    cells.apply_changes([
+        (
+            cells.location(previous.get(obj.pk)),
+            cells.location({field: getattr(obj, field) for field in cells.LOCATION_FIELDS}),
+        )
+        for obj in objects
+    ])
@@ -1,3 +1,771 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import random
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Organization
+from analytics.models import OrganizationRollup, StageHistory
+from core_config.models import TransactionType
+from deals.models import Deal
+from realtor_crm_backend.testcases import OrganizationTestCase
+from interactions.models import Event, Task
+from search.models import SearchDocument
+from sync.models import Change
+from . import cells, geo, imports
+from .models import ArchivedTransaction, Contact, ImportJob, Property, PropertyCell, Transaction
+from .serializers import TransactionSerializer
+
+User = get_user_model()
+
+
+class KeysetPaginationTests(OrganizationTestCase):
+    def setUp(self):
+        super().setUp()
+
+        now = timezone.now()
+        for n in range(7):
+            Contact.objects.create(
+                organization=self.org, first_name=f'C{n}', last_name='Doe',
+                email=f'c{n}@example.com', phone='555-0100',
+            )
+        # Three rows share a timestamp, as after a bulk insert
+        contacts = list(Contact.objects.order_by('id'))
+        for n, contact in enumerate(contacts):
+            contact.created_at = now - timedelta(minutes=min(n, 3))
+        Contact.objects.bulk_update(contacts, ['created_at'])
+        self.newest_first = [c.pk for c in sorted(contacts, key=lambda c: (c.created_at, c.pk), reverse=True)]
+
+    def test_walks_pages_newest_first(self):
+        url = reverse('contact-list') + '?page_size=3'
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([row['id'] for row in response.data['results']])
+            url = response.data['next']
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(sum(pages, []), self.newest_first)
+
+        first = self.client.get(reverse('contact-list') + '?page_size=3')
+        self.assertIsNone(first.data['previous'])
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual([row['id'] for row in back.data['results']], pages[0])
+        self.assertIsNone(back.data['previous'])
+
+    def test_page_query_count_is_constant(self):
+        # The ETag's change counters, then the page
+        with self.assertNumQueries(2):
+            self.client.get(reverse('contact-list') + '?page_size=2')
+        with self.assertNumQueries(2):
+            self.client.get(reverse('contact-list') + '?page_size=3')
+
+    def test_legacy_unpaginated_opt_in(self):
+        response = self.client.get(reverse('contact-list') + '?paginate=false')
+        self.assertEqual(sorted(row['id'] for row in response.data), sorted(self.newest_first))
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('contact-list') + '?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+
+class TransactionListQueryTests(OrganizationTestCase):
+    def setUp(self):
+        super().setUp()
+        self.type = TransactionType.objects.create(organization=self.org, name='Purchase')
+
+    def add_transactions(self, count):
+        for n in range(count):
+            contact = Contact.objects.create(
+                organization=self.org, first_name=f'C{n}', last_name='Doe',
+                email=f'c{n}@example.com', phone='555-0100',
+            )
+            prop = Property.objects.create(
+                organization=self.org, address=f'{n} Main St', city='Springfield',
+                state='IL', zip_code='62701', list_price=Decimal('250000.00'),
+            )
+            Transaction.objects.create(
+                organization=self.org, name=f'T{n}', property=prop, contact=contact,
+                type=self.type if n % 2 else None, value=Decimal('1000.50'), close_date=date(2030, 1, n + 1),
+            )
+
+    def test_list_query_count_is_constant(self):
+        # The ETag's change counters, then the page
+        self.add_transactions(2)
+        with self.assertNumQueries(2):
+            self.client.get(reverse('transaction-list'))
+        self.add_transactions(8)
+        with self.assertNumQueries(2):
+            self.client.get(reverse('transaction-list'))
+        with self.assertNumQueries(2):
+            self.client.get(reverse('transaction-list') + '?paginate=false')
+
+    def test_retrieve_joins_related_rows(self):
+        self.add_transactions(1)
+        pk = Transaction.objects.get().pk
+        # Change counters, then the row
+        with self.assertNumQueries(2):
+            self.client.get(reverse('transaction-detail', args=[pk]))
+
+    def test_values_rows_match_serializer(self):
+        self.add_transactions(3)
+        response = self.client.get(reverse('transaction-list') + '?paginate=false')
+        expected = TransactionSerializer(Transaction.objects.order_by('id'), many=True).data
+        self.assertEqual(sorted(response.data, key=lambda row: row['id']), expected)
+
+
+class QueryPlanTests(OrganizationTestCase):
+    """The hot tenant-scoped queries must be answered from their composite indexes."""
+    def setUp(self):
+        super().setUp()
+        if connection.vendor == 'postgresql':
+            # Tiny test tables would otherwise always be sequentially scanned.
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset, index_name):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest(f"No plan check for {connection.vendor}")
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+        self.assertNotIn('Seq Scan', plan)
+
+    def test_transaction_queries(self):
+        transactions = Transaction.objects.filter(organization=self.org)
+        self.assertUsesIndex(transactions.filter(stage='Active'), 'txn_org_stage_idx')
+        self.assertUsesIndex(
+            transactions.filter(close_date__gte=date(2030, 1, 1), close_date__lt=date(2030, 2, 1)),
+            'txn_org_close_idx',
+        )
+        self.assertUsesIndex(transactions.order_by('-created_at', '-id'), 'txn_org_created_idx')
+
+    def test_interaction_queries(self):
+        now = timezone.now()
+        self.assertUsesIndex(
+            Event.objects.filter(organization=self.org, start_time__gte=now, start_time__lt=now + timedelta(days=1)),
+            'event_org_start_idx',
+        )
+        self.assertUsesIndex(
+            Task.objects.filter(organization=self.org, is_completed=False).order_by('due_date'),
+            'task_org_open_due_idx',
+        )
+
+    def test_deal_queries(self):
+        deals = Deal.objects.filter(user=self.user)
+        self.assertUsesIndex(deals.filter(stage='NEW'), 'deal_user_stage_idx')
+        self.assertUsesIndex(
+            deals.filter(closing_date__gte=date(2030, 1, 1), closing_date__lt=date(2030, 2, 1)),
+            'deal_user_closing_idx',
+        )
+
+    def test_property_map_queries(self):
+        properties = Property.objects.filter(organization=self.org)
+        self.assertUsesIndex(properties.filter(geo.box_filter(30.2, -97.8, 30.3, -97.7)), 'property_org_geohash_idx')
+
+
+class BulkWriteTests(OrganizationTestCase):
+    def setUp(self):
+        super().setUp()
+        self.type = TransactionType.objects.create(organization=self.org, name='Purchase')
+        self.contact = self.make_contact()
+        self.property = self.make_property()
+
+    def transaction_rows(self, count, **overrides):
+        return [
+            {
+                'name': f'Deal {n}', 'property': self.property.pk, 'contact': self.contact.pk,
+                'type': self.type.pk, 'stage': 'Closed Won', 'value': '1000.00',
+                'close_date': '2030-01-15', **overrides,
+            }
+            for n in range(count)
+        ]
+
+    def test_create_uses_constant_queries(self):
+        url = reverse('transaction-bulk')
+        # The first batch also creates the organization's rollup rows.
+        self.client.post(url, self.transaction_rows(1), format='json')
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(self.client.post(url, self.transaction_rows(3), format='json').status_code, 201)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.post(url, self.transaction_rows(40), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['created']), 40)
+        self.assertEqual(len(large), len(small))
+
+    def test_derived_data_follows_bulk_writes(self):
+        created = self.client.post(reverse('transaction-bulk'), self.transaction_rows(3), format='json').data['created']
+        self.assertEqual(OrganizationRollup.objects.get(organization=self.org).total_sales_volume, Decimal('3000.00'))
+        self.assertEqual(StageHistory.objects.filter(model='transaction', object_id__in=created).count(), 3)
+        self.assertEqual(SearchDocument.objects.filter(model='transaction', object_id__in=created).count(), 3)
+
+        rows = [{'id': pk, 'stage': 'Closed Lost', 'name': 'Renamed'} for pk in created[:2]]
+        response = self.client.patch(reverse('transaction-bulk'), rows, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(OrganizationRollup.objects.get(organization=self.org).total_sales_volume, Decimal('1000.00'))
+        self.assertEqual(StageHistory.objects.filter(to_stage='Closed Lost').count(), 2)
+        self.assertEqual(SearchDocument.objects.filter(title='Renamed').count(), 2)
+
+        response = self.client.delete(reverse('transaction-bulk'), {'ids': created}, format='json')
+        self.assertEqual(response.data, {'deleted': 3})
+        self.assertEqual(OrganizationRollup.objects.get(organization=self.org).total_sales_volume, 0)
+        self.assertFalse(SearchDocument.objects.filter(model='transaction').exists())
+
+    def test_per_row_errors_reject_the_batch(self):
+        other = Organization.objects.create(name="Other Agency")
+        foreign_type = TransactionType.objects.create(organization=other, name='Theirs')
+        rows = self.transaction_rows(4)
+        rows[1]['contact'] = 999999
+        rows[2]['type'] = foreign_type.pk
+        rows[3] = 'not an object'
+        response = self.client.post(reverse('transaction-bulk'), rows, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2, 3])
+        self.assertIn('contact', response.data['errors'][0]['errors'])
+        self.assertIn('type', response.data['errors'][1]['errors'])
+        self.assertFalse(Transaction.objects.exists())
+
+        response = self.client.patch(reverse('contact-bulk'), [{'id': 999999, 'phone': '1'}], format='json')
+        self.assertEqual(response.data['errors'], [{'index': 0, 'errors': {'id': ['Not found.']}}])
+
+    def test_contacts_and_properties(self):
+        rows = [
+            {'first_name': f'C{n}', 'last_name': 'Doe', 'email': f'c{n}@example.com', 'phone': '555'}
+            for n in range(5)
+        ]
+        response = self.client.post(reverse('contact-bulk'), rows, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Contact.objects.filter(organization=self.org).count(), 6)
+
+        rows = [{'id': self.property.pk, 'price': '300000.00'}]
+        self.assertEqual(self.client.patch(reverse('property-bulk'), rows, format='json').status_code, 200)
+        self.property.refresh_from_db()
+        self.assertEqual(self.property.list_price, Decimal('300000.00'))
+
+
+class ImportTests(OrganizationTestCase):
+    def setUp(self):
+        super().setUp()
+        self.upload_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.upload_dir.cleanup)
+
+    def write_csv(self, text):
+        path = os.path.join(self.upload_dir.name, f'source{len(os.listdir(self.upload_dir.name))}.csv')
+        with open(path, 'w', encoding='utf-8', newline='') as source:
+            source.write(text)
+        return path
+
+    def contact_csv(self, count):
+        lines = ['First Name,Last Name,Email,Phone']
+        lines += [f'C{n},Doe,c{n}@example.com,555-01{n:02}' for n in range(count)]
+        return self.write_csv('\r\n'.join(lines) + '\r\n')
+
+    def test_mls_properties(self):
+        path = self.write_csv(
+            '\ufeffUnparsedAddress,City,StateOrProvince,PostalCode,ListPrice,StandardStatus,PropertyType,'
+            'BedroomsTotal,LivingArea,PublicRemarks\n'
+            '"1 Main St, Unit 2",Springfield,IL,62701,"$250,000",Closed,Condominium,2,"1,100","Sunny.\nQuiet ""street""."\n'
+            '\n'
+            '2 Oak Ave,Springfield,IL,62702,not a price,Active,Single Family Residence,3,1800,\n'
+            '3 Elm St,Springfield,IL,62703,199000,Coming Soon,Townhouse,3,1500,\n'
+        )
+        job = imports.run(ImportJob.objects.create(organization=self.org, kind='property', source=path))
+
+        self.assertEqual((job.status, job.progress), ('completed', 100.0))
+        self.assertEqual((job.rows_processed, job.created_count, job.error_count), (3, 2, 1))
+        self.assertEqual(job.errors[0]['row'], 2)
+        self.assertIn('price', job.errors[0]['errors'])
+        condo = Property.objects.get(zip_code='62701')
+        self.assertEqual(condo.address, '1 Main St, Unit 2')
+        self.assertEqual(
+            (condo.list_price, condo.status, condo.property_type, condo.square_feet),
+            (Decimal('250000.00'), 'Sold', 'Condo', 1100),
+        )
+        self.assertEqual(Property.objects.get(zip_code='62703').status, 'Active')
+        self.assertEqual(SearchDocument.objects.filter(model='property').count(), 2)
+
+    def test_dedupes_against_existing_rows(self):
+        Contact.objects.create(organization=self.org, first_name='Old', last_name='Name',
+                               email='C1@Example.com', phone='1')
+        other = Organization.objects.create(name="Other Agency")
+        Contact.objects.create(organization=other, first_name='Theirs', last_name='X',
+                               email='c2@example.com', phone='1')
+        Property.objects.create(organization=self.org, address='9 PINE RD', city='Springfield',
+                                state='IL', zip_code='62701', list_price=Decimal('1.00'))
+        path = self.write_csv(
+            'Email,First Name,Last Name,Phone\n'
+            'c1@example.com,Jane,Doe,555\n'
+            'C2@EXAMPLE.COM,Early,Row,555\n'
+            'c2@example.com,Late,Row,555\n'
+        )
+        job = imports.run(ImportJob.objects.create(organization=self.org, kind='contact', source=path, chunk_size=2))
+
+        self.assertEqual((job.created_count, job.updated_count), (1, 2))
+        contacts = Contact.objects.filter(organization=self.org)
+        self.assertEqual(contacts.count(), 2)
+        self.assertEqual(contacts.get(email='c1@example.com').first_name, 'Jane')
+        # Rows of one chunk collapse, later ones winning; the next chunk updates it.
+        self.assertEqual(contacts.get(email='c2@example.com').first_name, 'Late')
+        self.assertEqual(Contact.objects.get(organization=other).first_name, 'Theirs')
+
+        path = self.write_csv('Address,City,State,Zip,Price\n9 Pine Rd,Springfield,IL,62701,300000\n')
+        job = imports.run(ImportJob.objects.create(organization=self.org, kind='property', source=path))
+        self.assertEqual((job.created_count, job.updated_count), (0, 1))
+        self.assertEqual(Property.objects.get().list_price, Decimal('300000.00'))
+
+    def test_resumes_from_checkpoint(self):
+        path = self.contact_csv(7)
+        job = ImportJob.objects.create(organization=self.org, kind='contact', source=path, chunk_size=3)
+
+        def crash(job):
+            raise RuntimeError('worker lost')
+
+        with self.assertRaises(RuntimeError):
+            imports.run(job, progress=crash)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_processed), ('failed', 3))
+        self.assertEqual(Contact.objects.count(), 3)
+        self.assertTrue(0 < job.progress < 100)
+
+        imports.run(job)
+        self.assertEqual((job.status, job.rows_processed, job.created_count), ('completed', 7, 7))
+        self.assertEqual(
+            sorted(Contact.objects.values_list('email', flat=True)), [f'c{n}@example.com' for n in range(7)]
+        )
+
+    def test_memory_is_bounded_by_chunk_size(self):
+        path = self.contact_csv(10)
+        rows = imports.normalize(imports.parse(path), 'contact')
+        chunks = imports.chunked(rows, 4)
+        first = next(chunks)
+        self.assertEqual(len(first), 4)
+        # Only the first chunk's rows have been read.
+        self.assertLess(first[-1][0], os.path.getsize(path))
+        self.assertEqual([len(chunk) for chunk in chunks], [4, 2])
+
+    def test_missing_required_column(self):
+        path = self.write_csv('First Name,Last Name\nJane,Doe\n')
+        job = ImportJob.objects.create(organization=self.org, kind='contact', source=path)
+        with self.assertRaises(ValueError):
+            imports.run(job)
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('email', job.message)
+
+    def test_command(self):
+        path = self.contact_csv(5)
+        out = StringIO()
+        call_command('import_records', 'contact', path, organization=self.org.pk, chunk_size=2, stdout=out)
+        self.assertEqual(Contact.objects.count(), 5)
+        self.assertIn('5 created', out.getvalue())
+        self.assertEqual(out.getvalue().count('rows ('), 3)
+
+    def test_api_upload(self):
+        self.client.force_authenticate(self.user)
+        upload = SimpleUploadedFile('contacts.csv', b'Email,First Name,Last Name,Phone\nj@example.com,Jane,Doe,555\n')
+        with override_settings(IMPORT_UPLOAD_DIR=self.upload_dir.name, IMPORT_RUN_IN_BACKGROUND=False):
+            response = self.client.post(reverse('importjob-list'), {'kind': 'contact', 'file': upload})
+        self.assertEqual(response.status_code, 202, response.data)
+        self.assertEqual((response.data['status'], response.data['progress']), ('completed', 100.0))
+        self.assertTrue(Contact.objects.filter(organization=self.org, email='j@example.com').exists())
+        # The upload is deleted once imported
+        self.assertEqual(os.listdir(self.upload_dir.name), [])
+
+        job_url = reverse('importjob-detail', args=[response.data['id']])
+        self.assertEqual(self.client.get(job_url).data['created_count'], 1)
+        self.assertEqual(self.client.post(job_url + 'resume/').status_code, 400)
+
+        outsider = User.objects.create_user(username='other', password='pass',
+                                            organization=Organization.objects.create(name="Other Agency"))
+        self.client.force_authenticate(outsider)
+        self.assertEqual(self.client.get(job_url).status_code, 404)
+        self.assertEqual(self.client.post(reverse('importjob-list'), {'kind': 'contact'}).status_code, 400)
+
+    def test_resumes_only_stale_running_jobs(self):
+        self.client.force_authenticate(self.user)
+        job = ImportJob.objects.create(
+            organization=self.org, user=self.user, kind='contact', source=self.contact_csv(3), status='running',
+        )
+        job_url = reverse('importjob-detail', args=[job.pk])
+        with override_settings(IMPORT_UPLOAD_DIR=self.upload_dir.name, IMPORT_RUN_IN_BACKGROUND=False):
+            self.assertEqual(self.client.post(job_url + 'resume/').status_code, 409)
+            # Its worker went away: no chunk committed for longer than IMPORT_STALE_SECONDS
+            ImportJob.objects.filter(pk=job.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+            response = self.client.post(job_url + 'resume/')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual((response.data['status'], response.data['created_count']), ('completed', 3))
+        self.assertEqual(os.listdir(self.upload_dir.name), [])
+        self.assertEqual(self.client.post(job_url + 'resume/').status_code, 400)
+
+    def test_only_one_start_claims_a_job(self):
+        job = ImportJob.objects.create(organization=self.org, kind='contact', source=self.contact_csv(1))
+        self.assertTrue(imports.claim(job))
+        self.assertFalse(imports.claim(ImportJob.objects.get(pk=job.pk)))
+        ImportJob.objects.filter(pk=job.pk).update(status='failed')
+        self.assertTrue(imports.claim(job))
+
+
+class ExportTests(OrganizationTestCase):
+    def setUp(self):
+        super().setUp()
+        self.type = TransactionType.objects.create(organization=self.org, name='Purchase')
+        for n, stage in enumerate(['Closed Won', 'Closed Won', 'Closed Lost', 'Active']):
+            contact = Contact.objects.create(
+                organization=self.org, first_name=f'C{n}', last_name='Doe, Jr.',
+                email=f'c{n}@example.com', phone='555-0100',
+            )
+            prop = Property.objects.create(
+                organization=self.org, address=f'{n} Main St', city='Springfield',
+                state='IL', zip_code='62701', list_price=Decimal('250000.00'),
+            )
+            Transaction.objects.create(
+                organization=self.org, name=f'T{n}', property=prop, contact=contact, stage=stage,
+                type=self.type if n % 2 else None, value=Decimal('1000.50'), close_date=date(2030, n + 1, 15),
+            )
+        other = Organization.objects.create(name="Other Agency")
+        contact = Contact.objects.create(organization=other, first_name='X', last_name='Y', email='x@y.z', phone='1')
+        prop = Property.objects.create(organization=other, address='Elsewhere', city='A', state='B',
+                                       zip_code='1', list_price=Decimal('1.00'))
+        Transaction.objects.create(organization=other, name='Theirs', property=prop, contact=contact,
+                                   close_date=date(2030, 1, 15))
+
+    def export(self, query=''):
+        response = self.client.get(reverse('transaction-export') + query)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_has_joined_columns(self):
+        with self.assertNumQueries(1):
+            rows = list(csv.DictReader(self.export().splitlines()))
+        self.assertEqual([row['name'] for row in rows], ['T0', 'T1', 'T2', 'T3'])
+        self.assertEqual(rows[1]['contact_name'], 'C1 Doe, Jr.')
+        self.assertEqual(
+            (rows[1]['property_address'], rows[1]['type'], rows[1]['status']), ('1 Main St', 'Purchase', ''),
+        )
+        self.assertEqual((rows[1]['value'], rows[1]['close_date']), ('1000.50', '2030-02-15'))
+
+    def test_ndjson_and_filters(self):
+        response = self.client.get(reverse('transaction-export') + '?format=ndjson&stage=Closed%20Won,Active')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        self.assertIn('.ndjson"', response['Content-Disposition'])
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['name'] for row in rows], ['T0', 'T1', 'T3'])
+        self.assertEqual((rows[0]['type'], rows[0]['value']), (None, '1000.50'))
+
+        rows = list(csv.DictReader(self.export('?start=2030-02-01&end=2030-03-15').splitlines()))
+        self.assertEqual([row['name'] for row in rows], ['T1', 'T2'])
+
+    def test_invalid_filters(self):
+        response = self.client.get(reverse('transaction-export') + '?start=2030-13-01')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('YYYY-MM-DD', json.loads(response.content)['error'])
+        self.assertEqual(self.client.get(reverse('transaction-export') + '?stage=Won').status_code, 400)
+
+    def test_contacts(self):
+        rows = list(csv.DictReader(
+            b''.join(self.client.get(reverse('contact-export') + '?role=Buyer').streaming_content)
+            .decode().splitlines()
+        ))
+        self.assertEqual([row['email'] for row in rows], [f'c{n}@example.com' for n in range(4)])
+
+
+class SparseFieldsetTests(OrganizationTestCase):
+    def setUp(self):
+        super().setUp()
+        self.transaction = Transaction.objects.create(
+            organization=self.org, name='T1', property=self.make_property(), contact=self.make_contact(),
+            value=Decimal('1000.50'),
+            type=TransactionType.objects.create(organization=self.org, name='Purchase'),
+        )
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        # The data query, besides the change counters behind the ETag and the response cache
+        queries = [query for query in queries if 'accounts_changecounter' not in query['sql']]
+        self.assertEqual(len(queries), 1)
+        return response, queries[0]['sql']
+
+    def test_list_selects_requested_columns(self):
+        response, sql = self.get(reverse('transaction-list') + '?fields=id,name,contact_name')
+        self.assertEqual(response.data['results'], [{'id': self.transaction.pk, 'name': 'T1', 'contact_name': 'Jane Doe'}])
+        self.assertNotIn('commission_rate', sql)
+        self.assertNotIn('transactions_property', sql)
+        self.assertNotIn('core_config_transactiontype', sql)
+
+    def test_retrieve_narrows_queryset(self):
+        url = reverse('transaction-detail', args=[self.transaction.pk])
+        response, sql = self.get(url + '?fields=id,property_address')
+        self.assertEqual(response.data, {'id': self.transaction.pk, 'property_address': '1 Main St'})
+        self.assertIn('transactions_property', sql)
+        self.assertNotIn('transactions_contact', sql)
+        self.assertNotIn('"value"', sql)
+
+        response, sql = self.get(url + '?fields=id&expand=contact_details')
+        self.assertEqual(response.data['contact_details']['email'], 'jane@example.com')
+        self.assertNotIn('transactions_property', sql)
+
+    def test_expanded_list(self):
+        response, _ = self.get(reverse('transaction-list') + '?expand=property_details')
+        row = response.data['results'][0]
+        self.assertEqual(row['property_details']['address'], '1 Main St')
+        self.assertEqual(row['type_name'], 'Purchase')
+        self.assertNotIn('contact_details', row)
+
+    def test_other_serializers(self):
+        response, sql = self.get(reverse('contact-list') + '?fields=email')
+        self.assertEqual(response.data['results'], [{'email': 'jane@example.com'}])
+        self.assertNotIn('phone', sql)
+        response, _ = self.get(reverse('transactiontype-list') + '?fields=name')
+        self.assertEqual(response.data, [{'name': 'Purchase'}])
+
+    def test_writes_return_full_representation(self):
+        url = reverse('contact-list') + '?fields=id'
+        response = self.client.post(url, {
+            'first_name': 'Ann', 'last_name': 'Lee', 'email': 'ann@example.com', 'phone': '1',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['email'], 'ann@example.com')
+
+
+class ArchiveTests(OrganizationTestCase):
+    def setUp(self):
+        super().setUp()
+        self.contact = self.make_contact()
+        self.property = self.make_property()
+
+    def make(self, name, stage='Closed Won', close_date=date(2020, 1, 15)):
+        transaction = Transaction.objects.create(
+            organization=self.org, name=name, property=self.property, contact=self.contact,
+            stage='Active', value=Decimal('1000.00'),
+        )
+        transaction.stage, transaction.close_date = stage, close_date
+        transaction.save()
+        return transaction
+
+    def total_transactions(self):
+        return OrganizationRollup.objects.get(organization=self.org).total_transactions
+
+    def test_archive_and_restore(self):
+        transaction, other = self.make('Old sale'), self.make('Other sale')
+        stamps = (transaction.created_at, transaction.updated_at)
+        etag = self.client.get(reverse('transaction-list'))['ETag']
+        self.assertEqual(self.total_transactions(), 2)
+
+        response = self.client.post(reverse('transaction-archive', args=[transaction.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([entry['to_stage'] for entry in response.data['stage_history']], ['Active', 'Closed Won'])
+        self.assertFalse(Transaction.objects.filter(pk=transaction.pk).exists())
+        self.assertFalse(StageHistory.objects.filter(model='transaction', object_id=transaction.pk).exists())
+        self.assertFalse(SearchDocument.objects.filter(model='transaction', object_id=transaction.pk).exists())
+        self.assertEqual(self.total_transactions(), 1)
+        response = self.client.get(reverse('transaction-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual([row['id'] for row in response.data['results']], [other.pk])
+        archived = self.client.get(reverse('archivedtransaction-list')).data['results']
+        self.assertEqual([(row['id'], row['contact_name']) for row in archived], [(transaction.pk, 'Jane Doe')])
+
+        response = self.client.post(reverse('archivedtransaction-restore', args=[transaction.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['id'], response.data['name']), (transaction.pk, 'Old sale'))
+        self.assertFalse(ArchivedTransaction.objects.exists())
+        restored = Transaction.objects.get(pk=transaction.pk)
+        self.assertEqual((restored.created_at, restored.updated_at), stamps)
+        history = StageHistory.objects.filter(model='transaction', object_id=transaction.pk).order_by('changed_at')
+        self.assertEqual([entry.to_stage for entry in history], ['Active', 'Closed Won'])
+        self.assertTrue(SearchDocument.objects.filter(model='transaction', object_id=transaction.pk).exists())
+        self.assertEqual(self.total_transactions(), 2)
+
+    def test_archive_and_restore_many(self):
+        ids = [self.make(f'Sale {n}').pk for n in range(3)]
+        response = self.client.post(reverse('transaction-archive-many'), {'ids': ids + [999999]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'], [{'index': 3, 'errors': {'id': ['Not found.']}}])
+
+        response = self.client.post(reverse('transaction-archive-many'), {'ids': ids}, format='json')
+        self.assertEqual(sorted(response.data['archived']), ids)
+        self.assertEqual(self.total_transactions(), 0)
+        # Synced clients see each archived row leave once
+        deletions = Change.objects.filter(model='transaction', deleted=True).values_list('object_id', flat=True)
+        self.assertEqual(sorted(deletions), ids)
+        self.assertFalse(SearchDocument.objects.filter(model='transaction').exists())
+
+        response = self.client.post(reverse('archivedtransaction-restore-many'), {'ids': ids[:2]}, format='json')
+        self.assertEqual(sorted(response.data['restored']), ids[:2])
+        self.assertEqual(sorted(Transaction.objects.values_list('pk', flat=True)), ids[:2])
+
+    def test_other_organizations_rows(self):
+        transaction = self.make('Old sale')
+        other_org = Organization.objects.create(name="Other Agency")
+        other = User.objects.create_user(username='other', password='pass', organization=other_org)
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.post(reverse('transaction-archive', args=[transaction.pk])).status_code, 404)
+        self.client.force_authenticate(self.user)
+        self.client.post(reverse('transaction-archive', args=[transaction.pk]))
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.post(reverse('archivedtransaction-restore', args=[transaction.pk])).status_code, 404)
+
+    def test_archiver_moves_closed_transactions_in_batches(self):
+        old = [self.make(f'Old {n}').pk for n in range(5)]
+        self.make('Recent', close_date=timezone.localdate())
+        self.make('Open', stage='Under Contract')
+        out = StringIO()
+        call_command('archive_transactions', '--days=365', '--dry-run', stdout=out)
+        self.assertIn('5 transaction(s)', out.getvalue())
+        self.assertEqual(ArchivedTransaction.objects.count(), 0)
+
+        call_command('archive_transactions', '--days=365', '--batch-size=2', stdout=out)
+        self.assertEqual(sorted(ArchivedTransaction.objects.values_list('pk', flat=True)), old)
+        self.assertEqual(sorted(Transaction.objects.values_list('name', flat=True)), ['Open', 'Recent'])
+        self.assertIn('Archived 5 transaction(s)', out.getvalue())
+
+
+
+class GeoSearchTests(OrganizationTestCase):
+    def place(self, latitude, longitude, organization=None, address='1 Main St'):
+        return Property.objects.create(
+            organization=organization or self.org, address=address, city='Austin', state='TX',
+            zip_code='78701', list_price=Decimal('250000.00'), latitude=latitude, longitude=longitude,
+        )
+
+    def get(self, name, **params):
+        response = self.client.get(reverse(f'property-{name}'), params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_geohash_follows_coordinates(self):
+        row = {'address': '1 Main St', 'city': 'Austin', 'state': 'TX', 'zip_code': '78701', 'price': '1.00'}
+        response = self.client.post(reverse('property-list'), {**row, 'latitude': 30.27, 'longitude': -97.74})
+        prop = Property.objects.get(pk=response.data['id'])
+        self.assertEqual(prop.geohash, geo.encode(30.27, -97.74))
+
+        self.client.patch(reverse('property-detail', args=[prop.pk]), {'latitude': 30.5})
+        prop.refresh_from_db()
+        self.assertEqual(prop.geohash, geo.encode(30.5, -97.74))
+
+        response = self.client.post(reverse('property-bulk'), [{**row, 'latitude': 40.0, 'longitude': -105.0}], format='json')
+        self.assertEqual(Property.objects.get(pk=response.data['created'][0]).geohash, geo.encode(40.0, -105.0))
+        response = self.client.post(reverse('property-bulk'), [{**row, 'latitude': 40.0}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.place(None, None).geohash, '')
+
+    def test_nearby_orders_by_distance(self):
+        near = self.place(30.2700, -97.7400)
+        nearer = self.place(30.2672, -97.7431)
+        self.place(30.3700, -97.7400)  # About 11 km north
+        self.place(30.2672, -97.7431, organization=Organization.objects.create(name="Other Agency"))
+
+        data = self.get('nearby', lat=30.2672, lng=-97.7431, radius=5)
+        self.assertEqual([row['id'] for row in data['results']], [nearer.pk, near.pk])
+        self.assertEqual(data['results'][0]['distance'], 0)
+        self.assertAlmostEqual(data['results'][1]['distance'], 0.43, places=2)
+        self.assertFalse(data['has_more'])
+
+        data = self.get('nearby', lat=30.2672, lng=-97.7431, radius=5, limit=1)
+        self.assertEqual(([row['id'] for row in data['results']], data['has_more']), ([nearer.pk], True))
+        response = self.client.get(reverse('property-nearby'), {'lat': 'north', 'lng': -97.7})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('property-nearby'), {'lat': 30, 'lng': -97.7, 'radius': 0})
+        self.assertEqual(response.status_code, 400)
+
+    def test_within_box(self):
+        inside = self.place(30.25, -97.75)
+        self.place(30.25, -97.65)
+        self.place(None, None)
+        data = self.get('within', bbox='30.2,-97.8,30.3,-97.7')
+        self.assertEqual([row['id'] for row in data['results']], [inside.pk])
+
+        # Boxes may cross the antimeridian.
+        fiji = self.place(-17.8, 179.9)
+        samoa = self.place(-13.8, -171.8)
+        self.place(-17.8, 170.0)
+        data = self.get('within', bbox='-20,175,-10,-170')
+        self.assertEqual(sorted(row['id'] for row in data['results']), [fiji.pk, samoa.pk])
+        self.assertEqual(self.client.get(reverse('property-within'), {'bbox': '1,2,3'}).status_code, 400)
+
+    def test_box_filter_matches_exact_bounds(self):
+        rng = random.Random(7)
+        Property.objects.bulk_create([
+            Property(
+                organization=self.org, address=str(n), city='A', state='TX', zip_code='1', list_price=1,
+                latitude=latitude, longitude=longitude, geohash=Property.geohash_of(latitude, longitude),
+            )
+            for n, (latitude, longitude) in enumerate((rng.uniform(29, 32), rng.uniform(-99, -96)) for _ in range(500))
+        ])
+        for _ in range(20):
+            south, west = rng.uniform(29, 31.5), rng.uniform(-99, -96.5)
+            north, east = south + rng.uniform(0.01, 1), west + rng.uniform(0.01, 1)
+            expected = {
+                obj.pk for obj in Property.objects.all()
+                if south <= obj.latitude <= north and west <= obj.longitude <= east
+            }
+            found = set(Property.objects.filter(geo.box_filter(south, west, north, east)).values_list('pk', flat=True))
+            self.assertEqual(found, expected)
+
+    def test_clusters(self):
+        for n in range(3):
+            self.place(30.2672 + n * 0.0001, -97.7431)
+        alone = self.place(30.4, -97.6)
+        data = self.get('clusters', bbox='30,-98,30.5,-97.5', precision=4)
+        self.assertEqual(data['precision'], 4)
+        clusters = sorted(data['clusters'], key=lambda cluster: cluster['count'])
+        self.assertEqual([(cluster['count'], cluster['id']) for cluster in clusters], [(1, alone.pk), (3, None)])
+        self.assertAlmostEqual(clusters[1]['latitude'], 30.2673)
+        self.assertEqual(clusters[1]['cell'], geo.encode(30.2672, -97.7431, 4))
+
+        # A zoom-10 web-map tile over downtown Austin
+        data = self.get('clusters', tile='10/233/421')
+        self.assertEqual(data['precision'], 5)
+        self.assertEqual(sum(cluster['count'] for cluster in data['clusters']), 3)
+        response = self.client.get(reverse('property-clusters'), {'tile': '10/2000/1'})
+        self.assertEqual(response.status_code, 400)
+
+    def cell_counts(self):
+        return sorted(
+            (cell.cell, cell.count, round(cell.latitude_sum, 6), round(cell.longitude_sum, 6))
+            for cell in PropertyCell.objects.filter(organization=self.org)
+        )
+
+    def test_cells_follow_writes(self):
+        moved, removed = self.place(30.27, -97.74), self.place(30.28, -97.75)
+        self.place(None, None)
+        moved.latitude = 30.5
+        moved.save()
+        removed.delete()
+        row = {'address': '2 Main St', 'city': 'Austin', 'state': 'TX', 'zip_code': '78701', 'price': '1.00'}
+        created = self.client.post(
+            reverse('property-bulk'), [{**row, 'latitude': 30.1, 'longitude': -97.9}] * 3, format='json'
+        ).data['created']
+        self.client.patch(
+            reverse('property-bulk'), [{'id': created[0], 'latitude': 31.0, 'longitude': -97.0}], format='json'
+        )
+        counts = self.cell_counts()
+        self.assertEqual(sum(count for cell, count, *_ in counts if len(cell) == 1), 4)
+        cells.rebuild(self.org.pk)
+        self.assertEqual(self.cell_counts(), counts)
+
+    def test_zoomed_out_clusters_read_cells(self):
+        rng = random.Random(3)
+        for n in range(40):
+            self.place(rng.uniform(30, 30.5), rng.uniform(-98, -97.5), address=str(n))
+        box = {'bbox': '30,-98,30.5,-97.5', 'precision': 5}
+        with self.assertNumQueries(3):  # ETag counter, cells, ids of single-property cells
+            from_cells = self.get('clusters', **box)['clusters']
+        live = geo.clusters(Property.objects.all(), 30, -98, 30.5, -97.5, 5)
+        self.assertEqual(sum(cluster['count'] for cluster in from_cells), 40)
+        self.assertEqual(
+            [(c['cell'], c['count'], c['id'], round(c['latitude'], 6)) for c in from_cells],
+            [(c['cell'], c['count'], c['id'], round(c['latitude'], 6)) for c in live],
+        )
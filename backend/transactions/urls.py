@@ -1,11 +1,15 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ContactViewSet, PropertyViewSet, TransactionViewSet
+from .views import (
+    ArchivedTransactionViewSet, ContactViewSet, ImportJobViewSet, PropertyViewSet, TransactionViewSet,
+)
 
 router = DefaultRouter()
 router.register(r'contacts', ContactViewSet)
 router.register(r'properties', PropertyViewSet)
 router.register(r'transactions', TransactionViewSet)
+router.register(r'imports', ImportJobViewSet)
+router.register(r'archived-transactions', ArchivedTransactionViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
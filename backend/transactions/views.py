@@ -1,43 +1,432 @@
-from rest_framework import viewsets, permissions
-from .models import Contact, Property, Transaction
-from .serializers import ContactSerializer, PropertySerializer, TransactionSerializer
-from accounts.models import Organization
+import math
+import os
+import uuid
 
-class BaseTransactionViewSet(viewsets.ModelViewSet):
-    """Base ViewSet to handle organization filtering and creation."""
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from rest_framework import mixins, viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.response import Response
+from core_config.models import TransactionStatus, TransactionType
+from .models import ArchivedTransaction, Contact, ImportJob, Property, Transaction
+from .serializers import (
+    ArchivedTransactionSerializer, ContactSerializer, ImportJobSerializer, PropertySerializer,
+    TransactionSerializer, TransactionValuesReader,
+)
+from accounts.changes import ConditionalGetMixin
+from accounts.tenancy import current_organization, current_tenant
+from realtor_crm_backend.fieldsets import SparseQuerysetMixin, requested_fields
+from . import archive as archiving
+from . import bulk as bulk_writes
+from . import cells, exports, geo, imports
+
+# Map queries (``PropertyViewSet.nearby``/``within``)
+MAP_LIMIT = 500
+MAX_MAP_LIMIT = 2000
+DEFAULT_RADIUS_KM = 5
+MAX_RADIUS_KM = 500
+
+
+class ValuesListMixin:
+    """
+    Serve ``list`` from ``.values()`` rows through ``values_reader_class`` (one
+    query per page). Expansions are nested serializers, so ``?expand=`` lists
+    go through the serializer instead.
+    """
+    values_reader_class = None
+
+    def list(self, request, *args, **kwargs):
+        requested, expand = requested_fields(request)
+        if expand:
+            return super().list(request, *args, **kwargs)
+        reader = self.values_reader_class(requested)
+        keys = ('id', getattr(self, 'cursor_field', 'created_at'))
+        rows = reader.rows(self.filter_queryset(self.get_queryset()), keys)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response([reader.to_representation(row) for row in page])
+        return Response([reader.to_representation(row) for row in rows])
+
+
+class ExportMixin:
+    """
+    ``GET <list>/export/`` streams the list as CSV or NDJSON (see
+    ``transactions.exports``), filtered by ``start``/``end`` dates on
+    ``export_date_field`` and by comma-separated values of the
+    ``export_choice_filters`` params.
+    """
+    export_columns = ()
+    export_date_field = 'created_at'
+    export_choice_filters = {}  # query param -> choice field
+
+    @action(detail=False, methods=['get'], renderer_classes=[exports.CSVRenderer, exports.NDJSONRenderer])
+    def export(self, request):
+        queryset = self.get_queryset()
+        params = request.query_params
+        try:
+            start = exports.parse_date(params['start'], 'start') if params.get('start') else None
+            end = exports.parse_date(params['end'], 'end') if params.get('end') else None
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = exports.filter_date_range(queryset, self.export_date_field, start, end)
+
+        for param, field_name in self.export_choice_filters.items():
+            values = [value for value in params.get(param, '').split(',') if value]
+            if not values:
+                continue
+            choices = {choice for choice, _ in queryset.model._meta.get_field(field_name).choices}
+            unknown = [value for value in values if value not in choices]
+            if unknown:
+                return Response({'error': f"Unknown {param} '{unknown[0]}'."}, status=status.HTTP_400_BAD_REQUEST)
+            queryset = queryset.filter(**{f'{field_name}__in': values})
+
+        filename = f'{self.basename}-{timezone.localdate().isoformat()}'
+        return exports.stream(
+            queryset.order_by('id'), self.export_columns, request.accepted_renderer.format, filename,
+        )
+
+
+class OrganizationScopedMixin:
+    """Organization filtering and creation, for the request's tenant (accounts.tenancy)."""
     permission_classes = [permissions.IsAuthenticated]
 
-    def get_queryset(self):        
-        user = self.request.user
-        if user.is_superuser:
-            return self.queryset.all()
-            
-        if not hasattr(user, 'organization') or not user.organization:
-            # Return empty queryset if no active organization
-            return self.queryset.none()
-        return self.queryset.filter(organization=user.organization)
+    def get_queryset(self):
+        return self.queryset.for_tenant()
 
     def perform_create(self, serializer):
-        user = self.request.user
-        if not hasattr(user, 'organization') or not user.organization:
-            # Auto-onboarding for superusers/first-time users
-            # Import inside method to avoid potential circular dep if models cross-reference, though Organization is in accounts
-            org_name = f"{user.username}'s Agency"
-            # get_or_create to avoid duplicates if multiple requests come in
-            org, created = Organization.objects.get_or_create(name=org_name)
-            user.organization = org
-            user.save()
-            
-        serializer.save(organization=user.organization)
-
-class ContactViewSet(BaseTransactionViewSet):
+        serializer.save(organization=self.get_organization())
+
+    def get_organization(self):
+        organization = current_organization()
+        if organization is None:
+            # Every user gets one when created (accounts.signals).
+            raise PermissionDenied("Your account has no organization.")
+        return organization
+
+
+def bulk_rows(queryset, ids):
+    """
+    ``(rows of queryset with ids, None)`` for a valid ``{"ids": [...]}``
+    list, or ``(None, error response)``.
+    """
+    if not isinstance(ids, list) or not ids or not all(isinstance(pk, int) for pk in ids):
+        return None, Response({'error': "Expected {'ids': [...]} with integer ids."}, status=status.HTTP_400_BAD_REQUEST)
+    if len(ids) > bulk_writes.MAX_ROWS:
+        return None, Response(
+            {'error': f'At most {bulk_writes.MAX_ROWS} rows per request.'}, status=status.HTTP_400_BAD_REQUEST
+        )
+    queryset = queryset.filter(pk__in=ids)
+    found = set(queryset.values_list('pk', flat=True))
+    missing = [{'index': index, 'errors': {'id': ['Not found.']}} for index, pk in enumerate(ids) if pk not in found]
+    if missing:
+        return None, Response({'errors': missing}, status=status.HTTP_400_BAD_REQUEST)
+    return queryset, None
+
+
+def _float_params(params, names):
+    """``names`` read from ``params`` as floats; ``ValueError`` naming the first missing or invalid one."""
+    values = []
+    for name in names:
+        try:
+            value = float(params[name])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"'{name}' must be a number.")
+        if not math.isfinite(value):
+            raise ValueError(f"'{name}' must be a number.")
+        values.append(value)
+    return values
+
+
+def map_box(params):
+    """
+    ``(south, west, north, east)`` from ``?bbox=south,west,north,east`` or a
+    web-map tile ``?tile=zoom/x/y``; ``ValueError`` if neither is valid.
+    """
+    if 'tile' in params:
+        try:
+            zoom, x, y = (int(part) for part in params['tile'].split('/'))
+        except ValueError:
+            raise ValueError("'tile' must be zoom/x/y.")
+        if not 0 <= zoom <= geo.MAX_TILE_ZOOM or not (0 <= x < 2 ** zoom and 0 <= y < 2 ** zoom):
+            raise ValueError("'tile' is out of range.")
+        return geo.tile_box(zoom, x, y)
+    parts = params.get('bbox', '').split(',')
+    if len(parts) != 4:
+        raise ValueError("Expected 'bbox=south,west,north,east' or 'tile=zoom/x/y'.")
+    names = ('south', 'west', 'north', 'east')
+    south, west, north, east = _float_params(dict(zip(names, parts)), names)
+    if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+        raise ValueError("'bbox' is out of range.")
+    return south, west, north, east
+
+
+def map_limit(params):
+    try:
+        limit = int(params.get('limit', MAP_LIMIT))
+    except ValueError:
+        raise ValueError("'limit' must be an integer.")
+    return min(max(limit, 1), MAX_MAP_LIMIT)
+
+
+class BaseTransactionViewSet(OrganizationScopedMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
+    """Base ViewSet to handle organization filtering and creation."""
+
+    @action(detail=False, methods=['post', 'patch', 'delete'])
+    def bulk(self, request):
+        """
+        POST a list of objects to create them, PATCH a list of objects with
+        ``id`` to update them, DELETE ``{"ids": [...]}`` to delete them.
+        All-or-nothing: any invalid row fails the batch with per-row errors.
+        """
+        if request.method == 'DELETE':
+            return self.bulk_delete(request.data.get('ids') if isinstance(request.data, dict) else None)
+
+        rows = request.data
+        if not isinstance(rows, list) or not rows:
+            return Response({'error': 'Expected a non-empty list of objects.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > bulk_writes.MAX_ROWS:
+            return Response(
+                {'error': f'At most {bulk_writes.MAX_ROWS} rows per request.'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if request.method == 'PATCH':
+            return self.bulk_update(rows)
+        return self.bulk_create(rows)
+
+    def bulk_scope(self):
+        # Superusers read across organizations, so their references are not scoped.
+        tenant = current_tenant()
+        return None if tenant.unrestricted else tenant.organization_id
+
+    def bulk_create(self, rows):
+        organization = self.get_organization()
+        serializer = self.get_serializer(data=rows, many=True)
+        validated, errors = bulk_writes.validate_rows(serializer, rows, organization.id)
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        objects = bulk_writes.create_rows(self.queryset.model, validated, organization)
+        return Response({'created': [obj.pk for obj in objects]}, status=status.HTTP_201_CREATED)
+
+    def bulk_update(self, rows):
+        ids = [row.get('id') if isinstance(row, dict) else None for row in rows]
+        instances = self.get_queryset().in_bulk([pk for pk in ids if isinstance(pk, int)])
+        invalid, seen = [], set()
+        for index, pk in enumerate(ids):
+            if instances.get(pk) is None:
+                invalid.append({'index': index, 'errors': {'id': ['Not found.']}})
+            elif pk in seen:
+                invalid.append({'index': index, 'errors': {'id': ['Duplicate id.']}})
+            seen.add(pk)
+        if invalid:
+            return Response({'errors': invalid}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer(data=rows, many=True, partial=True)
+        validated, errors = bulk_writes.validate_rows(serializer, rows, self.bulk_scope())
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        objects = bulk_writes.update_rows(self.queryset.model, [instances[pk] for pk in ids], validated)
+        return Response({'updated': [obj.pk for obj in objects]})
+
+    def bulk_delete(self, ids):
+        queryset, error = bulk_rows(self.get_queryset(), ids)
+        if error is not None:
+            return error
+        # Deletes cascade (contacts/properties to transactions), so they keep the
+        # per-row signals that maintain rollups and the search index.
+        with db_transaction.atomic():
+            queryset.delete()
+        return Response({'deleted': len(set(ids))})
+
+class ContactViewSet(ExportMixin, ConditionalGetMixin, BaseTransactionViewSet):
     queryset = Contact.objects.all()
     serializer_class = ContactSerializer
+    etag_models = [Contact]
+    export_columns = [
+        ('id', 'id'), ('first_name', 'first_name'), ('last_name', 'last_name'), ('email', 'email'),
+        ('phone', 'phone'), ('role', 'role'), ('created_at', 'created_at'),
+    ]
+    export_choice_filters = {'role': 'role'}
 
-class PropertyViewSet(BaseTransactionViewSet):
+class PropertyViewSet(ConditionalGetMixin, BaseTransactionViewSet):
     queryset = Property.objects.all()
     serializer_class = PropertySerializer
+    etag_models = [Property]
+    etag_actions = ('list', 'retrieve', 'nearby', 'within', 'clusters')
+
+    @action(detail=False, methods=['get'])
+    def nearby(self, request):
+        """
+        ``?lat=&lng=&radius=`` (km): properties within the radius, nearest
+        first, each with its ``distance`` in km.
+        """
+        params = request.query_params
+        try:
+            latitude, longitude = _float_params(params, ('lat', 'lng'))
+            [radius] = _float_params({'radius': params.get('radius', DEFAULT_RADIUS_KM)}, ('radius',))
+            limit = map_limit(params)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            return Response({'error': "'lat'/'lng' are out of range."}, status=status.HTTP_400_BAD_REQUEST)
+        if not 0 < radius <= MAX_RADIUS_KM:
+            return Response(
+                {'error': f"'radius' must be above 0 and at most {MAX_RADIUS_KM} km."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        found, has_more = geo.nearest(self.get_queryset(), latitude, longitude, radius, limit)
+        objects = self.filter_queryset(self.get_queryset()).in_bulk([pk for _, pk in found])
+        results = self.get_serializer([objects[pk] for _, pk in found], many=True).data
+        for row, (distance, _) in zip(results, found):
+            row['distance'] = round(distance, 3)
+        return Response({'results': results, 'has_more': has_more})
+
+    @action(detail=False, methods=['get'])
+    def within(self, request):
+        """Properties inside ``?bbox=south,west,north,east`` (or ``?tile=zoom/x/y``)."""
+        try:
+            box, limit = map_box(request.query_params), map_limit(request.query_params)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = self.filter_queryset(self.get_queryset()).filter(geo.box_filter(*box))
+        rows = list(queryset.order_by('geohash', 'pk')[:limit + 1])
+        return Response({'results': self.get_serializer(rows[:limit], many=True).data, 'has_more': len(rows) > limit})
+
+    @action(detail=False, methods=['get'])
+    def clusters(self, request):
+        """
+        Properties inside ``?bbox=`` or ``?tile=`` counted per geohash cell,
+        for zoomed-out maps. The cell length follows the box's size unless
+        ``?precision=`` (1-9) sets it.
+        """
+        try:
+            box = map_box(request.query_params)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        precision = request.query_params.get('precision')
+        if precision is None:
+            length = geo.cluster_length(*box)
+        elif precision.isdigit() and 1 <= int(precision) <= geo.GEOHASH_LENGTH:
+            length = int(precision)
+        else:
+            return Response(
+                {'error': f"'precision' must be 1-{geo.GEOHASH_LENGTH}."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        found = cells.clusters(self.get_queryset(), *box, length, organization_id=self.bulk_scope())
+        return Response({'precision': length, 'clusters': found})
 
-class TransactionViewSet(BaseTransactionViewSet):
-    queryset = Transaction.objects.all()
+class TransactionViewSet(ExportMixin, ConditionalGetMixin, ValuesListMixin, BaseTransactionViewSet):
+    # Related names are rendered per row; join them for retrieve and writes.
+    queryset = Transaction.objects.select_related('type', 'status', 'property', 'contact')
     serializer_class = TransactionSerializer
+    values_reader_class = TransactionValuesReader
+    etag_models = [Transaction, Contact, Property, TransactionType, TransactionStatus]
+    export_columns = [
+        ('id', 'id'), ('name', 'name'), ('stage', 'stage'), ('detailed_status', 'detailed_status'),
+        ('type', 'type__name'), ('status', 'status__name'), ('value', 'value'),
+        ('commission_rate', 'commission_rate'), ('close_date', 'close_date'),
+        ('property_address', 'property__address'), ('property_city', 'property__city'),
+        ('property_state', 'property__state'), ('property_zip_code', 'property__zip_code'),
+        ('property_type', 'property_type'),
+        ('contact_name', ('contact__first_name', 'contact__last_name')), ('contact_email', 'contact__email'),
+        ('created_at', 'created_at'),
+    ]
+    export_date_field = 'close_date'
+    export_choice_filters = {'stage': 'stage'}
+
+    @action(detail=True, methods=['post'])
+    def archive(self, request, pk=None):
+        """Move the transaction to the archive (see ``transactions.archive``)."""
+        [archived] = archiving.archive([self.get_object()])
+        return Response(ArchivedTransactionSerializer(archived).data)
+
+    @action(detail=False, methods=['post'], url_path='archive')
+    def archive_many(self, request):
+        """POST ``{"ids": [...]}`` to archive those transactions."""
+        queryset, error = bulk_rows(
+            self.get_queryset(), request.data.get('ids') if isinstance(request.data, dict) else None
+        )
+        if error is not None:
+            return error
+        archived = archiving.archive(queryset.select_related(None))
+        return Response({'archived': [row.pk for row in archived]})
+
+
+class ArchivedTransactionViewSet(OrganizationScopedMixin, SparseQuerysetMixin, ConditionalGetMixin,
+                                 viewsets.ReadOnlyModelViewSet):
+    """
+    Archived transactions, newest archive first, with their stage history.
+    ``restore`` moves them back into the live table.
+    """
+    queryset = ArchivedTransaction.objects.select_related('type', 'status', 'property', 'contact')
+    serializer_class = ArchivedTransactionSerializer
+    etag_models = [ArchivedTransaction, Contact, Property, TransactionType, TransactionStatus]
+    cursor_field = 'archived_at'
+
+    @action(detail=True, methods=['post'])
+    def restore(self, request, pk=None):
+        [restored] = archiving.restore([self.get_object()])
+        restored = Transaction.objects.select_related('type', 'status', 'property', 'contact').get(pk=restored.pk)
+        return Response(TransactionSerializer(restored, context=self.get_serializer_context()).data)
+
+    @action(detail=False, methods=['post'], url_path='restore')
+    def restore_many(self, request):
+        """POST ``{"ids": [...]}`` to restore those transactions."""
+        queryset, error = bulk_rows(
+            self.get_queryset(), request.data.get('ids') if isinstance(request.data, dict) else None
+        )
+        if error is not None:
+            return error
+        restored = archiving.restore(queryset.select_related(None))
+        return Response({'restored': [obj.pk for obj in restored]})
+
+
+class ImportJobViewSet(OrganizationScopedMixin, mixins.CreateModelMixin, mixins.ListModelMixin,
+                       mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    POST a CSV as multipart ``file`` with ``kind`` (``contact``/``property``)
+    to start an import; poll the job for progress. See ``transactions.imports``.
+    """
+    queryset = ImportJob.objects.all()
+    serializer_class = ImportJobSerializer
+    parser_classes = [MultiPartParser, FormParser]
+
+    def create(self, request, *args, **kwargs):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'A CSV file is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        upload_dir = settings.IMPORT_UPLOAD_DIR
+        os.makedirs(upload_dir, exist_ok=True)
+        path = os.path.join(upload_dir, f'{uuid.uuid4().hex}.csv')
+        with open(path, 'wb') as destination:
+            for block in upload.chunks():
+                destination.write(block)
+
+        job = serializer.save(
+            organization=self.get_organization(), user=request.user, source=path, size=upload.size,
+        )
+        imports.start(job)
+        job.refresh_from_db()
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['post'])
+    def resume(self, request, pk=None):
+        """Continue an import whose worker was lost (or a pending one) from its last committed chunk."""
+        job = self.get_object()
+        if job.status == 'completed':
+            return Response({'error': 'This import has already completed.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not os.path.exists(job.source):
+            return Response(
+                {'error': 'The uploaded file is no longer available; upload it again.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        # A running job is resumable only once it has gone stale (see transactions.imports).
+        if not imports.start(job):
+            return Response({'error': 'This import is still running.'}, status=status.HTTP_409_CONFLICT)
+        job.refresh_from_db()
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
@@ -3,7 +3,7 @@
 import React, { useEffect, useState } from 'react';
 import { useRouter } from 'next/navigation';
 import { useAuth } from '@/context/AuthContext';
-import api from '@/lib/api';
+import api, { fetchAll } from '@/lib/api';
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
 import { Loader2, Users, Shield, UserCheck, Clock, TrendingUp, BarChart3, Activity } from 'lucide-react';
 import {
@@ -50,10 +50,10 @@ export default function AdminDashboardPage() {
             const fetchData = async () => {
                 try {
                     const [usersRes, statsRes] = await Promise.all([
-                        api.get('/accounts/users/'),
+                        fetchAll('/accounts/users/'),
                         api.get('/accounts/platform-stats/')
                     ]);
-                    setUsers(usersRes.data);
+                    setUsers(usersRes);
                     setStats(statsRes.data);
                 } catch (error) {
                     console.error("Failed to fetch admin data", error);
@@ -8,7 +8,7 @@ import { startOfWeek } from 'date-fns/startOfWeek';
 import { getDay } from 'date-fns/getDay';
 import { enUS } from 'date-fns/locale/en-US';
 import 'react-big-calendar/lib/css/react-big-calendar.css';
-import api from '@/lib/api';
+import api, { fetchAll } from '@/lib/api';
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
 import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
@@ -64,8 +64,8 @@ export default function CalendarPage() {
 
     const fetchEvents = async () => {
         try {
-            const res = await api.get('/events/');
-            const mappedEvents = res.data.map((e: any) => {
+            const events = await fetchAll('/events/');
+            const mappedEvents = events.map((e: any) => {
                 const startDate = new Date(e.start_time);
                 return {
                     id: e.id,
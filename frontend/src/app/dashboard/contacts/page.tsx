@@ -3,7 +3,7 @@
 import React, { useEffect, useState } from 'react';
 import { useRouter } from 'next/navigation';
 import { useAuth } from '@/context/AuthContext';
-import api from '@/lib/api';
+import { fetchAll } from '@/lib/api';
 import { Loader2, Search, User, Phone, Mail } from 'lucide-react';
 import { Input } from '@/components/ui/input';
 import { Button } from '@/components/ui/button';
@@ -49,8 +49,7 @@ export default function ContactsPage() {
                     // and included in project urls via path('api/', include('transactions.urls')) ?
                     // Wait, transactions/urls.py has router.register(r'contacts'). 
                     // If included at /api/, then it is /api/contacts/
-                    const res = await api.get('/contacts/');
-                    setContacts(res.data);
+                    setContacts(await fetchAll('/contacts/'));
                 } catch (error) {
                     console.error("Failed to fetch contacts", error);
                 } finally {
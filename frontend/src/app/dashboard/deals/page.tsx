@@ -1,7 +1,7 @@
 "use client";
 
 import React, { useEffect, useState } from 'react';
-import api from '@/lib/api';
+import { fetchAll } from '@/lib/api';
 import { Deal, Property, Contact } from '@/types';
 import { DealForm } from '@/components/deals/DealForm';
 import { Loader2, DollarSign, Calendar } from 'lucide-react';
@@ -33,13 +33,13 @@ export default function DealsPage() {
         try {
             // Parallel fetch to resolve IDs
             const [dealsRes, propsRes, contactsRes] = await Promise.all([
-                api.get('/deals/'),
-                api.get('/properties/'),
-                api.get('/contacts/')
+                fetchAll('/deals/?fields=id,stage,property_address,client_name,value,closing_date'),
+                fetchAll('/properties/?fields=id,address'),
+                fetchAll('/contacts/?fields=id,first_name,last_name')
             ]);
-            setDeals(dealsRes.data);
-            setProperties(propsRes.data);
-            setContacts(contactsRes.data);
+            setDeals(dealsRes);
+            setProperties(propsRes);
+            setContacts(contactsRes);
             setError('');
         } catch (err) {
             console.error("Failed to fetch deals data", err);
@@ -1,7 +1,7 @@
 "use client";
 
 import React, { useEffect, useState } from 'react';
-import api from '@/lib/api';
+import { fetchAll } from '@/lib/api';
 import { Property } from '@/types';
 import { PropertyForm } from '@/components/properties/PropertyForm';
 import { Loader2, MapPin, Bed, Bath, Ruler, Tag } from 'lucide-react';
@@ -23,8 +23,7 @@ export default function PropertiesPage() {
     const fetchProperties = async () => {
         setLoading(true);
         try {
-            const response = await api.get('/properties/');
-            setProperties(response.data);
+            setProperties(await fetchAll('/properties/'));
             setError('');
         } catch (err) {
             console.error("Failed to fetch properties", err);
@@ -3,7 +3,7 @@
 import React, { useEffect, useState } from 'react';
 import { useRouter } from 'next/navigation';
 import { useAuth } from '@/context/AuthContext';
-import api from '@/lib/api';
+import api, { fetchAll } from '@/lib/api';
 import { format } from 'date-fns';
 import {
     Loader2,
@@ -55,8 +55,14 @@ export default function TransactionsPage() {
 
     const fetchTransactions = async () => {
         try {
-            const res = await api.get('/transactions/');
-            setTransactions(res.data);
+            const fields = 'id,name,stage,status_name,property_type,value';
+            const live = await fetchAll<Transaction>(`/transactions/?fields=${fields}`);
+            // Archived transactions live in their own table
+            const archived = showArchived ? await fetchAll<Transaction>(`/archived-transactions/?fields=${fields}`) : [];
+            setTransactions([
+                ...live.map(tx => ({ ...tx, is_archived: false })),
+                ...archived.map(tx => ({ ...tx, is_archived: true })),
+            ]);
         } catch (error) {
             console.error("Failed to fetch transactions", error);
             toast.error("Failed to load transactions");
@@ -73,11 +79,15 @@ export default function TransactionsPage() {
             }
             fetchTransactions();
         }
-    }, [user, authLoading, router]);
+    }, [user, authLoading, router, showArchived]);
 
     const handleArchiveToggle = async (id: number, currentStatus: boolean) => {
         try {
-            await api.patch(`/transactions/${id}/`, { is_archived: !currentStatus });
+            if (currentStatus) {
+                await api.post(`/archived-transactions/${id}/restore/`);
+            } else {
+                await api.post(`/transactions/${id}/archive/`);
+            }
             toast.success(currentStatus ? "Transaction unarchived" : "Transaction archived");
             fetchTransactions(); // Refresh
         } catch (error) {
@@ -222,14 +232,16 @@ export default function TransactionsPage() {
                                                     >
                                                         <ArrowUpFromLine className="h-4 w-4" />
                                                     </Button>
-                                                    <Button
-                                                        variant="ghost"
-                                                        size="icon"
-                                                        className="h-8 w-8 text-gray-400 hover:text-red-600"
-                                                        onClick={() => handleDelete(tx.id)}
-                                                    >
-                                                        <Trash2 className="h-4 w-4" />
-                                                    </Button>
+                                                    {!tx.is_archived && (
+                                                        <Button
+                                                            variant="ghost"
+                                                            size="icon"
+                                                            className="h-8 w-8 text-gray-400 hover:text-red-600"
+                                                            onClick={() => handleDelete(tx.id)}
+                                                        >
+                                                            <Trash2 className="h-4 w-4" />
+                                                        </Button>
+                                                    )}
                                                 </div>
                                             </TableCell>
                                         </TableRow>
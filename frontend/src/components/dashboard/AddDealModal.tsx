@@ -4,7 +4,7 @@ import React, { useState, useEffect } from 'react';
 import { useForm } from 'react-hook-form';
 import { zodResolver } from '@hookform/resolvers/zod';
 import * as z from 'zod';
-import api from '@/lib/api';
+import api, { fetchAll } from '@/lib/api';
 import { toast } from 'sonner';
 import { Loader2, Plus } from 'lucide-react';
 import { Button } from '@/components/ui/button';
@@ -54,8 +54,7 @@ export function AddDealModal({ onSuccess }: AddDealModalProps) {
     useEffect(() => {
         const fetchContacts = async () => {
             try {
-                const res = await api.get('/contacts/');
-                setContacts(res.data);
+                setContacts(await fetchAll('/contacts/'));
             } catch (error) {
                 console.error("Failed to fetch contacts", error);
             }
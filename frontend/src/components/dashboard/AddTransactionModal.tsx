@@ -4,7 +4,7 @@ import React, { useState, useEffect } from 'react';
 import { useForm } from 'react-hook-form';
 import { zodResolver } from '@hookform/resolvers/zod';
 import * as z from 'zod';
-import api from '@/lib/api';
+import api, { fetchAll } from '@/lib/api';
 import { toast } from 'sonner';
 import { Loader2, Plus } from 'lucide-react';
 import { Button } from '@/components/ui/button';
@@ -60,11 +60,11 @@ export function AddTransactionModal({ onSuccess }: AddTransactionModalProps) {
         const fetchData = async () => {
             try {
                 const [contactsRes, propertiesRes] = await Promise.all([
-                    api.get('/contacts/'),
-                    api.get('/properties/')
+                    fetchAll('/contacts/'),
+                    fetchAll('/properties/')
                 ]);
-                setContacts(contactsRes.data);
-                setProperties(propertiesRes.data);
+                setContacts(contactsRes);
+                setProperties(propertiesRes);
             } catch (error) {
                 console.error("Failed to fetch data", error);
             }
@@ -1,7 +1,7 @@
 "use client";
 
 import React, { useState, useEffect } from 'react';
-import api from '@/lib/api';
+import api, { fetchAll } from '@/lib/api';
 import { Task } from '@/types';
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
 import { Button } from '@/components/ui/button';
@@ -19,8 +19,7 @@ export function TodoWidget({ className }: { className?: string }) {
 
     const fetchTasks = async () => {
         try {
-            const res = await api.get('/tasks/');
-            setTasks(res.data);
+            setTasks(await fetchAll('/tasks/'));
         } catch (error) {
             console.error("Failed to fetch tasks", error);
         } finally {
@@ -4,7 +4,7 @@ import React, { useState, useEffect } from 'react';
 import { useForm } from 'react-hook-form';
 import { zodResolver } from '@hookform/resolvers/zod';
 import * as z from 'zod';
-import api from '@/lib/api';
+import api, { fetchAll } from '@/lib/api';
 import { toast } from 'sonner';
 import { Loader2, Plus } from 'lucide-react';
 import { Property, Contact } from '@/types';
@@ -57,11 +57,11 @@ export function DealForm({ onSuccess }: DealFormProps) {
     const fetchData = async () => {
         try {
             const [propsRes, contactsRes] = await Promise.all([
-                api.get('/properties/'),
-                api.get('/contacts/')
+                fetchAll<Property>('/properties/'),
+                fetchAll<Contact>('/contacts/')
             ]);
-            setProperties(propsRes.data);
-            setContacts(contactsRes.data);
+            setProperties(propsRes);
+            setContacts(contactsRes);
         } catch (error) {
             console.error("Failed to load select options", error);
             toast.error("Could not load properties or contacts");
@@ -42,3 +42,16 @@ api.interceptors.response.use(
 );
 
 export default api;
+
+// List endpoints are keyset-paginated ({ next, previous, results });
+// follow the cursor links and return every row.
+export async function fetchAll<T = any>(url: string): Promise<T[]> {
+    const rows: T[] = [];
+    let next: string | null = url;
+    while (next) {
+        const res: { data: { next: string | null; results: T[] } } = await api.get(next);
+        rows.push(...res.data.results);
+        next = res.data.next;
+    }
+    return rows;
+}
@@ -10,6 +10,8 @@ export interface Property {
     bedrooms: number;
     bathrooms: number;
     square_feet: number;
+    latitude?: number | null;
+    longitude?: number | null;
     created_at?: string;
 }
 